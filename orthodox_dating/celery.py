@@ -35,4 +35,15 @@ app.conf.update(
 app.conf.task_routes = {
     'profiles.tasks.process_uploaded_photo': {'queue': 'photos', 'priority': 5},
     'profiles.tasks.notify_admins_about_duplicate': {'queue': 'notifications', 'priority': 3},
-}
\ No newline at end of file
+    'profiles.tasks.notify_admins_about_internet_match': {'queue': 'notifications', 'priority': 3},
+}
+
+
+# ✅ Периодические задачи (celery -A orthodox_dating beat)
+app.conf.beat_schedule = {
+    # Пересчёт хешей фото без хеша и со старым average hash на pHash
+    'compute-missing-photo-hashes': {
+        'task': 'profiles.tasks.compute_missing_photo_hashes',
+        'schedule': 10 * 60,
+    },
+}
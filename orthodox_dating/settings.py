@@ -242,6 +242,15 @@ else:
         }
     }
 
+# Сколько хранить результат обратного поиска фото (Google Vision, TinEye)
+# по sha256/pHash файла: повторные загрузки не стоят нового запроса к API.
+# Больше - меньше запросов, но дольше не видны новые копии фото в сети
+REVERSE_SEARCH_CACHE_TIMEOUT = 7 * 24 * 60 * 60  # 7 дней
+
+# Обратный поиск загруженных фото в интернете (Google Vision) в фоновой
+# задаче process_uploaded_photo. Платный API - по умолчанию выключен
+PHOTO_INTERNET_CHECK = config('PHOTO_INTERNET_CHECK', default=False, cast=bool)
+
 
 
 # ==============================================================================
@@ -556,9 +565,12 @@ else:
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# Ограничение размера загружаемых файлов (5MB)
+# Ограничение размера тела запроса без файлов (5MB)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
+# Файлы больше 256KB Django сразу пишет во временный файл на диске, а не в
+# память процесса; проверка фото читает их через mmap (размер самого файла
+# ограничивает PhotoValidator.MAX_FILE_SIZE)
+FILE_UPLOAD_MAX_MEMORY_SIZE = 262144  # 256KB
 
 # Timeout для запросов
 CONN_MAX_AGE = 600
@@ -6,7 +6,8 @@ from django.utils.html import format_html
 from django.db.models import Exists, OuterRef, Q, Count
 from django.db import transaction
 
-from profiles.services.photo_verification import PhotoVerificationService, calculate_photo_hash, verify_photo_originality
+from profiles.services.photo_verification import PhotoVerificationService, calculate_photo_hash, verify_photo_originality, HASH_ALGO
+from profiles.services.notification_cache import invalidate_unread_count
 from .models import (
     Comment, Complaint, Post, StaticPage, TelegramUser, UserProfile,
     Photo, Like, Message, Notification, UserSession, UserActivity, ComplaintLog
@@ -137,7 +138,8 @@ class PhotoAdmin(admin.ModelAdmin):
             similar = PhotoVerificationService.find_similar_photos(
                 photo_hash=obj.image_hash,
                 user_profile=obj.user_profile,
-                exclude_photo_id=obj.id
+                exclude_photo_id=obj.id,
+                hash_algo=obj.image_hash_algo
             )
 
             if similar:
@@ -171,7 +173,8 @@ class PhotoAdmin(admin.ModelAdmin):
             similar = PhotoVerificationService.find_similar_photos(
                 photo_hash=obj.image_hash,
                 user_profile=obj.user_profile,
-                exclude_photo_id=obj.id
+                exclude_photo_id=obj.id,
+                hash_algo=obj.image_hash_algo
             )
 
             if not similar:
@@ -268,7 +271,8 @@ class PhotoAdmin(admin.ModelAdmin):
                 # Вычисляем хеш
                 photo_hash = calculate_photo_hash(image_data)  # ✅ Передаем bytes
                 photo.image_hash = photo_hash
-                photo.save(update_fields=['image_hash'])
+                photo.image_hash_algo = HASH_ALGO
+                photo.save(update_fields=['image_hash', 'image_hash_algo'])
                 calculated += 1
                 
             except Exception as e:
@@ -463,7 +467,7 @@ class CommentAdmin(ReadOnlyTimestampsMixin, ShortTextDisplayMixin, admin.ModelAd
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.select_related('author', 'post', 'parent').prefetch_related('likes', 'dislikes')
+        return qs.select_related('author', 'post', 'parent')
 
     @admin.display(description='Автор', ordering='author__username')
     def get_author_name(self, obj):
@@ -496,7 +500,7 @@ class CommentAdmin(ReadOnlyTimestampsMixin, ShortTextDisplayMixin, admin.ModelAd
 class ComplaintAdmin(admin.ModelAdmin):
     list_display = ('get_reporter', 'get_reported', 'reason', 'status_colored', 'created_at')
     list_filter = ('status', 'reason', 'created_at')
-    search_fields = ('reporter__username', 'reported_user__username', 'description')
+    search_fields = ('reporter_username', 'reported_user__username', 'description')
 
     # ✅ УБРАЛИ list_editable - теперь изменяем только через форму редактирования
     # list_editable = ('status',)  # <-- ЭТО ВЫЗЫВАЛО ДВОЙНОЕ СРАБАТЫВАНИЕ
@@ -521,16 +525,18 @@ class ComplaintAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('reporter', 'reported_user')
+        return super().get_queryset(request).select_related('reported_user')
 
-    @admin.display(description='От кого', ordering='reporter__username')
+    @admin.display(description='От кого', ordering='reporter_username')
     def get_reporter(self, obj):
-        if obj.reporter:
+        if obj.reporter_id:
             return format_html(
                 '<a href="/admin/auth/user/{}/change/" style="color: #007bff;">👤 {}</a>',
-                obj.reporter.id,
-                obj.reporter.username
+                obj.reporter_id,
+                obj.reporter_username
             )
+        if obj.reporter_username:
+            return f'❓ {obj.reporter_username} (удален)'
         return '❓ Удален'
 
     @admin.display(description='На кого', ordering='reported_user__username')
@@ -715,6 +721,9 @@ class ComplaintLogAdmin(admin.ModelAdmin):
     date_hierarchy = 'changed_at'
     readonly_fields = ('complaint', 'changed_by', 'old_status', 'new_status', 'changed_at', 'comment')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('complaint__reported_user', 'changed_by')
+
     def has_add_permission(self, request):
         return False
 
@@ -810,12 +819,16 @@ class NotificationAdmin(ReadOnlyTimestampsMixin, ShortTextDisplayMixin, admin.Mo
 
     @admin.action(description='✅ Отметить прочитанными')
     def mark_as_read(self, request, queryset):
+        recipient_ids = list(queryset.values_list('recipient_id', flat=True).distinct())
         updated = queryset.filter(is_read=False).update(is_read=True)
+        invalidate_unread_count(*recipient_ids)
         self.message_user(request, f'Отмечено прочитанными: {updated}', django_messages.SUCCESS)
 
     @admin.action(description='📭 Отметить непрочитанными')
     def mark_as_unread(self, request, queryset):
+        recipient_ids = list(queryset.values_list('recipient_id', flat=True).distinct())
         updated = queryset.filter(is_read=True).update(is_read=False)
+        invalidate_unread_count(*recipient_ids)
         self.message_user(request, f'Отмечено непрочитанными: {updated}', django_messages.INFO)
 
     @admin.action(description='🗑️ Удалить старые (>30 дней)')
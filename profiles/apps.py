@@ -18,6 +18,9 @@ class ProfilesConfig(AppConfig):
         import profiles.signals.complaint_signal
         import profiles.signals.create_user_profile_signal
         import profiles.signals.photo_signals
+        import profiles.signals.notification_cache_signals
+        import profiles.signals.like_cache_signals
+        import profiles.signals.photo_hash_index_signals
         import profiles.signals
 
 
@@ -1,8 +1,8 @@
-from .models import Notification
+from .services.notification_cache import get_unread_count
 
 def unread_notifications_count(request):
     if request.user.is_authenticated:
-        count = Notification.objects.filter(recipient=request.user, is_read=False).count()
+        count = get_unread_count(request.user.id)
         return {'unread_notifications_count': count}
     return {}
 
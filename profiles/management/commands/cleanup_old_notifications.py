@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from profiles.management.commands import cleanup_old_notifications
+from profiles.signals.cleanup_old_notifications_signal import cleanup_old_notifications
 
 class Command(BaseCommand):
     help = 'Удаляет старые прочитанные уведомления'
@@ -7,10 +7,15 @@
     python manage.py verify_photos --update-hashes    # Обновить хеши
     python manage.py verify_photos --delete-duplicates  # Удалить дубликаты
 """
+import time
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
 from profiles.models import Photo, UserProfile
 from profiles.services import PhotoVerificationService
+from profiles.services.photo_verification import HASH_ALGO
 
 User = get_user_model()
 
@@ -18,6 +23,11 @@ User = get_user_model()
 class Command(BaseCommand):
     help = 'Проверка фотографий на оригинальность и дубликаты'
 
+    # Размер пачки при потоковом чтении из БД
+    CHUNK_SIZE = 500
+    # Минимальный интервал между обновлениями строки прогресса (сек)
+    PROGRESS_INTERVAL = 0.2
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--user-id',
@@ -46,8 +56,11 @@ class Command(BaseCommand):
         delete_duplicates = options.get('delete_duplicates')
         dry_run = options.get('dry_run')
         
-        # Получаем queryset
-        queryset = Photo.objects.select_related('user_profile__user')
+        # Получаем queryset: только колонки, нужные для проверки
+        queryset = Photo.objects.select_related('user_profile__user').only(
+            'id', 'user_profile', 'image_hash', 'image_hash_algo', 'uploaded_at', 'image',
+            'user_profile__user__username',
+        )
         
         if user_id:
             try:
@@ -60,7 +73,7 @@ class Command(BaseCommand):
         else:
             self.stdout.write("🔍 Проверка всех фотографий в системе")
         
-        total = queryset.count()
+        total = self._count_photos(queryset, filtered=bool(user_id))
         self.stdout.write(f"📊 Всего фотографий: {total}")
         
         # Обновление хешей
@@ -72,7 +85,7 @@ class Command(BaseCommand):
         # Поиск дубликатов
         self.stdout.write("\n" + "="*50)
         self.stdout.write("🔍 Поиск дубликатов...")
-        stats = self._find_duplicates(queryset)
+        stats = self._find_duplicates(queryset, total)
         
         # Удаление дубликатов
         if delete_duplicates and stats['duplicates']:
@@ -88,35 +101,57 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS("✅ Проверка завершена!"))
         self._print_summary(stats)
 
+    def _count_photos(self, queryset, filtered):
+        """
+        Количество фото для отображения прогресса.
+
+        Для полной таблицы на PostgreSQL берём оценку планировщика
+        из pg_class.reltuples вместо дорогого COUNT(*).
+        """
+        if not filtered and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [Photo._meta.db_table]
+                )
+                row = cursor.fetchone()
+            # reltuples = -1, если таблицу ещё не анализировали
+            if row and row[0] >= 0:
+                return int(row[0])
+        return queryset.count()
+
     def _update_hashes(self, queryset, dry_run):
         """Обновление хешей для фото"""
         calculated = 0
         skipped = 0
         errors = 0
         
-        photos_without_hash = queryset.filter(image_hash__isnull=True) | queryset.filter(image_hash='')
+        # Без хеша или с хешем устаревшего алгоритма (average hash)
+        photos_without_hash = queryset.filter(
+            Q(image_hash__isnull=True) | Q(image_hash='') | ~Q(image_hash_algo=HASH_ALGO)
+        )
         total = photos_without_hash.count()
         
-        self.stdout.write(f"📝 Фото без хеша: {total}")
+        self.stdout.write(f"📝 Фото без хеша или со старым хешем: {total}")
         
-        for i, photo in enumerate(photos_without_hash, 1):
+        for i, photo in enumerate(photos_without_hash.iterator(chunk_size=self.CHUNK_SIZE), 1):
             try:
-                if not photo.photo:
+                if not photo.image:
                     errors += 1
                     continue
                 
                 # Вычисляем хеш
                 from profiles.services import calculate_photo_hash
-                photo_hash = calculate_photo_hash(photo.photo.path)
+                with photo.image.open('rb') as image_file:
+                    photo_hash = calculate_photo_hash(image_file)
                 
                 if not dry_run:
                     photo.image_hash = photo_hash
-                    photo.save(update_fields=['image_hash'])
+                    photo.image_hash_algo = HASH_ALGO
+                    photo.save(update_fields=['image_hash', 'image_hash_algo'])
                 
                 calculated += 1
-                
-                if i % 10 == 0:
-                    self.stdout.write(f"  Обработано: {i}/{total}", ending='\r')
+                self._progress("Обработано", i, total)
                 
             except Exception as e:
                 errors += 1
@@ -124,15 +159,13 @@ class Command(BaseCommand):
         
         self.stdout.write(f"\n✅ Вычислено: {calculated} | ⚠️ Ошибок: {errors}")
 
-    def _find_duplicates(self, queryset):
-        """Поиск дубликатов"""
+    def _find_duplicates(self, queryset, total):
+        """Поиск дубликатов (total уже посчитан в handle)"""
         checked = 0
         duplicates_data = []
         errors = 0
         
-        total = queryset.count()
-        
-        for i, photo in enumerate(queryset, 1):
+        for i, photo in enumerate(queryset.iterator(chunk_size=self.CHUNK_SIZE), 1):
             try:
                 if not photo.image_hash:
                     continue
@@ -140,7 +173,8 @@ class Command(BaseCommand):
                 similar = PhotoVerificationService.find_similar_photos(
                     photo_hash=photo.image_hash,
                     user_profile=photo.user_profile,
-                    exclude_photo_id=photo.id
+                    exclude_photo_id=photo.id,
+                    hash_algo=photo.image_hash_algo
                 )
                 
                 checked += 1
@@ -151,8 +185,7 @@ class Command(BaseCommand):
                         'similar': similar
                     })
                 
-                if i % 10 == 0:
-                    self.stdout.write(f"  Проверено: {i}/{total}", ending='\r')
+                self._progress("Проверено", i, total)
                 
             except Exception as e:
                 errors += 1
@@ -197,6 +230,13 @@ class Command(BaseCommand):
                 if sim_photo not in hash_groups[photo.image_hash]:
                     hash_groups[photo.image_hash].append(sim_photo)
         
+        # Имена владельцев одним запросом (похожие фото пришли без select_related)
+        photo_ids = {photo.id for photos in hash_groups.values() for photo in photos}
+        name_map = dict(
+            Photo.objects.filter(id__in=photo_ids)
+            .values_list('id', 'user_profile__user__username')
+        )
+        
         # Для каждой группы оставляем самое старое
         for photo_hash, photos in hash_groups.items():
             if len(photos) <= 1:
@@ -208,11 +248,11 @@ class Command(BaseCommand):
             # Оставляем первое
             kept_photo = photos[0]
             kept += 1
+            kept_name = name_map.get(kept_photo.id, '?')
+            kept_date = kept_photo.uploaded_at.strftime('%d.%m.%Y')
             
             self.stdout.write(
-                f"  📌 Оставлено: Фото #{kept_photo.id} "
-                f"({kept_photo.user_profile.user.username}, "
-                f"{kept_photo.uploaded_at.strftime('%d.%m.%Y')})"
+                f"  📌 Оставлено: Фото #{kept_photo.id} ({kept_name}, {kept_date})"
             )
             
             # Удаляем остальные
@@ -222,8 +262,7 @@ class Command(BaseCommand):
                 deleted += 1
                 self.stdout.write(
                     f"    🗑️ Удалено: Фото #{photo.id} "
-                    f"({photo.user_profile.user.username}, "
-                    f"{photo.uploaded_at.strftime('%d.%m.%Y')})"
+                    f"({name_map.get(photo.id, '?')}, {photo.uploaded_at:%d.%m.%Y})"
                 )
         
         if dry_run:
@@ -231,6 +270,20 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.SUCCESS(f"\n✅ Удалено: {deleted} дубликатов"))
 
+    def _progress(self, label, current, total):
+        """
+        Строка прогресса с ограничением частоты обновления.
+
+        Выводится не чаще раза в PROGRESS_INTERVAL секунд (и на последнем
+        элементе), поэтому запись через OutputWrapper не тормозит цикл.
+        """
+        now = time.monotonic()
+        if current != total and now - getattr(self, '_progress_ts', 0) < self.PROGRESS_INTERVAL:
+            return
+        self._progress_ts = now
+        self.stdout.write(f"\r  {label}: {current}/{total}", ending='')
+        self.stdout.flush()
+
     def _print_summary(self, stats):
         """Вывод итоговой статистики"""
         self.stdout.write("\n📊 ИТОГОВАЯ СТАТИСТИКА:")
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 import logging
+import time
 from django.utils import timezone
 from django.core.cache import cache
-from django.db import DatabaseError
+from django.db import DatabaseError, connection
 from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 from profiles.models import UserProfile
 from profiles.models import UserSession
 
@@ -11,6 +13,9 @@ from django.utils.deprecation import MiddlewareMixin
 
 logger = logging.getLogger(__name__)
 
+# Пул для фоновых UPDATE last_seen (вне критического пути ответа)
+_UPDATE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='last-seen')
+
 
 class UpdateLastSeenMiddleware:
     """
@@ -69,55 +74,61 @@ class UpdateLastSeenMiddleware:
         return False
 
     def _update_last_seen(self, request):
-        """Обновление времени последней активности с использованием кэша"""
+        """
+        Обновление времени последней активности с использованием кэша.
+
+        cache.add атомарно пропускает только один запрос за UPDATE_INTERVAL,
+        а сам UPDATE уходит в фоновый пул и не задерживает воркер.
+        """
         if self._should_skip(request):
             return
         
         user_id = request.user.id
         cache_key = f'{self.CACHE_PREFIX}{user_id}'
-        
-        # Проверяем кэш
-        last_update = cache.get(cache_key)
         now = timezone.now()
         
-        # Если обновляли недавно - пропускаем
-        if last_update:
-            time_since_update = (now - last_update).total_seconds()
-            if time_since_update < self.UPDATE_INTERVAL:
-                return
+        # Если обновляли недавно - ключ уже есть, пропускаем
+        if not cache.add(cache_key, now, self.UPDATE_INTERVAL):
+            return
         
-        # Обновляем БД
         try:
-            # Используем update() для эффективности
-            # select_for_update() предотвращает race conditions
-            updated = UserProfile.objects.filter(
-                user_id=user_id
-            ).update(last_seen=now)
+            _UPDATE_POOL.submit(_do_update_last_seen, user_id, now)
+        except RuntimeError as e:
+            # Пул остановлен (завершение процесса) - не блокируем запрос
+            logger.error(f'Cannot schedule last_seen update for user {user_id}: {e}')
+
+
+def _do_update_last_seen(user_id, now):
+    """Фоновое обновление last_seen (выполняется в потоке _UPDATE_POOL)"""
+    try:
+        updated = UserProfile.objects.filter(user_id=user_id).update(last_seen=now)
+        
+        # Если профиль не найден - логируем предупреждение
+        if updated == 0:
+            logger.warning(f'Profile not found for user ID: {user_id}')
             
-            # Если профиль не найден - логируем предупреждение
-            if updated == 0:
-                logger.warning(f'Profile not found for user {request.user.username} (ID: {user_id})')
-            else:
-                # Обновляем кэш только если обновление успешно
-                cache.set(cache_key, now, self.CACHE_TIMEOUT)
-                
-        except DatabaseError as e:
-            # Не блокируем запрос при проблемах с БД
-            logger.error(f'Database error updating last_seen for user {user_id}: {e}')
-        except Exception as e:
-            # Ловим любые другие ошибки
-            logger.error(f'Unexpected error updating last_seen for user {user_id}: {e}')
+    except DatabaseError as e:
+        # При ошибке снимаем метку, чтобы следующий запрос повторил попытку
+        cache.delete(f'{UpdateLastSeenMiddleware.CACHE_PREFIX}{user_id}')
+        logger.error(f'Database error updating last_seen for user {user_id}: {e}')
+    except Exception as e:
+        # Ловим любые другие ошибки
+        logger.error(f'Unexpected error updating last_seen for user {user_id}: {e}')
+    finally:
+        # У потока пула своё соединение - не оставляем его висеть
+        connection.close()
 
 
 class OnlineUsersMiddleware:
     """
     Опциональный middleware для отслеживания онлайн пользователей.
-    Хранит список активных пользователей в кэше.
+    Хранит в кэше время последнего запроса каждого активного пользователя
+    ({user_id: timestamp}); записи старше ONLINE_THRESHOLD отбрасываются.
     """
     
     ONLINE_THRESHOLD = 300  # 5 минут
     CACHE_KEY = 'online_users'
-    CACHE_TIMEOUT = 60  # Обновляем список каждую минуту
+    CACHE_TIMEOUT = ONLINE_THRESHOLD  # без запросов список целиком устаревает
     
     def __init__(self, get_response):
         self.get_response = get_response
@@ -131,22 +142,41 @@ class OnlineUsersMiddleware:
         return response
 
     def _update_online_users(self, user_id):
-        """Добавление пользователя в список онлайн"""
+        """Отметка пользователя в списке онлайн (с отсевом ушедших)"""
         try:
-            online_users = cache.get(self.CACHE_KEY, set())
-            online_users.add(user_id)
+            now = time.time()
+            online_users = self._fresh(cache.get(self.CACHE_KEY), now)
+            online_users[user_id] = now
             cache.set(self.CACHE_KEY, online_users, self.CACHE_TIMEOUT)
         except Exception as e:
             logger.error(f'Error updating online users: {e}')
 
+    @classmethod
+    def _fresh(cls, online_users, now):
+        """Только записи не старше ONLINE_THRESHOLD"""
+        # Старый формат (множество ID без времени) не учитываем
+        if not isinstance(online_users, dict):
+            return {}
+        threshold = now - cls.ONLINE_THRESHOLD
+        return {
+            user_id: seen_at
+            for user_id, seen_at in online_users.items()
+            if seen_at >= threshold
+        }
+
+    @classmethod
+    def get_online_user_ids(cls):
+        """ID пользователей, заходивших за последние ONLINE_THRESHOLD секунд"""
+        try:
+            return set(cls._fresh(cache.get(cls.CACHE_KEY), time.time()))
+        except Exception as e:
+            logger.error(f'Error reading online users: {e}')
+            return set()
+
     @classmethod
     def get_online_users_count(cls):
         """Получение количества онлайн пользователей"""
-        try:
-            online_users = cache.get(cls.CACHE_KEY, set())
-            return len(online_users)
-        except Exception:
-            return 0
+        return len(cls.get_online_user_ids())
 
 
 class RequestLoggingMiddleware:
@@ -187,8 +217,16 @@ def get_online_users():
     """
     Получить QuerySet онлайн пользователей.
     Используется в шаблонах или views.
+
+    Берёт ID из кэша OnlineUsersMiddleware (IN по небольшому списку),
+    к выборке по last_seen прибегает только если кэш пуст.
     """
-    from datetime import timedelta
+    online_ids = OnlineUsersMiddleware.get_online_user_ids()
+    if online_ids:
+        return UserProfile.objects.filter(
+            user_id__in=online_ids
+        ).select_related('user')
+
     threshold = timezone.now() - timedelta(minutes=5)
     return UserProfile.objects.filter(
         last_seen__gte=threshold
@@ -229,10 +267,39 @@ def online_users_processor(request):
 # ========================================== 
 
 class SessionTrackingMiddleware(MiddlewareMixin):
+    """
+    Привязывает к запросу активную UserSession пользователя.
+
+    ID сеанса запоминается в request.session после первого поиска по
+    session_key (сеанс записывает задача record_user_session), дальше
+    сеанс читается одним запросом по первичному ключу. Сеанс, закрытый
+    с тех пор (вход с другого устройства) или удалённый, не подставляется:
+    запомненный ID сбрасывается, а request.user_session будет None.
+    """
+
+    SESSION_KEY = '_user_session_id'
+
     def process_request(self, request):
-        if request.user.is_authenticated:
-            try:
-                session = UserSession.objects.filter(user=request.user, logout_time__isnull=True).latest('login_time')
-                request.user_session = session
-            except UserSession.DoesNotExist:
-                request.user_session = None
\ No newline at end of file
+        if not request.user.is_authenticated:
+            return
+
+        open_sessions = UserSession.objects.filter(user=request.user, logout_time__isnull=True)
+
+        session_id = request.session.get(self.SESSION_KEY)
+        if session_id:
+            user_session = open_sessions.filter(pk=session_id).first()
+            if user_session is None:
+                request.session.pop(self.SESSION_KEY, None)
+        else:
+            # Первый запрос после входа (или сеанс ещё не записан задачей) -
+            # ищем и запоминаем, как только он появится. Ищем именно сеанс
+            # этой сессии: последний открытый сеанс пользователя может
+            # оказаться сеансом с другого устройства
+            user_session = open_sessions.filter(
+                session_key=request.session.session_key
+            ).first()
+            if user_session is not None:
+                request.session[self.SESSION_KEY] = user_session.pk
+
+        request.user_session = user_session
+        request.user_session_id = user_session.pk if user_session is not None else None
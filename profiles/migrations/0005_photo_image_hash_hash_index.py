@@ -0,0 +1,32 @@
+# Хеш-индекс по image_hash для точного поиска дубликатов (только PostgreSQL)
+
+from django.db import migrations
+
+
+INDEX_NAME = 'photo_phash_hash'
+
+
+def create_hash_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        f'ON profiles_photo USING HASH (image_hash)'
+    )
+
+
+def drop_hash_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_notification_profiles_no_sender__e177e3_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_hash_index, drop_hash_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-15 22:42
+
+import profiles.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0005_photo_image_hash_hash_index'),
+    ]
+
+    # Обычное поле нельзя превратить в генерируемое через ALTER —
+    # пересоздаём столбец, значения вычисляются из logout_time/login_time
+    operations = [
+        migrations.RemoveField(
+            model_name='usersession',
+            name='duration_minutes',
+        ),
+        migrations.AddField(
+            model_name='usersession',
+            name='duration_minutes',
+            field=models.GeneratedField(db_persist=True, expression=profiles.models.SessionDurationMinutes('logout_time', 'login_time'), output_field=models.IntegerField(blank=True, null=True)),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-15 22:44
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_reporter_username(apps, schema_editor):
+    Complaint = apps.get_model('profiles', 'Complaint')
+    User = apps.get_model('auth', 'User')
+    Complaint.objects.filter(reporter__isnull=False).update(
+        reporter_username=Subquery(
+            User.objects.filter(pk=OuterRef('reporter_id')).values('username')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0006_usersession_duration_minutes_generated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='reporter_username',
+            field=models.CharField(blank=True, max_length=150, verbose_name='Имя подавшего жалобу'),
+        ),
+        migrations.RunPython(fill_reporter_username, migrations.RunPython.noop),
+    ]
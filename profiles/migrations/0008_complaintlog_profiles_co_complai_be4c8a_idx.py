@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-15 22:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0007_complaint_reporter_username'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaintlog',
+            index=models.Index(fields=['complaint', '-changed_at'], name='profiles_co_complai_be4c8a_idx'),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.0.7 on 2026-10-15 22:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+LIKE = 1
+DISLIKE = -1
+
+
+def copy_votes(apps, schema_editor):
+    """Переносим строки из таблиц likes/dislikes в CommentVote"""
+    Comment = apps.get_model('profiles', 'Comment')
+    CommentVote = apps.get_model('profiles', 'CommentVote')
+
+    votes = {}
+    # Дизлайки первыми: если пользователь оказался в обеих таблицах, побеждает лайк
+    for through, vote_type in (
+        (Comment.dislikes.through, DISLIKE),
+        (Comment.likes.through, LIKE),
+    ):
+        for comment_id, user_id in through.objects.values_list('comment_id', 'user_id').iterator():
+            votes[(comment_id, user_id)] = vote_type
+
+    CommentVote.objects.bulk_create(
+        [
+            CommentVote(comment_id=comment_id, user_id=user_id, vote_type=vote_type)
+            for (comment_id, user_id), vote_type in votes.items()
+        ],
+        batch_size=1000
+    )
+
+
+def restore_votes(apps, schema_editor):
+    Comment = apps.get_model('profiles', 'Comment')
+    CommentVote = apps.get_model('profiles', 'CommentVote')
+
+    for through, vote_type in (
+        (Comment.likes.through, LIKE),
+        (Comment.dislikes.through, DISLIKE),
+    ):
+        through.objects.bulk_create(
+            [
+                through(comment_id=comment_id, user_id=user_id)
+                for comment_id, user_id in CommentVote.objects.filter(
+                    vote_type=vote_type
+                ).values_list('comment_id', 'user_id').iterator()
+            ],
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0008_complaintlog_profiles_co_complai_be4c8a_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote_type', models.SmallIntegerField(choices=[(1, 'Лайк'), (-1, 'Дизлайк')], verbose_name='Оценка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата оценки')),
+                ('comment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='profiles.comment', verbose_name='Комментарий')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_votes', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Оценка комментария',
+                'verbose_name_plural': 'Оценки комментариев',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='commentvote',
+            index=models.Index(fields=['comment', 'vote_type'], name='profiles_co_comment_9ff0f5_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='commentvote',
+            constraint=models.UniqueConstraint(fields=('comment', 'user'), name='unique_comment_vote'),
+        ),
+        migrations.RunPython(copy_votes, restore_votes),
+        migrations.RemoveField(
+            model_name='comment',
+            name='dislikes',
+        ),
+        migrations.RemoveField(
+            model_name='comment',
+            name='likes',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='voters',
+            field=models.ManyToManyField(blank=True, related_name='voted_comments', through='profiles.CommentVote', to=settings.AUTH_USER_MODEL, verbose_name='Оценки'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# BRIN-индексы по timestamp для append-only таблиц (только PostgreSQL)
+
+from django.db import migrations
+
+
+BRIN_INDEXES = (
+    ('profiles_useractivity', 'useractivity_ts_brin'),
+    ('profiles_viewedprofile', 'viewedprofile_ts_brin'),
+    ('profiles_sessionlog', 'sessionlog_ts_brin'),
+)
+
+
+def create_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, name in BRIN_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+            f'USING BRIN (timestamp) WITH (pages_per_range = 32)'
+        )
+
+
+def drop_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _table, name in BRIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0009_commentvote'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_brin_indexes, drop_brin_indexes),
+    ]
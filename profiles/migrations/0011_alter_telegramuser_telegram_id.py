@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-15 22:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0010_brin_timestamp_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='telegramuser',
+            name='telegram_id',
+            field=models.BigIntegerField(unique=True, verbose_name='ID Telegram'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-15 22:51
+
+import profiles.storages
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0011_alter_telegramuser_telegram_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photo',
+            name='image',
+            field=models.ImageField(storage=profiles.storages.ContentAddressedStorage(), upload_to=profiles.storages.content_addressed_upload_to, verbose_name='Фото'),
+        ),
+    ]
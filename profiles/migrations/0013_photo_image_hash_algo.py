@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-15 23:05
+
+from django.db import migrations, models
+
+
+def mark_average_hashes(apps, schema_editor):
+    Photo = apps.get_model('profiles', 'Photo')
+    Photo.objects.filter(image_hash__isnull=False).update(image_hash_algo='ahash')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0012_photo_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='image_hash_algo',
+            field=models.CharField(choices=[('ahash', 'average hash'), ('phash', 'pHash (DCT)')], default='phash', help_text='Сравниваются только хеши одного алгоритма; ahash пересчитываются фоново', max_length=8, verbose_name='Алгоритм хеша'),
+        ),
+        migrations.RunPython(mark_average_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.7 on 2026-10-15 23:06
+
+from django.db import migrations, models
+
+
+def fill_image_hash_u64(apps, schema_editor):
+    Photo = apps.get_model('profiles', 'Photo')
+    photos = []
+    for photo in Photo.objects.filter(image_hash__isnull=False).only('id', 'image_hash').iterator(chunk_size=2000):
+        if len(photo.image_hash) != 16:
+            continue
+        try:
+            value = int(photo.image_hash, 16)
+        except ValueError:
+            continue
+        photo.image_hash_u64 = value - (1 << 64) if value >= 1 << 63 else value
+        photos.append(photo)
+    Photo.objects.bulk_update(photos, ['image_hash_u64'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0013_photo_image_hash_algo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='image_hash_u64',
+            field=models.BigIntegerField(blank=True, help_text='64-битный image_hash как знаковое BIGINT для векторного сравнения по Хэммингу', null=True, verbose_name='Хеш как число'),
+        ),
+        migrations.RunPython(fill_image_hash_u64, migrations.RunPython.noop),
+    ]
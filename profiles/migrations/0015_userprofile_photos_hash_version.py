@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-15 23:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0014_photo_image_hash_u64'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='photos_hash_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Увеличивается при изменении фото; ключ кэша хешей галереи', verbose_name='Версия хешей фото'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.7 on 2026-10-15 23:23
+
+import re
+
+from django.db import migrations, models
+
+
+CONTENT_ADDRESSED_NAME = re.compile(r'^photos/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(?:\.[^/]*)?$')
+
+
+def fill_content_sha256(apps, schema_editor):
+    # Файлы в хранилище с адресацией по содержимому уже названы своим
+    # sha256 - берём его из имени, не читая файлы
+    Photo = apps.get_model('profiles', 'Photo')
+    photos = []
+    for photo in Photo.objects.filter(image__startswith='photos/').only('id', 'image').iterator(chunk_size=2000):
+        match = CONTENT_ADDRESSED_NAME.match(photo.image.name)
+        if match:
+            photo.content_sha256 = match.group(1)
+            photos.append(photo)
+    Photo.objects.bulk_update(photos, ['content_sha256'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0015_userprofile_photos_hash_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='content_sha256',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Хеш байтов файла: точные дубликаты находятся без перцептивного сравнения', max_length=64, verbose_name='SHA-256 файла'),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='image_hash_u64',
+            field=models.BigIntegerField(blank=True, db_index=True, help_text='64-битный image_hash как знаковое BIGINT для векторного сравнения по Хэммингу', null=True, verbose_name='Хеш как число'),
+        ),
+        migrations.RunPython(fill_content_sha256, migrations.RunPython.noop),
+    ]
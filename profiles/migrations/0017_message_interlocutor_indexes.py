@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-15 23:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0016_photo_content_sha256'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'is_deleted_by_sender', 'timestamp'], name='profiles_me_sender__91fe2c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['receiver', 'is_deleted_by_receiver', 'timestamp'], name='profiles_me_receive_0f73cb_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-15 23:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('profiles', '0017_message_interlocutor_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['is_read', 'created_at'], name='profiles_no_is_read_6f4df9_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.7 on 2026-10-15 23:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+TARGET_FIELDS = ('recipient', 'sender', 'notification_type', 'content_type', 'object_id')
+
+
+def delete_duplicate_notifications(apps, schema_editor):
+    # Перед созданием ограничения оставляем самое раннее из дублей
+    Notification = apps.get_model('profiles', 'Notification')
+    duplicates = (
+        # NULL в sender/content_type ограничению не мешает (NULL != NULL)
+        Notification.objects.filter(object_id__isnull=False, sender__isnull=False, content_type__isnull=False)
+        .values(*TARGET_FIELDS)
+        .annotate(count=Count('id'), keep_id=Min('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for group in duplicates:
+        keep_id = group.pop('keep_id')
+        group.pop('count')
+        Notification.objects.filter(**group).exclude(id=keep_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('profiles', '0018_notification_cleanup_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_notifications, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('object_id__isnull', False)), fields=('recipient', 'sender', 'notification_type', 'content_type', 'object_id'), name='uniq_notif_target'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.7 on 2026-10-15 23:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+# Подтип по тексту уведомлений, созданных до появления колонки
+SUBTYPE_MARKERS = (
+    ('LIKE_NEW', 'выразил'),
+    ('LIKE_MUTUAL', 'взаимная симпатия'),
+)
+
+
+def backfill_subtype(apps, schema_editor):
+    Notification = apps.get_model('profiles', 'Notification')
+    for subtype, marker in SUBTYPE_MARKERS:
+        Notification.objects.filter(notification_type='LIKE', message__contains=marker).update(subtype=subtype)
+
+    # Перед созданием ограничения оставляем самое раннее из дублей
+    duplicates = (
+        Notification.objects.exclude(subtype='')
+        .filter(sender__isnull=False)
+        .values('recipient', 'sender', 'subtype')
+        .annotate(count=Count('id'), keep_id=Min('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for group in duplicates:
+        keep_id = group.pop('keep_id')
+        group.pop('count')
+        Notification.objects.filter(**group).exclude(id=keep_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('profiles', '0019_notification_unique_target'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='subtype',
+            field=models.CharField(blank=True, choices=[('LIKE_NEW', 'Новая симпатия'), ('LIKE_MUTUAL', 'Взаимная симпатия')], default='', max_length=16, verbose_name='Подтип'),
+        ),
+        migrations.RunPython(backfill_subtype, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('subtype', ''), _negated=True), fields=('recipient', 'sender', 'subtype'), name='uniq_notif_subtype'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-15 23:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0020_notification_subtype'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usersession',
+            index=models.Index(condition=models.Q(('logout_time__isnull', True)), fields=['user', '-login_time'], name='usersession_open_idx'),
+        ),
+    ]
@@ -1,18 +1,23 @@
 
+import re
 import uuid
-from django.db import models
+from django.db import NotSupportedError, models
+from django.db.models.functions import Substr
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.urls import reverse
 from django.utils.text import slugify
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.db.models.signals import post_save
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from datetime import date
 from pytils.translit import slugify as pytils_slugify
 
+from profiles.storages import content_addressed_storage, content_addressed_upload_to, content_sha256
+
 
 # ==============================================================================
 # ПРОФИЛЬ ПОЛЬЗОВАТЕЛЯ
@@ -187,6 +192,12 @@ class UserProfile(models.Model):
         auto_now=True,
         verbose_name="Дата обновления профиля"
     )
+    photos_hash_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Версия хешей фото",
+        help_text="Увеличивается при изменении фото; ключ кэша хешей галереи"
+    )
 
     class Meta:
         verbose_name = "Профиль пользователя"
@@ -334,6 +345,9 @@ class Message(models.Model):
         indexes = [
             models.Index(fields=['sender', 'receiver', 'timestamp']),
             models.Index(fields=['receiver', 'is_read']),
+            # Списки собеседников: не удалённые сообщения пользователя
+            models.Index(fields=['sender', 'is_deleted_by_sender', 'timestamp']),
+            models.Index(fields=['receiver', 'is_deleted_by_receiver', 'timestamp']),
         ]
 
     def __str__(self):
@@ -366,7 +380,8 @@ class Photo(models.Model):
         verbose_name="Профиль пользователя"
     )
     image = models.ImageField(
-        upload_to='photos/%Y/%m/%d/',
+        upload_to=content_addressed_upload_to,
+        storage=content_addressed_storage,
         verbose_name="Фото"
     )
     uploaded_at = models.DateTimeField(
@@ -382,6 +397,39 @@ class Photo(models.Model):
         help_text="Perceptual hash для проверки на дубликаты"
     )
 
+    HASH_ALGO_AVERAGE = 'ahash'
+    HASH_ALGO_PHASH = 'phash'
+    HASH_ALGO_CHOICES = [
+        (HASH_ALGO_AVERAGE, 'average hash'),
+        (HASH_ALGO_PHASH, 'pHash (DCT)'),
+    ]
+
+    image_hash_algo = models.CharField(
+        max_length=8,
+        choices=HASH_ALGO_CHOICES,
+        default=HASH_ALGO_PHASH,
+        verbose_name="Алгоритм хеша",
+        help_text="Сравниваются только хеши одного алгоритма; ahash пересчитываются фоново"
+    )
+
+    image_hash_u64 = models.BigIntegerField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name="Хеш как число",
+        help_text="64-битный image_hash как знаковое BIGINT для векторного сравнения по Хэммингу"
+    )
+    content_sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        db_index=True,
+        verbose_name="SHA-256 файла",
+        help_text="Хеш байтов файла: точные дубликаты находятся без перцептивного сравнения"
+    )
+
+    HASH_HEX_LENGTH = 16
+
     class Meta:
         verbose_name = "Фотография"
         verbose_name_plural = "Фотографии"
@@ -389,9 +437,110 @@ class Photo(models.Model):
 
     def __str__(self):
         return f'Фото пользователя {self.user_profile.user.username}'
+
+    @classmethod
+    def hash_to_int64(cls, image_hash):
+        """
+        64-битный hex-хеш как знаковое целое для BigIntegerField
+        (None для пустых, нестандартных по длине и не-hex хешей)
+        """
+        if not image_hash or len(image_hash) != cls.HASH_HEX_LENGTH:
+            return None
+        try:
+            value = int(image_hash, 16)
+        except ValueError:
+            return None
+        return value - (1 << 64) if value >= 1 << 63 else value
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает хеш из БД: сигналы индекса хешей сравнивают его с новым
+        и не трогают индекс, если хеш не менялся
+        """
+        instance = super().from_db(db, field_names, values)
+        row = dict(zip(field_names, values))
+        if 'image_hash_u64' in row and 'image_hash_algo' in row:
+            instance._old_hash = (row['image_hash_u64'], row['image_hash_algo'])
+        return instance
+
+    @cached_property
+    def image_hash_int(self):
+        """image_hash как целое число (для Хэмминга через int.bit_count)"""
+        return int(self.image_hash, 16) if self.image_hash else None
+
+    def save(self, *args, **kwargs):
+        """
+        Синхронизирует image_hash_u64 с image_hash;
+        для нового файла считает content_sha256 (его же использует
+        upload_to, так что файл читается один раз)
+        """
+        self.image_hash_u64 = self.hash_to_int64(self.image_hash)
+        if self.image and not self.image._committed:
+            self.content_sha256 = content_sha256(self.image)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            extra = set()
+            if 'image_hash' in update_fields:
+                extra.add('image_hash_u64')
+            if 'image' in update_fields:
+                extra.add('content_sha256')
+            if extra:
+                kwargs['update_fields'] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
 # ==============================================================================
 # УВЕДОМЛЕНИЯ
 # ==============================================================================
+class NotificationQuerySet(models.QuerySet):
+    """QuerySet уведомлений с готовыми наборами подгрузки связей"""
+
+    def with_sender(self):
+        """Отправитель и его профиль одним JOIN (для списков уведомлений)"""
+        return self.select_related('sender', 'sender__userprofile')
+
+    def with_targets(self):
+        """
+        Связанные объекты GenericForeignKey: один запрос
+        на каждый ContentType вместо запроса на уведомление.
+        """
+        return self.select_related('content_type').prefetch_related('target')
+
+    def fan_out(self, sender, recipients, notification_type, message, target=None, batch_size=500):
+        """
+        Одно уведомление многим получателям: bulk INSERT вместо create() в цикле.
+
+        Уже существующие уведомления о той же цели (повтор задачи) отсекает
+        ограничение uniq_notif_target: вставка идёт с ignore_conflicts,
+        поэтому у возвращённых объектов нет pk.
+
+        post_save не срабатывает, поэтому кэш счётчиков непрочитанных
+        сбрасывается здесь (по списку получателей); прочие реакции
+        (websocket и т.п.) вызывающий код должен инициировать сам.
+        """
+        from profiles.services.notification_cache import invalidate_unread_count
+
+        recipients = list(recipients)
+        content_type = ContentType.objects.get_for_model(target) if target is not None else None
+        object_id = target.pk if target is not None else None
+        created = self.bulk_create(
+            [
+                Notification(
+                    recipient=recipient,
+                    sender=sender,
+                    message=message,
+                    notification_type=notification_type,
+                    content_type=content_type,
+                    object_id=object_id,
+                )
+                for recipient in recipients
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+        invalidate_unread_count(*(recipient.pk for recipient in recipients))
+        return created
+
+
 class Notification(models.Model):
     """Уведомления для пользователей"""
 
@@ -403,6 +552,12 @@ class Notification(models.Model):
         ('SYSTEM', 'Системное'),
     ]
 
+    # Подтип для поиска дублей по индексу вместо LIKE '%...%' по тексту
+    SUBTYPES = [
+        ('LIKE_NEW', 'Новая симпатия'),
+        ('LIKE_MUTUAL', 'Взаимная симпатия'),
+    ]
+
     recipient = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -427,6 +582,13 @@ class Notification(models.Model):
         verbose_name="Тип уведомления",
         db_index=True
     )
+    subtype = models.CharField(
+        max_length=16,
+        choices=SUBTYPES,
+        blank=True,
+        default='',
+        verbose_name="Подтип"
+    )
     is_read = models.BooleanField(
         default=False,
         verbose_name="Прочитано",
@@ -454,25 +616,66 @@ class Notification(models.Model):
     )
     target = GenericForeignKey('content_type', 'object_id')   
 
+    objects = NotificationQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Уведомление"
         verbose_name_plural = "Уведомления"
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['recipient', 'is_read', '-created_at']),
+            models.Index(fields=['sender', 'recipient', '-created_at']),
+            # Частичный индекс: счётчик непрочитанных сканирует только непрочитанные
+            models.Index(
+                fields=['recipient', '-created_at'],
+                condition=models.Q(is_read=False),
+                name='notif_unread_idx',
+            ),
+            # Очистка старых прочитанных уведомлений (cleanup_old_notifications)
+            models.Index(fields=['is_read', 'created_at']),
+        ]
+        constraints = [
+            # Одно уведомление на событие (например, на сообщение): защита
+            # от дублей на уровне БД, вставка через bulk_create(ignore_conflicts=True)
+            models.UniqueConstraint(
+                fields=['recipient', 'sender', 'notification_type', 'content_type', 'object_id'],
+                condition=models.Q(object_id__isnull=False),
+                name='uniq_notif_target',
+            ),
+            # Одно уведомление о симпатии/матче на пару: индекс этого
+            # ограничения служит и для проверки дублей по subtype
+            models.UniqueConstraint(
+                fields=['recipient', 'sender', 'subtype'],
+                condition=~models.Q(subtype=''),
+                name='uniq_notif_subtype',
+            ),
         ]
 
     def __str__(self):
         return f'Уведомление для {self.recipient.username} - {self.notification_type}'
 
+    def _get_sender_profile(self):
+        """
+        Профиль отправителя без лишних запросов.
+
+        Если профиль уже подгружен (with_sender / select_related), берём его
+        из кэша связей; иначе — один запрос, результат кэшируется Django.
+        """
+        if self.sender_id is None:
+            return None
+        sender = self.sender
+        if 'userprofile' in sender._state.fields_cache:
+            return sender._state.fields_cache['userprofile']
+        return getattr(sender, 'userprofile', None)
+
     def get_sender_photo(self):
         """Получить URL фото отправителя с правильным fallback"""
-        if self.sender:
+        profile = self._get_sender_profile()
+        if profile is not None:
             try:
-                if hasattr(self.sender, 'userprofile') and self.sender.userprofile:
-                    if self.sender.userprofile.photo:
-                        if 'default-avatar' not in str(self.sender.userprofile.photo):
-                            return self.sender.userprofile.photo.url
+                photo = profile.photo
+                if photo and 'default-avatar' not in str(photo):
+                    return photo.url
             except Exception:
                 pass
         
@@ -495,21 +698,70 @@ class Notification(models.Model):
     
     def has_sender_profile(self):
         """Проверка наличия профиля у отправителя"""
-        if not self.sender:
-            return False
-        return hasattr(self.sender, 'userprofile') and self.sender.userprofile is not None
+        return self._get_sender_profile() is not None
 
     @property
     def link(self):
         """Возвращает ссылку для перехода из уведомления"""
-        if self.notification_type == 'LIKE' and self.sender:
-            return reverse('profiles:profile_detail', kwargs={'pk': self.sender.pk})
-        elif self.notification_type == 'MESSAGE' and self.sender:
-            return reverse('profiles:conversation_detail', kwargs={'pk': self.sender.pk})
+        template = _get_notification_link_templates().get(self.notification_type)
+        if template and self.sender_id:
+            return template.format(pk=self.sender_id)
         return '#'
+
+
+# Шаблоны ссылок уведомлений: reverse() один раз на процесс,
+# дальше только str.format (без обхода URL-резолвера на каждое уведомление)
+_LINK_PK_PLACEHOLDER = 987654321
+_NOTIFICATION_LINK_TEMPLATES = None
+
+
+def _get_notification_link_templates():
+    global _NOTIFICATION_LINK_TEMPLATES
+    if _NOTIFICATION_LINK_TEMPLATES is None:
+        placeholder = str(_LINK_PK_PLACEHOLDER)
+        _NOTIFICATION_LINK_TEMPLATES = {
+            notification_type: reverse(url_name, kwargs={'pk': _LINK_PK_PLACEHOLDER}).replace(placeholder, '{pk}')
+            for notification_type, url_name in (
+                ('LIKE', 'profiles:profile_detail'),
+                ('MESSAGE', 'profiles:conversation_detail'),
+            )
+        }
+    return _NOTIFICATION_LINK_TEMPLATES
 # ==============================================================================
 # БЛОГ
 # ==============================================================================
+class PostQuerySet(models.QuerySet):
+    """QuerySet статей блога"""
+
+    # Сколько символов content достаточно для анонса в списке
+    PREVIEW_LENGTH = 2000
+
+    def for_list(self):
+        """
+        Статьи для списков: полный content не загружается.
+
+        Для анонса в content_preview отдаётся только начало текста
+        (шаблон всё равно обрезает его через truncatewords_html);
+        в шаблоне используется Post.preview_html, обрезанный по границе тега.
+        """
+        return self.defer('content').select_related('author').annotate(
+            content_preview=Substr('content', 1, self.PREVIEW_LENGTH)
+        )
+
+    def bulk_create_with_slugs(self, posts, batch_size=500):
+        """
+        Массовое создание статей со slug, посчитанными заранее.
+
+        Один многострочный INSERT на batch_size статей вместо save() на каждую.
+        Внимание: bulk_create не вызывает Post.save() и сигналы
+        pre_save/post_save — для импорта/наполнения это допустимо.
+        """
+        for post in posts:
+            if not post.slug:
+                post.slug = Post.build_slug(post.title)
+        return self.bulk_create(posts, batch_size=batch_size)
+
+
 class Post(models.Model):
     """Статьи блога"""
 
@@ -553,6 +805,8 @@ class Post(models.Model):
         db_index=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Статья"
@@ -568,17 +822,68 @@ class Post(models.Model):
         """Возвращает канонический URL для статьи"""
         return reverse('profiles:post_detail', args=[self.slug])
 
+    # Незакрытые на конце тег (<a href="...) и HTML-сущность (&nbs)
+    _TRAILING_PARTIAL_HTML = re.compile(r'(<[^>]*|&#?\w*)$')
+
+    @property
+    def preview_html(self):
+        """
+        Начало content для анонса (content_preview из for_list)
+
+        Substr режет HTML по символам и может попасть внутрь тега или
+        сущности - такой хвост отбрасывается, а незакрытые элементы
+        закроет truncatewords_html в шаблоне.
+        """
+        preview = getattr(self, 'content_preview', None)
+        if preview is None:
+            return self.content
+        if len(preview) < PostQuerySet.PREVIEW_LENGTH:
+            return preview
+        return self._TRAILING_PARTIAL_HTML.sub('', preview)
+
+    @staticmethod
+    def build_slug(title):
+        """Slug из заголовка (транслитерация pytils с запасным slugify)"""
+        try:
+            return pytils_slugify(title)
+        except Exception:
+            return slugify(title)
+
     def save(self, *args, **kwargs):
         """При сохранении автоматически создает slug из заголовка"""
         if not self.slug:
-            try:
-                self.slug = pytils_slugify(self.title)
-            except Exception:
-                self.slug = slugify(self.title)
+            self.slug = self.build_slug(self.title)
         super().save(*args, **kwargs)
 # ==============================================================================
 # КОММЕНТАРИИ
 # ==============================================================================
+class CommentQuerySet(models.QuerySet):
+    """QuerySet комментариев с агрегатами для вывода списков"""
+
+    def with_like_counts(self):
+        """Количество лайков/дизлайков одним GROUP BY вместо COUNT на комментарий"""
+        return self.annotate(
+            likes_count=models.Count(
+                'votes', filter=models.Q(votes__vote_type=CommentVote.LIKE)
+            ),
+            dislikes_count=models.Count(
+                'votes', filter=models.Q(votes__vote_type=CommentVote.DISLIKE)
+            ),
+        )
+
+    def with_visible_replies(self):
+        """Видимые ответы одним запросом на всю страницу (см. Comment.visible_replies)"""
+        return self.prefetch_related(
+            models.Prefetch(
+                'replies',
+                queryset=Comment.objects.filter(active=True)
+                .exclude(author__is_superuser=True)
+                .select_related('author', 'author__userprofile'),
+                to_attr='_visible_replies',
+            )
+        )
+
+
 class Comment(models.Model):
     """Комментарии к статьям"""
 
@@ -620,19 +925,16 @@ class Comment(models.Model):
         related_name='replies',
         verbose_name="Родительский комментарий"
     )
-    likes = models.ManyToManyField(
-        User,
-        related_name='comment_likes',
-        blank=True,
-        verbose_name="Лайки"
-    )
-    dislikes = models.ManyToManyField(
+    voters = models.ManyToManyField(
         User,
-        related_name='comment_dislikes',
+        through='CommentVote',
+        related_name='voted_comments',
         blank=True,
-        verbose_name="Дизлайки"
+        verbose_name="Оценки"
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['created_at']
         verbose_name = "Комментарий"
@@ -646,17 +948,87 @@ class Comment(models.Model):
         return f"Комментарий от {self.author} к статье '{self.post}'"
 
     def total_likes(self):
-        """Количество лайков"""
-        return self.likes.count()
+        """Количество лайков (из аннотации with_like_counts, если есть)"""
+        if hasattr(self, 'likes_count'):
+            return self.likes_count
+        return self.votes.filter(vote_type=CommentVote.LIKE).count()
 
     def total_dislikes(self):
-        """Количество дизлайков"""
-        return self.dislikes.count()
+        """Количество дизлайков (из аннотации with_like_counts, если есть)"""
+        if hasattr(self, 'dislikes_count'):
+            return self.dislikes_count
+        return self.votes.filter(vote_type=CommentVote.DISLIKE).count()
+
+    def toggle_vote(self, user, vote_type):
+        """
+        Поставить/снять оценку.
+
+        Повторная такая же оценка снимает её, противоположная —
+        заменяется одним UPDATE в той же строке.
+        """
+        vote = self.votes.filter(user=user).first()
+        if vote is None:
+            CommentVote.objects.create(comment=self, user=user, vote_type=vote_type)
+        elif vote.vote_type == vote_type:
+            vote.delete()
+        else:
+            vote.vote_type = vote_type
+            vote.save(update_fields=['vote_type'])
 
     @property
     def visible_replies(self):
         """Возвращает только активные ответы"""
+        if hasattr(self, '_visible_replies'):
+            return self._visible_replies
         return self.replies.filter(active=True).exclude(author__is_superuser=True)
+
+
+class CommentVote(models.Model):
+    """Оценка комментария (лайк/дизлайк) — одна строка на пару комментарий/пользователь"""
+
+    LIKE = 1
+    DISLIKE = -1
+    VOTE_CHOICES = [
+        (LIKE, 'Лайк'),
+        (DISLIKE, 'Дизлайк'),
+    ]
+
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        related_name='votes',
+        verbose_name="Комментарий"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='comment_votes',
+        verbose_name="Пользователь"
+    )
+    vote_type = models.SmallIntegerField(
+        choices=VOTE_CHOICES,
+        verbose_name="Оценка"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата оценки"
+    )
+
+    class Meta:
+        verbose_name = "Оценка комментария"
+        verbose_name_plural = "Оценки комментариев"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['comment', 'user'],
+                name='unique_comment_vote'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['comment', 'vote_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} → {self.comment_id}: {self.get_vote_type_display()}"
 # ==============================================================================
 # ЖАЛОБЫ
 # ==============================================================================
@@ -688,6 +1060,12 @@ class Complaint(models.Model):
         related_name='filed_complaints',
         verbose_name="Подавший жалобу"
     )
+    # Денормализованное имя: список жалоб без JOIN и после удаления пользователя
+    reporter_username = models.CharField(
+        max_length=150,
+        blank=True,
+        verbose_name="Имя подавшего жалобу"
+    )
     reported_user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -726,9 +1104,25 @@ class Complaint(models.Model):
         ]
 
     def __str__(self):
-        reporter_name = self.reporter.username if self.reporter else 'Удалённый пользователь'
+        reporter_name = self.reporter_username or 'Удалённый пользователь'
         return f"Жалоба от {reporter_name} на {self.reported_user} (Статус: {self.get_status_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает статус из БД: сигнал post_save сравнивает его с новым
+        без отдельного SELECT перед сохранением
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._old_status = dict(zip(field_names, values)).get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Запоминает имя подавшего жалобу"""
+        if self.reporter_id and not self.reporter_username:
+            self.reporter_username = self.reporter.username
+        super().save(*args, **kwargs)
+
 
 class ComplaintLog(models.Model):
     """Лог изменений статусов жалоб"""
@@ -766,6 +1160,9 @@ class ComplaintLog(models.Model):
         ordering = ['-changed_at']
         verbose_name = "Лог жалобы"
         verbose_name_plural = "Логи жалоб"
+        indexes = [
+            models.Index(fields=['complaint', '-changed_at']),
+        ]
 
     def __str__(self):
         changer = self.changed_by.username if self.changed_by else 'Система'
@@ -809,6 +1206,47 @@ class StaticPage(models.Model):
 # ==============================================================================
 # MОДЕЛИ ДЛЯ СТАТИСТИКИ
 # ==============================================================================
+class SessionDurationMinutes(models.Func):
+    """
+    Длительность сеанса в минутах (не меньше 1) между двумя датами.
+
+    Выражение для GeneratedField: на PostgreSQL через EXTRACT(EPOCH),
+    на SQLite через strftime('%s') — оба детерминированы и допустимы
+    в генерируемом столбце.
+    """
+    arity = 2
+    output_field = models.IntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f'SessionDurationMinutes (UserSession.duration_minutes) реализован '
+            f'только для PostgreSQL и SQLite, а не для {connection.vendor}'
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # GREATEST игнорирует NULL, поэтому открытый сеанс проверяем явно.
+        # FLOOR: CAST из numeric округляет (150 с дали бы 3 минуты, а не 2,
+        # как целочисленное деление на SQLite)
+        end_sql, end_params = compiler.compile(self.source_expressions[0])
+        start_sql, start_params = compiler.compile(self.source_expressions[1])
+        sql = (
+            f'CASE WHEN {end_sql} IS NULL THEN NULL ELSE '
+            f'GREATEST(1, CAST(FLOOR(EXTRACT(EPOCH FROM ({end_sql} - {start_sql})) / 60) AS INTEGER)) END'
+        )
+        return sql, (*end_params, *end_params, *start_params)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Целые секунды через strftime('%s'): julianday даёт ошибку округления.
+        # MAX с несколькими аргументами возвращает NULL, если есть NULL
+        end_sql, end_params = compiler.compile(self.source_expressions[0])
+        start_sql, start_params = compiler.compile(self.source_expressions[1])
+        sql = (
+            f"MAX(1, (CAST(strftime('%%s', {end_sql}) AS INTEGER)"
+            f" - CAST(strftime('%%s', {start_sql}) AS INTEGER)) / 60)"
+        )
+        return sql, (*end_params, *start_params)
+
+
 class UserSession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sessions')
     login_time = models.DateTimeField(auto_now_add=True)
@@ -821,23 +1259,30 @@ class UserSession(models.Model):
     messages_sent = models.IntegerField(default=0)
     messages_received = models.IntegerField(default=0)
     session_key = models.CharField(max_length=100, blank=True)
-    duration_minutes = models.IntegerField(null=True, blank=True)
+    # Считается базой данных при записи logout_time (NULL, пока сеанс открыт)
+    duration_minutes = models.GeneratedField(
+        expression=SessionDurationMinutes('logout_time', 'login_time'),
+        output_field=models.IntegerField(null=True, blank=True),
+        db_persist=True,
+    )
 
     class Meta:
         ordering = ['-login_time']
         verbose_name = 'Сеанс пользователя'
         verbose_name_plural = 'Сеансы пользователей'
+        indexes = [
+            # Частичный индекс открытых сеансов: закрытие при входе, поиск
+            # активного сеанса (middleware, статистика, выход) - без скана истории
+            models.Index(
+                fields=['user', '-login_time'],
+                condition=models.Q(logout_time__isnull=True),
+                name='usersession_open_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} — {self.login_time.strftime('%d.%m.%Y %H:%M')}"
 
-    def calculate_duration(self):
-        if self.logout_time:
-            delta = self.logout_time - self.login_time
-            self.duration_minutes = int(delta.total_seconds() / 60)
-            return self.duration_minutes
-        return 0
-
     def get_duration_display(self):
         if not self.duration_minutes:
             return "—"
@@ -939,10 +1384,10 @@ class SessionLog(models.Model):
 #  Проверка пользователя для чат-Групы
 #==========================================================================
 class TelegramUser(models.Model):
+    # unique=True уже создаёт индекс - отдельный db_index не нужен
     telegram_id = models.BigIntegerField(
         unique=True,
-        verbose_name="ID Telegram",
-        db_index=True
+        verbose_name="ID Telegram"
     )
     username = models.CharField(
         max_length=255,
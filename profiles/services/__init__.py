@@ -9,7 +9,8 @@ from .photo_verification import (
 )
 from .reverse_image_search import (
     ReverseImageSearchService,
-    check_photo_internet
+    check_photo_internet,
+    check_photos_internet
 )
 from .photo_validator import (
     PhotoValidator,
@@ -24,6 +25,7 @@ __all__ = [
     'find_photo_duplicates',
     'ReverseImageSearchService',
     'check_photo_internet',
+    'check_photos_internet',
     'PhotoValidator',
     'validate_registration_photo',
     'PhotoValidationError',
@@ -1,10 +1,62 @@
+"""
+Взаимные симпатии
+
+Проверка взаимности стоит на горячем пути (каждое сообщение), поэтому
+результат хранится в общем кэше (Redis в продакшене) по паре пользователей
+и сбрасывается сигналами post_save/post_delete у Like после коммита
+транзакции. Раз сброс явный, срок жизни записи - лишь страховка
+от пропущенного сигнала, и он длинный:
+сообщения в переписке, идущие с перерывами, попадают в кэш, а не в БД.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db.models import Q
 
 from profiles.models import Like
 
+logger = logging.getLogger(__name__)
+
+MUTUAL_LIKE_KEY = 'likes:mutual:{low}:{high}'
+MUTUAL_LIKE_TIMEOUT = 24 * 60 * 60  # сутки
+
+
+def _mutual_like_key(user1_id, user2_id):
+    low, high = sorted((user1_id, user2_id))
+    return MUTUAL_LIKE_KEY.format(low=low, high=high)
+
 
 def check_mutual_like(user1, user2):
-    """Проверка взаимной симпатии между двумя пользователями"""
-    return (
-        Like.objects.filter(user_from=user1, user_to=user2).exists() and
-        Like.objects.filter(user_from=user2, user_to=user1).exists()
-    )
\ No newline at end of file
+    """
+    Проверка взаимной симпатии между двумя пользователями
+
+    Оба направления считаются одним запросом: пара (user_from, user_to)
+    уникальна (unique_like), поэтому взаимность - это ровно две строки.
+    """
+    key = _mutual_like_key(user1.pk, user2.pk)
+    try:
+        mutual = cache.get(key)
+    except Exception as e:
+        # Кэш недоступен - отвечаем из БД
+        logger.error(f'Error reading mutual like cache: {e}')
+        mutual = None
+    if mutual is not None:
+        return mutual
+
+    mutual = Like.objects.filter(
+        Q(user_from=user1, user_to=user2) |
+        Q(user_from=user2, user_to=user1)
+    ).count() == 2
+    try:
+        cache.set(key, mutual, MUTUAL_LIKE_TIMEOUT)
+    except Exception as e:
+        logger.error(f'Error writing mutual like cache: {e}')
+    return mutual
+
+
+def invalidate_mutual_like(user1_id, user2_id):
+    """Сбросить кэш взаимности пары пользователей"""
+    try:
+        cache.delete(_mutual_like_key(user1_id, user2_id))
+    except Exception as e:
+        logger.error(f'Error invalidating mutual like cache: {e}')
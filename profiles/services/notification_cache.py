@@ -0,0 +1,39 @@
+"""
+Кэш счётчика непрочитанных уведомлений
+
+Счётчик выводится на каждой странице (context processor), поэтому
+хранится в общем кэше (Redis в продакшене) и сбрасывается по событиям:
+сигналы post_save/post_delete у Notification и явный вызов
+invalidate_unread_count() после массовых update()/bulk_create().
+"""
+import logging
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+UNREAD_KEY = 'notif:unread:{user_id}'
+UNREAD_TIMEOUT = 300  # 5 минут
+
+
+def get_unread_count(user_id) -> int:
+    """Количество непрочитанных уведомлений пользователя (из кэша или БД)"""
+    from profiles.models import Notification
+
+    key = UNREAD_KEY.format(user_id=user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        cache.set(key, count, UNREAD_TIMEOUT)
+    return count
+
+
+def invalidate_unread_count(*user_ids):
+    """Сбросить кэш счётчика для указанных пользователей"""
+    keys = [UNREAD_KEY.format(user_id=user_id) for user_id in set(user_ids) if user_id]
+    if not keys:
+        return
+    try:
+        cache.delete_many(keys)
+    except Exception as e:
+        logger.error(f'Error invalidating unread notification counts: {e}')
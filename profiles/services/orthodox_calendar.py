@@ -12,11 +12,21 @@
 import os
 import json
 import logging
-from datetime import datetime, timedelta, date
+import time
+from bisect import bisect_left
+from calendar import monthrange
+from dataclasses import asdict, dataclass
 from functools import lru_cache
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, date
+from types import MappingProxyType
+from typing import ClassVar, Dict, List, Mapping, NamedTuple, Optional, Tuple
 from django.conf import settings
 
+try:
+    import orjson
+except ImportError:  # необязательная зависимость, есть фолбэк на json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -57,11 +67,205 @@ def calculate_easter_julian(year: int) -> date:
     return easter_new_style
 
 
-# Кэшируем расчет Пасхи для оптимизации
-@lru_cache(maxsize=100)
+# Даты Пасхи на XX-XXI века считаем один раз при импорте
+# (в этом же диапазоне корректна поправка +13 дней)
+_EASTER_CACHE: Dict[int, date] = {
+    year: calculate_easter_julian(year) for year in range(1900, 2100)
+}
+
+
+# (текущая дата, момент по time.monotonic(), до которого она актуальна)
+_today_cache: Tuple[Optional[date], float] = (None, 0.0)
+
+
+def _today() -> date:
+    """
+    Текущая дата с обновлением в полночь
+    
+    Дата пересчитывается один раз в сутки, в остальное время это чтение
+    глобальной переменной и сравнение с time.monotonic().
+    """
+    global _today_cache
+    cached_date, valid_until = _today_cache
+    now = time.monotonic()
+    
+    if cached_date is None or now >= valid_until:
+        current = datetime.now()
+        cached_date = current.date()
+        midnight = datetime.combine(cached_date + timedelta(days=1), datetime.min.time())
+        # Присваивание кортежа атомарно, блокировка не нужна
+        _today_cache = (cached_date, now + (midnight - current).total_seconds())
+    
+    return cached_date
+
+
 def get_easter_date(year: int) -> date:
-    """Получить дату Пасхи с кэшированием"""
-    return calculate_easter_julian(year)
+    """
+    Получить дату Пасхи (из предрассчитанной таблицы)
+    
+    Годы вне таблицы считаются один раз и дописываются в неё же.
+    """
+    easter = _EASTER_CACHE.get(year)
+    if easter is None:
+        easter = _EASTER_CACHE.setdefault(year, calculate_easter_julian(year))
+    return easter
+
+
+class _YearInfo(NamedTuple):
+    """Границы переходящих периодов года (в ординалах date.toordinal())"""
+    easter: date
+    easter_ord: int
+    lent_start_ord: int
+    lent_end_ord: int
+    apostles_start_ord: int
+    apostles_end_ord: int
+    non_fasting_weeks: Tuple[Tuple[int, int], ...]
+
+
+def _build_year_info(year: int) -> _YearInfo:
+    """Вычислить границы постов и сплошных седмиц для года"""
+    easter = get_easter_date(year)
+    easter_ord = easter.toordinal()
+    
+    # Троица на 50-й день после Пасхи, Петров пост - с 8-го дня после неё
+    trinity_ord = easter_ord + 49
+    
+    return _YearInfo(
+        easter=easter,
+        easter_ord=easter_ord,
+        # Великий пост (48 дней до Пасхи)
+        lent_start_ord=easter_ord - 48,
+        lent_end_ord=easter_ord - 1,
+        # Петров пост - до 12 июля (нов. ст.)
+        apostles_start_ord=trinity_ord + 8,
+        apostles_end_ord=date(year, 7, 12).toordinal(),
+        non_fasting_weeks=(
+            # Святки (7 января - 18 января)
+            (date(year, 1, 7).toordinal(), date(year, 1, 18).toordinal()),
+            # Мытаря и фарисея (за 3 недели до Великого поста)
+            (easter_ord - 70, easter_ord - 64),
+            # Сырная (Масленица) (за 1 неделю до Великого поста)
+            (easter_ord - 56, easter_ord - 50),
+            # Пасхальная (Светлая) (неделя после Пасхи)
+            (easter_ord, easter_ord + 7),
+            # Троицкая (неделя после Троицы)
+            (trinity_ord, trinity_ord + 7),
+        ),
+    )
+
+
+@dataclass(slots=True)
+class DayEntry:
+    """
+    День в календаре на месяц
+    
+    Поддерживает и обращение как к словарю (entry['day'], entry.get('holiday')),
+    чтобы код и шаблоны, работавшие со словарями, не пришлось менять.
+    """
+    date: date
+    day: int
+    weekday: int
+    holiday: Optional[Dict]
+    is_weekend: bool
+    is_fast: bool
+    
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+    
+    def as_dict(self) -> Dict:
+        """Словарь для сериализации (например, в JsonResponse)"""
+        return asdict(self)
+
+
+# Карта переходящих праздников (смещение от Пасхи в днях)
+_MOVABLE_HOLIDAY_BASE = {
+    -63: {  # За 9 недель до Пасхи
+        'title': 'Неделя о мытаре и фарисее',
+        'type': 'Подготовительная к Великому посту',
+        'category': 'preparatory',
+    },
+    -56: {
+        'title': 'Неделя о блудном сыне',
+        'type': 'Подготовительная к Великому посту',
+        'category': 'preparatory',
+    },
+    -49: {
+        'title': 'Неделя мясопустная',
+        'type': 'Прощеное воскресенье',
+        'category': 'preparatory',
+    },
+    -48: {
+        'title': 'Начало Великого поста',
+        'type': 'Чистый понедельник',
+        'category': 'great_lent',
+    },
+    -7: {
+        'title': 'Лазарева суббота',
+        'type': 'Воскрешение Лазаря',
+        'category': 'lent',
+    },
+    -1: {
+        'title': 'Вход Господень в Иерусалим',
+        'type': 'Вербное воскресенье',
+        'category': 'major',
+    },
+    0: {
+        'title': 'ПАСХА - ВОСКРЕСЕНИЕ ХРИСТОВО',
+        'type': 'Праздник праздников',
+        'category': 'pascha',
+        'description': 'Светлое Христово Воскресение - главный праздник христианства',
+    },
+    39: {
+        'title': 'Вознесение Господне',
+        'type': 'Двунадесятый праздник',
+        'category': 'major',
+    },
+    49: {
+        'title': 'День Святой Троицы (Пятидесятница)',
+        'type': 'Двунадесятый праздник',
+        'category': 'major',
+    },
+    50: {
+        'title': 'День Святого Духа',
+        'type': 'Понедельник Святого Духа',
+        'category': 'major',
+    },
+}
+
+# Готовые записи переходящих праздников по смещению от Пасхи: общая часть
+# собрана один раз и заморожена, при запросе добавляются только поля,
+# зависящие от даты (пост и отформатированная дата)
+_MOVABLE_HOLIDAYS: Mapping[int, Mapping] = MappingProxyType({
+    delta: MappingProxyType({**holiday, 'movable': True, 'easter_offset': delta})
+    for delta, holiday in _MOVABLE_HOLIDAY_BASE.items()
+})
+
+# Названия воскресных седмиц (смещение от Пасхи в днях)
+_WEEK_NAMES: Mapping[int, str] = MappingProxyType({
+    -63: 'Неделя о мытаре и фарисее',
+    -56: 'Неделя о блудном сыне',
+    -49: 'Неделя мясопустная (Прощеное воскресенье)',
+    -42: '1-я седмица Великого поста',
+    -35: '2-я седмица Великого поста',
+    -28: '3-я седмица Великого поста (Крестопоклонная)',
+    -21: '4-я седмица Великого поста',
+    -14: '5-я седмица Великого поста',
+    -7: '6-я седмица Великого поста (Вход Господень в Иерусалим)',
+    0: 'ПАСХА - ВОСКРЕСЕНИЕ ХРИСТОВО',
+    7: 'Антипасха (Фомина неделя)',
+    14: 'Неделя жен-мироносиц',
+    21: 'Неделя о расслабленном',
+    28: 'Неделя о самарянке',
+    35: 'Неделя о слепом',
+    42: 'Отдание Пасхи',
+    49: 'День Святой Троицы (Пятидесятница)',
+})
 
 
 # ============================================================================
@@ -73,12 +277,42 @@ class OrthodoxCalendarService:
     Сервис для работы с православным календарем
     """
     
+    # Однодневные праздничные посты (месяц, день)
+    _SINGLE_DAY_FASTS: ClassVar[frozenset] = frozenset({
+        (1, 18),   # 18 января
+        (9, 11),   # 11 сентября
+        (9, 27),   # 27 сентября
+    })
+    
+    # Категории праздников для списка ближайших
+    SIGNIFICANT_CATEGORIES: ClassVar[frozenset] = frozenset({'pascha', 'great', 'major'})
+    
+    # Предел кэша праздников по датам (~11 лет по дню)
+    HOLIDAY_CACHE_SIZE = 4096
+    
     def __init__(self):
         """Инициализация сервиса"""
-        self.calendar_data = self._load_calendar_data()
-        self._easter_cache = {}
+        # Данные и индексы общие для всех экземпляров процесса
+        (
+            self.calendar_data,
+            self._fixed_holidays,
+            self._saint_days,
+            self._fasting_periods,
+        ) = _load_calendar_tables()
+        self._year_cache: Dict[int, _YearInfo] = {}
+        self._fasting_bitmaps: Dict[int, Tuple[int, int]] = {}
+        self._holiday_cache: Dict[date, Dict] = {}
+        self._significant_days_cache: Dict[int, List[int]] = {}
+    
+    def _year(self, year: int) -> _YearInfo:
+        """Границы периодов года (считаются один раз на год)"""
+        info = self._year_cache.get(year)
+        if info is None:
+            info = self._year_cache[year] = _build_year_info(year)
+        return info
     
-    def _load_calendar_data(self) -> Dict:
+    @staticmethod
+    def _load_calendar_data() -> Dict:
         """
         Загрузка данных из JSON файла
         
@@ -88,19 +322,22 @@ class OrthodoxCalendarService:
         json_path = os.path.join(settings.BASE_DIR, 'data', 'orthodox_calendar.json')
         
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                logger.info("Календарь успешно загружен")
-                return data
+            with open(json_path, 'rb') as f:
+                raw = f.read()
+            # orjson разбирает байты за один проход на C; его JSONDecodeError
+            # наследует json.JSONDecodeError, так что обработка ошибок общая
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            logger.info("Календарь успешно загружен")
+            return data
         except FileNotFoundError:
             logger.error(f"Файл календаря не найден: {json_path}")
-            return self._get_empty_calendar()
+            return OrthodoxCalendarService._get_empty_calendar()
         except json.JSONDecodeError as e:
             logger.error(f"Ошибка парсинга JSON календаря: {e}")
-            return self._get_empty_calendar()
+            return OrthodoxCalendarService._get_empty_calendar()
         except Exception as e:
             logger.error(f"Неожиданная ошибка загрузки календаря: {e}", exc_info=True)
-            return self._get_empty_calendar()
+            return OrthodoxCalendarService._get_empty_calendar()
     
     @staticmethod
     def _get_empty_calendar() -> Dict:
@@ -114,41 +351,148 @@ class OrthodoxCalendarService:
             'metadata': {}
         }
     
+    @staticmethod
+    def _build_date_indexes(calendar_data: Dict) -> Tuple[Dict, Dict]:
+        """
+        Построить индексы неподвижных праздников и дней святых
+        по целочисленному ключу ММДД (месяц * 100 + день)
+        
+        Данные календаря статичны, поэтому индексы строятся один раз
+        при создании сервиса, а поиск по дате сводится к одному обращению
+        к словарю вместо перебора списка праздников.
+        
+        Returns:
+            Tuple[Dict, Dict]: (неподвижные праздники, дни святых)
+        """
+        def parse_key(value) -> Optional[int]:
+            try:
+                month, day = map(int, value.split('-'))
+            except (AttributeError, ValueError):
+                return None
+            return month * 100 + day
+        
+        fixed_holidays = {}
+        for holiday in calendar_data.get('holidays', []):
+            if holiday.get('movable'):
+                continue
+            key = parse_key(holiday.get('date'))
+            if key is not None:
+                # Как и при линейном поиске, побеждает первая запись на дату
+                fixed_holidays.setdefault(key, holiday)
+        
+        saint_days = {}
+        for date_str, saint_name in calendar_data.get('saint_days', {}).items():
+            key = parse_key(date_str)
+            if key is not None:
+                saint_days[key] = saint_name
+        
+        return fixed_holidays, saint_days
+    
+    @staticmethod
+    def _parse_fasting_periods(calendar_data: Dict) -> Tuple[Tuple[int, int, int, int], ...]:
+        """
+        Разобрать неподвижные многодневные посты в кортежи
+        (месяц начала, день начала, месяц конца, день конца)
+        
+        Переходящие посты (start_variable) считаются отдельно от Пасхи.
+        """
+        periods = []
+        for period in calendar_data.get('fasting_periods', []):
+            if period.get('start_variable'):
+                continue
+            
+            start_date = period.get('start_date')
+            end_date = period.get('end_date')
+            if not (start_date and end_date):
+                continue
+            
+            try:
+                start_month, start_day = map(int, start_date.split('-'))
+                end_month, end_day = map(int, end_date.split('-'))
+            except ValueError:
+                logger.warning(f"Некорректные даты поста в календаре: {period.get('name')}")
+                continue
+            
+            periods.append((start_month, start_day, end_month, end_day))
+        
+        return tuple(periods)
+    
     # ========================================================================
     # РАБОТА С ПРАЗДНИКАМИ
     # ========================================================================
     
-    def get_holiday_by_date(self, target_date: date) -> Optional[Dict]:
+    def get_holiday_by_date(self, target_date: date, is_fast: Optional[bool] = None) -> Optional[Dict]:
         """
         Получить информацию о празднике на конкретную дату
         
         Args:
             target_date: Дата для поиска
+            is_fast: Уже известный признак поста (иначе вычисляется)
             
         Returns:
             Dict: Информация о празднике или None
+        
+        Результат зависит только от даты, поэтому кэшируется; наружу
+        отдаётся копия, чтобы вызывающий код не испортил кэш.
         """
-        date_str = target_date.strftime('%m-%d')
+        cached = self._holiday_cache.get(target_date)
+        if cached is None:
+            cached = self._resolve_holiday(target_date, is_fast)
+            if len(self._holiday_cache) >= self.HOLIDAY_CACHE_SIZE:
+                self._holiday_cache.clear()
+            self._holiday_cache[target_date] = cached
+        return dict(cached)
+    
+    def _resolve_holiday(self, target_date: date, is_fast: Optional[bool] = None) -> Dict:
+        """Определить праздник на дату (без кэша)"""
+        key = target_date.month * 100 + target_date.day
         
         # 1. Проверяем неподвижные праздники
-        for holiday in self.calendar_data.get('holidays', []):
-            if holiday.get('date') == date_str and not holiday.get('movable'):
-                return self._enrich_holiday(holiday, target_date)
+        holiday = self._fixed_holidays.get(key)
+        if holiday:
+            return self._enrich_holiday(holiday, target_date, is_fast)
         
         # 2. Проверяем переходящие праздники
-        movable_holiday = self._get_movable_holiday(target_date)
+        movable_holiday = self._get_movable_holiday(target_date, is_fast)
         if movable_holiday:
             return movable_holiday
         
         # 3. Проверяем дни святых
-        saint_day = self.calendar_data.get('saint_days', {}).get(date_str)
+        saint_day = self._saint_days.get(key)
         if saint_day:
-            return self._create_saint_day(saint_day, target_date)
+            return self._create_saint_day(saint_day, target_date, is_fast)
         
         # 4. Обычный день
-        return self._create_regular_day(target_date)
+        return self._create_regular_day(target_date, is_fast)
+    
+    def _holiday_category(self, target_date: date) -> str:
+        """
+        Категория праздника на дату без сборки полного словаря
+        
+        Тот же порядок приоритетов, что и в _resolve_holiday, но без
+        поста, седмицы и форматирования даты - для фильтрации дней.
+        """
+        key = target_date.month * 100 + target_date.day
+        
+        holiday = self._fixed_holidays.get(key)
+        if holiday:
+            return holiday.get('category')
+        
+        delta = target_date.toordinal() - self._year(target_date.year).easter_ord
+        movable_holiday = _MOVABLE_HOLIDAYS.get(delta)
+        if movable_holiday is not None:
+            return movable_holiday['category']
+        
+        if self._saint_days.get(key):
+            return 'saint'
+        
+        return 'regular'
+    
+    def _fast_flag(self, target_date: date, is_fast: Optional[bool]) -> bool:
+        """Признак поста: переданный заранее или вычисленный"""
+        return self.is_fasting_day(target_date) if is_fast is None else is_fast
     
-    def _enrich_holiday(self, holiday: Dict, target_date: date) -> Dict:
+    def _enrich_holiday(self, holiday: Dict, target_date: date, is_fast: Optional[bool] = None) -> Dict:
         """
         Обогатить информацию о празднике дополнительными данными
         
@@ -161,12 +505,12 @@ class OrthodoxCalendarService:
         """
         return {
             **holiday,
-            'fast': self.is_fasting_day(target_date),
+            'fast': self._fast_flag(target_date, is_fast),
             'week_info': self._get_week_info(target_date),
             'formatted_date': target_date.strftime('%d %B %Y'),
         }
     
-    def _get_movable_holiday(self, target_date: date) -> Optional[Dict]:
+    def _get_movable_holiday(self, target_date: date, is_fast: Optional[bool] = None) -> Optional[Dict]:
         """
         Получить переходящий праздник для даты
         
@@ -176,98 +520,37 @@ class OrthodoxCalendarService:
         Returns:
             Dict: Информация о празднике или None
         """
-        easter = get_easter_date(target_date.year)
-        
         # Вычисляем смещение от Пасхи в днях
-        delta = (target_date - easter).days
-        
-        # Карта переходящих праздников (смещение от Пасхи в днях)
-        movable_holidays = {
-            -63: {  # За 9 недель до Пасхи
-                'title': 'Неделя о мытаре и фарисее',
-                'type': 'Подготовительная к Великому посту',
-                'category': 'preparatory',
-            },
-            -56: {
-                'title': 'Неделя о блудном сыне',
-                'type': 'Подготовительная к Великому посту',
-                'category': 'preparatory',
-            },
-            -49: {
-                'title': 'Неделя мясопустная',
-                'type': 'Прощеное воскресенье',
-                'category': 'preparatory',
-            },
-            -48: {
-                'title': 'Начало Великого поста',
-                'type': 'Чистый понедельник',
-                'category': 'great_lent',
-            },
-            -7: {
-                'title': 'Лазарева суббота',
-                'type': 'Воскрешение Лазаря',
-                'category': 'lent',
-            },
-            -1: {
-                'title': 'Вход Господень в Иерусалим',
-                'type': 'Вербное воскресенье',
-                'category': 'major',
-            },
-            0: {
-                'title': 'ПАСХА - ВОСКРЕСЕНИЕ ХРИСТОВО',
-                'type': 'Праздник праздников',
-                'category': 'pascha',
-                'description': 'Светлое Христово Воскресение - главный праздник христианства',
-            },
-            39: {
-                'title': 'Вознесение Господне',
-                'type': 'Двунадесятый праздник',
-                'category': 'major',
-            },
-            49: {
-                'title': 'День Святой Троицы (Пятидесятница)',
-                'type': 'Двунадесятый праздник',
-                'category': 'major',
-            },
-            50: {
-                'title': 'День Святого Духа',
-                'type': 'Понедельник Святого Духа',
-                'category': 'major',
-            },
-        }
+        delta = target_date.toordinal() - self._year(target_date.year).easter_ord
         
-        if delta in movable_holidays:
-            holiday = movable_holidays[delta]
-            return {
-                **holiday,
-                'movable': True,
-                'easter_offset': delta,
-                'fast': self.is_fasting_day(target_date),
-                'formatted_date': target_date.strftime('%d %B %Y'),
-            }
+        holiday = _MOVABLE_HOLIDAYS.get(delta)
+        if holiday is None:
+            return None
         
-        return None
+        return {
+            **holiday,
+            'fast': self._fast_flag(target_date, is_fast),
+            'formatted_date': target_date.strftime('%d %B %Y'),
+        }
     
-    def _create_saint_day(self, saint_name: str, target_date: date) -> Dict:
+    def _create_saint_day(self, saint_name: str, target_date: date, is_fast: Optional[bool] = None) -> Dict:
         """Создать запись для дня святого"""
         return {
             'title': saint_name,
             'type': 'День памяти святого',
             'category': 'saint',
-            'fast': self.is_fasting_day(target_date),
+            'fast': self._fast_flag(target_date, is_fast),
             'description': f'В этот день Православная Церковь празднует память: {saint_name}',
             'liturgy': 'Литургия святителя Иоанна Златоуста',
         }
     
-    def _create_regular_day(self, target_date: date) -> Dict:
+    def _create_regular_day(self, target_date: date, is_fast: Optional[bool] = None) -> Dict:
         """Создать запись для обычного дня"""
-        is_fast = self.is_fasting_day(target_date)
-        
         return {
             'title': 'Обычный день',
             'type': 'Рядовой день',
             'category': 'regular',
-            'fast': is_fast,
+            'fast': self._fast_flag(target_date, is_fast),
             'description': 'Обычный день церковного календаря. Совершаются повседневные богослужения.',
             'liturgy': 'Литургия святителя Иоанна Златоуста',
         }
@@ -286,139 +569,80 @@ class OrthodoxCalendarService:
         Returns:
             bool: True если постный день
         """
-        # 1. Многодневные посты
-        if self._is_in_fasting_period(target_date):
-            return True
-        
-        # 2. Однодневные посты (среда и пятница)
-        if target_date.weekday() in [2, 4]:  # Среда (2) и пятница (4)
-            if not self._is_in_non_fasting_week(target_date):
-                return True
-        
-        # 3. Однодневные праздничные посты
-        if self._is_single_day_fast(target_date):
-            return True
-        
-        return False
+        jan1_ord, bitmap = self._fasting_bitmap(target_date.year)
+        return bool(bitmap >> (target_date.toordinal() - jan1_ord) & 1)
     
-    def _is_in_fasting_period(self, target_date: date) -> bool:
+    def _fasting_bitmap(self, year: int) -> Tuple[int, int]:
         """
-        Проверить, находится ли дата в периоде многодневного поста
+        Битовая маска постных дней года: (ординал 1 января, маска)
         
-        Args:
-            target_date: Дата для проверки
-            
-        Returns:
-            bool: True если в посту
-        """
-        month, day = target_date.month, target_date.day
-        
-        # Неподвижные посты из JSON
-        for period in self.calendar_data.get('fasting_periods', []):
-            if period.get('start_variable'):
-                # Переходящие посты обрабатываем отдельно
-                continue
-            
-            start_date = period.get('start_date')
-            end_date = period.get('end_date')
-            
-            if start_date and end_date:
-                start_month, start_day = map(int, start_date.split('-'))
-                end_month, end_day = map(int, end_date.split('-'))
-                
-                # Рождественский пост (переходит через Новый год)
-                if start_month > end_month:
-                    if (month == start_month and day >= start_day) or \
-                       (month == end_month and day <= end_day) or \
-                       (month > start_month or month < end_month):
-                        return True
-                # Обычные посты
-                else:
-                    if (start_month < month < end_month) or \
-                       (month == start_month and day >= start_day) or \
-                       (month == end_month and day <= end_day):
-                        return True
-        
-        # Великий пост (переходящий)
-        if self._is_great_lent(target_date):
-            return True
-        
-        # Петров пост (переходящий)
-        if self._is_apostles_fast(target_date):
-            return True
-        
-        return False
-    
-    def _is_great_lent(self, target_date: date) -> bool:
-        """Великий пост (48 дней до Пасхи)"""
-        easter = get_easter_date(target_date.year)
-        lent_start = easter - timedelta(days=48)
-        lent_end = easter - timedelta(days=1)
-        return lent_start <= target_date <= lent_end
-    
-    def _is_apostles_fast(self, target_date: date) -> bool:
+        Бит N установлен, если пост в (N+1)-й день года. Маска строится
+        один раз на год, дальше is_fasting_day - это сдвиг и маска.
         """
-        Петров (Апостольский) пост
-        От 8 дня после Троицы до 12 июля (нов. ст.)
-        """
-        easter = get_easter_date(target_date.year)
-        trinity = easter + timedelta(days=49)  # Троица на 50-й день после Пасхи
-        fast_start = trinity + timedelta(days=8)
-        fast_end = date(target_date.year, 7, 12)
-        
-        return fast_start <= target_date <= fast_end
+        cached = self._fasting_bitmaps.get(year)
+        if cached is None:
+            cached = self._fasting_bitmaps[year] = self._build_fasting_bitmap(year)
+        return cached
     
-    def _is_in_non_fasting_week(self, target_date: date) -> bool:
+    def _build_fasting_bitmap(self, year: int) -> Tuple[int, int]:
         """
-        Проверить, находится ли дата в сплошной седмице
-        (когда пост в среду и пятницу отменяется)
+        Построить маску постных дней года из целочисленных интервалов
         
-        Args:
-            target_date: Дата для проверки
-            
-        Returns:
-            bool: True если в сплошной седмице
+        Каждый пост - это непрерывный диапазон ординалов, который
+        превращается в маску одним сдвигом, поэтому построение не
+        перебирает дни года.
         """
-        easter = get_easter_date(target_date.year)
+        info = self._year(year)
+        jan1_ord = date(year, 1, 1).toordinal()
+        dec31_ord = date(year, 12, 31).toordinal()
+        
+        def span(start_ord: int, end_ord: int) -> int:
+            """Маска дней года в диапазоне ординалов [start_ord, end_ord]"""
+            low = max(start_ord, jan1_ord) - jan1_ord
+            high = min(end_ord, dec31_ord) - jan1_ord
+            if low > high:
+                return 0
+            return ((1 << (high - low + 1)) - 1) << low
+        
+        def ordinal(month: int, day: int) -> int:
+            return date(year, month, min(day, monthrange(year, month)[1])).toordinal()
+        
+        bitmap = 0
+        
+        # 1. Многодневные посты: неподвижные из JSON (разобраны в __init__)
+        for start_month, start_day, end_month, end_day in self._fasting_periods:
+            start_ord = ordinal(start_month, start_day)
+            end_ord = ordinal(end_month, end_day)
+            if start_ord > end_ord:
+                # Рождественский пост (переходит через Новый год)
+                bitmap |= span(start_ord, dec31_ord) | span(jan1_ord, end_ord)
+            else:
+                bitmap |= span(start_ord, end_ord)
         
-        # Карта сплошных седмиц (относительно Пасхи)
-        non_fasting_weeks = [
-            # Святки (7 января - 18 января)
-            (date(target_date.year, 1, 7), date(target_date.year, 1, 18)),
-            
-            # Мытаря и фарисея (за 3 недели до Великого поста)
-            (easter - timedelta(days=70), easter - timedelta(days=64)),
-            
-            # Сырная (Масленица) (за 1 неделю до Великого поста)
-            (easter - timedelta(days=56), easter - timedelta(days=50)),
-            
-            # Пасхальная (Светлая) (неделя после Пасхи)
-            (easter, easter + timedelta(days=7)),
-            
-            # Троицкая (неделя после Троицы)
-            (easter + timedelta(days=49), easter + timedelta(days=56)),
-        ]
+        # Великий пост (48 дней до Пасхи) и Петров пост (переходящие)
+        bitmap |= span(info.lent_start_ord, info.lent_end_ord)
+        bitmap |= span(info.apostles_start_ord, info.apostles_end_ord)
         
-        for start, end in non_fasting_weeks:
-            if start <= target_date <= end:
-                return True
+        # 2. Однодневные посты (среда и пятница) вне сплошных седмиц.
+        # Ординал 1 - понедельник, поэтому день недели = (ординал - 1) % 7
+        wednesdays_fridays = 0
+        for weekday in (2, 4):
+            first_offset = (weekday - (jan1_ord - 1)) % 7
+            for offset in range(first_offset, dec31_ord - jan1_ord + 1, 7):
+                wednesdays_fridays |= 1 << offset
         
-        return False
-    
-    def _is_single_day_fast(self, target_date: date) -> bool:
-        """
-        Однодневные праздничные посты:
-        - Крещенский сочельник (18 января)
-        - Усекновение главы Иоанна Предтечи (11 сентября)
-        - Воздвижение Креста Господня (27 сентября)
-        """
-        single_day_fasts = [
-            (1, 18),   # 18 января
-            (9, 11),   # 11 сентября
-            (9, 27),   # 27 сентября
-        ]
+        non_fasting = 0
+        for start_ord, end_ord in info.non_fasting_weeks:
+            non_fasting |= span(start_ord, end_ord)
         
-        return (target_date.month, target_date.day) in single_day_fasts
+        bitmap |= wednesdays_fridays & ~non_fasting
+        
+        # 3. Однодневные праздничные посты
+        for month, day in self._SINGLE_DAY_FASTS:
+            day_ord = ordinal(month, day)
+            bitmap |= span(day_ord, day_ord)
+        
+        return jan1_ord, bitmap
     
     # ========================================================================
     # ДОПОЛНИТЕЛЬНАЯ ИНФОРМАЦИЯ
@@ -437,30 +661,8 @@ class OrthodoxCalendarService:
         if target_date.weekday() != 6:  # Не воскресенье
             return None
         
-        easter = get_easter_date(target_date.year)
-        delta = (target_date - easter).days
-        
-        week_names = {
-            -63: 'Неделя о мытаре и фарисее',
-            -56: 'Неделя о блудном сыне',
-            -49: 'Неделя мясопустная (Прощеное воскресенье)',
-            -42: '1-я седмица Великого поста',
-            -35: '2-я седмица Великого поста',
-            -28: '3-я седмица Великого поста (Крестопоклонная)',
-            -21: '4-я седмица Великого поста',
-            -14: '5-я седмица Великого поста',
-            -7: '6-я седмица Великого поста (Вход Господень в Иерусалим)',
-            0: 'ПАСХА - ВОСКРЕСЕНИЕ ХРИСТОВО',
-            7: 'Антипасха (Фомина неделя)',
-            14: 'Неделя жен-мироносиц',
-            21: 'Неделя о расслабленном',
-            28: 'Неделя о самарянке',
-            35: 'Неделя о слепом',
-            42: 'Отдание Пасхи',
-            49: 'День Святой Троицы (Пятидесятница)',
-        }
-        
-        return week_names.get(delta)
+        delta = target_date.toordinal() - self._year(target_date.year).easter_ord
+        return _WEEK_NAMES.get(delta)
     
     def get_upcoming_holidays(self, days: int = 7) -> List[Dict]:
         """
@@ -473,22 +675,64 @@ class OrthodoxCalendarService:
             List[Dict]: Список праздников
         """
         upcoming = []
-        current_date = date.today()
+        if days <= 0:
+            return upcoming
         
-        for i in range(days):
-            check_date = current_date + timedelta(days=i)
-            holiday = self.get_holiday_by_date(check_date)
+        current_date = _today()
+        first_ord = current_date.toordinal()
+        last_ord = first_ord + days - 1
+        
+        # Значимые дни каждого года известны заранее: находим начало окна
+        # бинарным поиском и берём дни до его конца
+        for year in range(current_date.year, date.fromordinal(last_ord).year + 1):
+            ordinals = self._significant_days(year)
             
-            # Добавляем только значимые праздники
-            if holiday and holiday.get('category') in ['pascha', 'great', 'major']:
+            for ordinal in ordinals[bisect_left(ordinals, first_ord):]:
+                if ordinal > last_ord:
+                    break
+                check_date = date.fromordinal(ordinal)
                 upcoming.append({
                     'date': check_date,
-                    'holiday': holiday
+                    'holiday': self.get_holiday_by_date(check_date)
                 })
         
         return upcoming
     
-    def get_month_calendar(self, year: int, month: int) -> List[Dict]:
+    def _significant_days(self, year: int) -> List[int]:
+        """
+        Отсортированные ординалы значимых праздников года
+        
+        Кандидаты - неподвижные и переходящие праздники значимых категорий;
+        каждый перепроверяется через _holiday_category, чтобы учесть
+        приоритет неподвижного праздника над переходящим в один день.
+        """
+        cached = self._significant_days_cache.get(year)
+        if cached is not None:
+            return cached
+        
+        candidates = set()
+        
+        for key, holiday in self._fixed_holidays.items():
+            if holiday.get('category') in self.SIGNIFICANT_CATEGORIES:
+                try:
+                    candidates.add(date(year, key // 100, key % 100).toordinal())
+                except ValueError:
+                    # 29 февраля в невисокосный год и т.п.
+                    continue
+        
+        easter_ord = self._year(year).easter_ord
+        for delta, holiday in _MOVABLE_HOLIDAYS.items():
+            if holiday['category'] in self.SIGNIFICANT_CATEGORIES:
+                candidates.add(easter_ord + delta)
+        
+        cached = self._significant_days_cache[year] = sorted(
+            ordinal for ordinal in candidates
+            if date.fromordinal(ordinal).year == year
+            and self._holiday_category(date.fromordinal(ordinal)) in self.SIGNIFICANT_CATEGORIES
+        )
+        return cached
+    
+    def get_month_calendar(self, year: int, month: int) -> List[DayEntry]:
         """
         Получить календарь на месяц
         
@@ -497,41 +741,58 @@ class OrthodoxCalendarService:
             month: Месяц (1-12)
             
         Returns:
-            List[Dict]: Список дней месяца с информацией
+            List[DayEntry]: Список дней месяца с информацией
         """
-        first_day = date(year, month, 1)
-        
-        if month == 12:
-            last_day = date(year, month, 31)
-        else:
-            last_day = date(year, month + 1, 1) - timedelta(days=1)
+        first_ord = date(year, month, 1).toordinal()
+        last_ord = first_ord + monthrange(year, month)[1] - 1
         
         month_data = []
-        current_day = first_day
         
-        while current_day <= last_day:
-            holiday = self.get_holiday_by_date(current_day)
+        for ordinal in range(first_ord, last_ord + 1):
+            current_day = date.fromordinal(ordinal)
+            weekday = current_day.weekday()
+            is_fast = self.is_fasting_day(current_day)
             
-            month_data.append({
-                'date': current_day,
-                'day': current_day.day,
-                'weekday': current_day.weekday(),
-                'holiday': holiday,
-                'is_weekend': current_day.weekday() in [5, 6],
-                'is_fast': self.is_fasting_day(current_day),
-            })
-            
-            current_day += timedelta(days=1)
+            month_data.append(DayEntry(
+                date=current_day,
+                day=current_day.day,
+                weekday=weekday,
+                holiday=self.get_holiday_by_date(current_day, is_fast=is_fast),
+                is_weekend=weekday in (5, 6),
+                is_fast=is_fast,
+            ))
         
         return month_data
 
 
+@lru_cache(maxsize=1)
+def _load_calendar_tables() -> Tuple[Dict, Dict, Dict, Tuple]:
+    """
+    Загрузить календарь и построить индексы один раз на процесс
+    
+    Все экземпляры сервиса получают одни и те же объекты. Если модуль
+    импортирован до fork (например, gunicorn --preload), таблицы
+    разделяются воркерами через copy-on-write.
+    
+    Returns:
+        Tuple: (данные, неподвижные праздники, дни святых, посты)
+    """
+    data = OrthodoxCalendarService._load_calendar_data()
+    fixed_holidays, saint_days = OrthodoxCalendarService._build_date_indexes(data)
+    fasting_periods = OrthodoxCalendarService._parse_fasting_periods(data)
+    return data, fixed_holidays, saint_days, fasting_periods
+
+
 # ============================================================================
 # SINGLETON INSTANCE
 # ============================================================================
 
-# Создаем единственный экземпляр сервиса
-_calendar_service = None
+# Единственный экземпляр сервиса создаётся при импорте модуля: импорт
+# выполняется один раз и под блокировкой импорта, поэтому параллельные
+# потоки не создадут второй экземпляр, а доступ к нему не требует проверок
+_calendar_service = OrthodoxCalendarService()
+logger.info("Православный календарь инициализирован")
+
 
 def get_calendar_service() -> OrthodoxCalendarService:
     """
@@ -540,10 +801,6 @@ def get_calendar_service() -> OrthodoxCalendarService:
     Returns:
         OrthodoxCalendarService: Экземпляр сервиса
     """
-    global _calendar_service
-    if _calendar_service is None:
-        _calendar_service = OrthodoxCalendarService()
-        logger.info("Православный календарь инициализирован")
     return _calendar_service
 
 
@@ -554,13 +811,13 @@ def get_calendar_service() -> OrthodoxCalendarService:
 def get_today_holiday() -> Optional[Dict]:
     """Получить праздник текущего дня"""
     service = get_calendar_service()
-    return service.get_holiday_by_date(date.today())
+    return service.get_holiday_by_date(_today())
 
 
 def is_fasting_today() -> bool:
     """Проверить, постный ли сегодня день"""
     service = get_calendar_service()
-    return service.is_fasting_day(date.today())
+    return service.is_fasting_day(_today())
 
 
 def get_easter_date_for_year(year: int) -> date:
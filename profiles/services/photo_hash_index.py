@@ -0,0 +1,180 @@
+"""
+Индекс перцептивных хешей фото для поиска дубликатов по всей базе
+
+BK-дерево по расстоянию Хэмминга: при поиске соседей в пределах порога
+поддеревья, которые не могут содержать подходящих хешей, отсекаются
+по неравенству треугольника, поэтому сравнивается лишь малая доля хешей.
+
+Дерево живёт в памяти процесса и строится лениво при первом поиске.
+Согласованность между процессами (gunicorn, celery) держится на номере
+версии в общем кэше: сигналы post_save/post_delete у Photo и явный вызов
+invalidate() после массовых update()/bulk_update() увеличивают его,
+и процесс с устаревшей версией перестраивает дерево из БД.
+"""
+import logging
+import threading
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'photo_hash_index:version'
+
+_MASK64 = (1 << 64) - 1
+
+
+class BKTree:
+    """BK-дерево 64-битных хешей (метрика - расстояние Хэмминга)"""
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self):
+        # Узел: [хеш, множество photo_id, {расстояние: дочерний узел}]
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value, photo_id):
+        """Добавляет фото с хешем value (беззнаковое 64-битное целое)"""
+        if self._root is None:
+            self._root = [value, {photo_id}, {}]
+            self._size += 1
+            return
+
+        node = self._root
+        while True:
+            distance = (node[0] ^ value).bit_count()
+            if distance == 0:
+                if photo_id not in node[1]:
+                    node[1].add(photo_id)
+                    self._size += 1
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, {photo_id}, {}]
+                self._size += 1
+                return
+            node = child
+
+    def discard(self, value, photo_id):
+        """Убирает фото; сам узел остаётся в дереве для маршрутизации"""
+        node = self._root
+        while node is not None:
+            distance = (node[0] ^ value).bit_count()
+            if distance == 0:
+                if photo_id in node[1]:
+                    node[1].discard(photo_id)
+                    self._size -= 1
+                return
+            node = node[2].get(distance)
+
+    def find(self, value, threshold) -> list:
+        """[(photo_id, distance), ...] в пределах threshold, по возрастанию расстояния"""
+        if self._root is None:
+            return []
+
+        found = []
+        stack = [self._root]
+        while stack:
+            node_value, photo_ids, children = stack.pop()
+            distance = (node_value ^ value).bit_count()
+            if distance <= threshold:
+                found.extend((photo_id, distance) for photo_id in photo_ids)
+            low, high = distance - threshold, distance + threshold
+            stack.extend(child for edge, child in children.items() if low <= edge <= high)
+
+        found.sort(key=lambda item: item[1])
+        return found
+
+
+class PhotoHashIndex:
+    """BK-дерево всех фото с хешем текущего алгоритма, общее для потоков процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = None
+        self._version = None
+
+    def find(self, photo_hash, threshold) -> list:
+        """
+        Соседи hex-хеша photo_hash в пределах threshold
+
+        Returns:
+            list: [(photo_id, distance), ...] по возрастанию расстояния
+        """
+        from profiles.models import Photo
+
+        if Photo.hash_to_int64(photo_hash) is None:
+            return []
+        value = int(photo_hash, 16)
+
+        version = self._read_version()
+        with self._lock:
+            if self._tree is None or version is None or version != self._version:
+                self._tree = self._build()
+                self._version = version
+            return self._tree.find(value, threshold)
+
+    def add(self, photo_id, hash_u64):
+        """Фото получило хеш (hash_u64 - значение Photo.image_hash_u64)"""
+        self._apply(BKTree.add, photo_id, hash_u64)
+
+    def discard(self, photo_id, hash_u64):
+        """Фото удалено или его хеш больше не актуален"""
+        self._apply(BKTree.discard, photo_id, hash_u64)
+
+    def invalidate(self):
+        """Сбросить дерево во всех процессах (после массовых изменений хешей)"""
+        self._bump_version()
+        with self._lock:
+            self._tree = None
+
+    def _apply(self, operation, photo_id, hash_u64):
+        version = self._bump_version()
+        with self._lock:
+            # Своё изменение применяем на месте, только если между ним
+            # и прошлой версией не было чужих - иначе дерево перестроится
+            if self._tree is not None and version is not None and version == (self._version or 0) + 1:
+                operation(self._tree, hash_u64 & _MASK64, photo_id)
+                self._version = version
+            else:
+                self._tree = None
+
+    @staticmethod
+    def _read_version():
+        try:
+            return cache.get_or_set(VERSION_KEY, 0, None)
+        except Exception as e:
+            logger.error(f'Error reading photo hash index version: {e}')
+            return None
+
+    @staticmethod
+    def _bump_version():
+        try:
+            cache.add(VERSION_KEY, 0, None)
+            return cache.incr(VERSION_KEY)
+        except Exception as e:
+            logger.error(f'Error bumping photo hash index version: {e}')
+            return None
+
+    @staticmethod
+    def _build() -> BKTree:
+        from profiles.models import Photo
+        from profiles.services.photo_verification import HASH_ALGO
+
+        tree = BKTree()
+        rows = (
+            Photo.objects.filter(image_hash_u64__isnull=False, image_hash_algo=HASH_ALGO)
+            .values_list('id', 'image_hash_u64')
+            .iterator(chunk_size=5000)
+        )
+        for photo_id, hash_u64 in rows:
+            tree.add(hash_u64 & _MASK64, photo_id)
+
+        logger.info(f'🌳 Индекс хешей фото построен: {len(tree)} фото')
+        return tree
+
+
+photo_hash_index = PhotoHashIndex()
@@ -2,12 +2,125 @@
 Комплексная проверка фотографий при регистрации
 Включает: размер, формат, EXIF, качество, дубликаты, обратный поиск
 """
+import mmap
 import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from io import BytesIO
-from PIL import Image
-from PIL.ExifTags import TAGS
-from typing import Tuple, Dict, List
+from PIL import Image, ImageStat
+from typing import Any, Tuple, Dict, List, Optional
 from django.core.files.uploadedfile import UploadedFile
+from django.db import connections
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy import ndimage
+except ImportError:
+    ndimage = None
+
+try:
+    import cv2  # Необязательно: SIMD-лапласиан, иначе scipy.ndimage
+except ImportError:
+    cv2 = None
+
+# Сервисы импортируются один раз при загрузке модуля, а не на каждую
+# проверку; без их зависимостей (imagehash, Google Vision) проверка
+# пропускается с предупреждением
+try:
+    from profiles.services.photo_verification import verify_photo_originality
+except ImportError:
+    verify_photo_originality = None
+
+try:
+    from profiles.services.reverse_image_search import check_photo_internet
+except ImportError:
+    check_photo_internet = None
+
+
+# Теги IFD0, которые нужны проверке EXIF (id -> имя, как в PIL.ExifTags.TAGS)
+_EXIF_IFD0_TAGS = {
+    0x010F: 'Make',
+    0x0110: 'Model',
+    0x0131: 'Software',
+    0x0132: 'DateTime',
+}
+_EXIF_TYPE_ASCII = 2
+
+
+def _fast_jpeg_exif(raw) -> Optional[Dict]:
+    """
+    Make/Model/Software/DateTime из сегмента APP1 (EXIF) JPEG
+    
+    Просматриваются только заголовки сегментов до начала сжатых данных
+    и записи IFD0; вложенные IFD (Exif, GPS, MakerNote) не разбираются.
+    Возвращает None, если EXIF нет или сегмент повреждён.
+    """
+    if raw[:2] != b'\xff\xd8':
+        return None
+    
+    pos = 2
+    size = len(raw)
+    try:
+        while pos + 4 <= size:
+            if raw[pos] != 0xFF:
+                return None
+            marker = raw[pos + 1]
+            if marker == 0xFF:
+                # Байт-заполнитель перед маркером
+                pos += 1
+                continue
+            if marker in (0xD9, 0xDA):
+                # EOI / SOS: дальше метаданных нет
+                return None
+            length = struct.unpack_from('>H', raw, pos + 2)[0]
+            if marker == 0xE1 and raw[pos + 4:pos + 10] == b'Exif\x00\x00':
+                return _parse_exif_ifd0(raw[pos + 10:pos + 2 + length])
+            pos += 2 + length
+    except (struct.error, ValueError):
+        return None
+    return None
+
+
+def _parse_exif_ifd0(tiff) -> Optional[Dict]:
+    """Нужные ASCII-теги из IFD0 TIFF-структуры EXIF"""
+    if tiff[:2] == b'II':
+        order = '<'
+    elif tiff[:2] == b'MM':
+        order = '>'
+    else:
+        return None
+    
+    magic, offset = struct.unpack_from(order + 'HI', tiff, 2)
+    if magic != 42:
+        return None
+    
+    found = {}
+    count = struct.unpack_from(order + 'H', tiff, offset)[0]
+    for index in range(count):
+        tag, value_type, length, value = struct.unpack_from(
+            order + 'HHI4s', tiff, offset + 2 + 12 * index
+        )
+        name = _EXIF_IFD0_TAGS.get(tag)
+        if name is None or value_type != _EXIF_TYPE_ASCII:
+            continue
+        
+        # До 4 байт значение лежит прямо в записи, иначе - смещение
+        if length <= 4:
+            data = value[:length]
+        else:
+            start = struct.unpack(order + 'I', value)[0]
+            data = tiff[start:start + length]
+        found[name] = data.split(b'\x00', 1)[0].decode('latin-1')
+        
+        if len(found) == len(_EXIF_IFD0_TAGS):
+            break
+    
+    return found
 
 
 class PhotoValidationError(Exception):
@@ -15,6 +128,64 @@ class PhotoValidationError(Exception):
     pass
 
 
+@dataclass
+class PreparedImage:
+    """
+    Фото, прочитанное и декодированное один раз для всех проверок
+    
+    raw - байты файла (для загрузки, которую Django уже сохранил во
+    временный файл, - mmap этого файла), pil - открытое изображение
+    (пиксели декодируются лениво при первом обращении, JPEG - сразу
+    в уменьшенном масштабе), size - исходные размеры из заголовка,
+    path - путь к временному файлу загрузки, если он есть.
+    
+    pil_rgb и rgb_array - уменьшенная RGB-копия и её пиксели (numpy,
+    без копирования буфера), gray_np - та же копия в оттенках серого;
+    считаются один раз при первом обращении через rgb_sample()
+    """
+    raw: Any
+    pil: Image.Image
+    size: Tuple[int, int]
+    path: Optional[str] = None
+    pil_rgb: Optional[Image.Image] = None
+    rgb_array: Optional[Any] = None
+    gray_np: Optional[Any] = None
+    
+    @property
+    def source(self):
+        """Что передавать хешированию и обратному поиску: путь или байты"""
+        return self.path or self.raw
+    
+    def rgb_sample(self, max_size: int) -> Image.Image:
+        """
+        RGB-копия не больше ~max_size по длинной стороне (общая для проверок)
+        
+        Сначала уменьшение (reduce - целочисленное усреднение в C), потом
+        одна конвертация в RGB уже по маленькой копии; для палитровых
+        и прочих режимов, которые reduce не поддерживает, - наоборот.
+        """
+        if self.pil_rgb is None:
+            img = self.pil
+            if img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'CMYK', 'YCbCr'):
+                img = img.convert('RGB')
+            factor = max(img.size) // max_size
+            if factor > 1:
+                img = img.reduce(factor)
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            self.pil_rgb = img
+            self.rgb_array = np.asarray(img) if np is not None else None
+        return self.pil_rgb
+    
+    def close(self):
+        """Освобождает файловые дескрипторы и отображение файла"""
+        self.pil.close()
+        if self.pil_rgb is not None:
+            self.pil_rgb.close()
+        if isinstance(self.raw, mmap.mmap):
+            self.raw.close()
+
+
 class PhotoValidator:
     """Валидатор фотографий для регистрации"""
     
@@ -26,6 +197,15 @@ class PhotoValidator:
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
     ALLOWED_FORMATS = ['JPEG', 'JPG', 'PNG', 'WEBP']
     MIN_QUALITY_SCORE = 30  # Минимальное качество (0-100)
+    GRAY_WEIGHTS = (0.299, 0.587, 0.114)  # Яркость из RGB (ITU-R BT.601)
+    QUALITY_SAMPLE_SIZE = 512  # Размер копии для оценки качества (px)
+    # Пороги дисперсии лапласиана на копии QUALITY_SAMPLE_SIZE: резкие фото
+    # дают сотни-тысячи, размытие по Гауссу с радиусом 1px - единицы
+    SHARPNESS_GOOD = 100
+    SHARPNESS_MIN = 20
+    MIN_STDDEV = 10  # Разброс яркости каналов, ниже которого фото однотонное
+    
+    UNREADABLE_IMAGE_ERROR = 'Ошибка проверки формата: файл не является изображением или повреждён'
     
     @classmethod
     def validate_all(cls, image_file, check_internet=False, check_duplicates=True) -> Dict:
@@ -39,6 +219,10 @@ class PhotoValidator:
             
         Returns:
             Dict с результатами проверки
+        
+        Проверки идут от дешёвых к дорогим: если файл не прошёл базовую
+        проверку или проверку формата, остальные (декодирование, запрос
+        к БД за дубликатами, платный обратный поиск) не выполняются.
         """
         results = {
             'valid': True,
@@ -46,6 +230,7 @@ class PhotoValidator:
             'warnings': [],
             'checks': {}
         }
+        prepared = None
         
         try:
             # 1. Проверка базовых параметров
@@ -54,28 +239,54 @@ class PhotoValidator:
             if not basic_check['valid']:
                 results['valid'] = False
                 results['errors'].extend(basic_check['errors'])
+                return results
+            
+            # Файл читается и декодируется один раз, дальше все проверки
+            # работают с общим PreparedImage
+            try:
+                prepared = cls._prepare(image_file)
+            except OSError:
+                # UnidentifiedImageError и битые файлы - это ошибка формата
+                results['checks']['format'] = {
+                    'valid': False,
+                    'errors': [cls.UNREADABLE_IMAGE_ERROR],
+                    'info': {},
+                }
+                results['valid'] = False
+                results['errors'].append(cls.UNREADABLE_IMAGE_ERROR)
+                return results
             
-            # 2. Проверка формата и размеров
-            format_check = cls.check_format_and_size(image_file)
+            # 2. Проверка формата и размеров (только заголовок, без пикселей)
+            format_check = cls.check_format_and_size(prepared)
             results['checks']['format'] = format_check
             if not format_check['valid']:
                 results['valid'] = False
                 results['errors'].extend(format_check['errors'])
+                return results
             
             # 3. Проверка EXIF метаданных
-            exif_check = cls.check_exif_metadata(image_file)
+            exif_check = cls.check_exif_metadata(prepared)
             results['checks']['exif'] = exif_check
             results['warnings'].extend(exif_check.get('warnings', []))
             
+            # 4-5. Качество (декодирование + numpy) и дубликаты (хеш + БД)
+            # друг от друга не зависят и отпускают GIL - считаем параллельно
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                quality_future = executor.submit(cls.check_image_quality, prepared)
+                duplicate_future = (
+                    executor.submit(cls._with_own_db_connection, cls.check_database_duplicates, prepared)
+                    if check_duplicates else None
+                )
+                quality_check = quality_future.result()
+                duplicate_check = duplicate_future.result() if duplicate_future else None
+            
             # 4. Проверка качества изображения
-            quality_check = cls.check_image_quality(image_file)
             results['checks']['quality'] = quality_check
             if not quality_check['valid']:
                 results['warnings'].extend(quality_check['warnings'])
             
             # 5. Проверка на дубликаты в базе
             if check_duplicates:
-                duplicate_check = cls.check_database_duplicates(image_file)
                 results['checks']['duplicates'] = duplicate_check
                 if not duplicate_check['valid']:
                     results['valid'] = False
@@ -83,7 +294,7 @@ class PhotoValidator:
             
             # 6. Обратный поиск в интернете
             if check_internet:
-                internet_check = cls.check_internet_presence(image_file)
+                internet_check = cls.check_internet_presence(prepared)
                 results['checks']['internet'] = internet_check
                 if not internet_check['valid']:
                     results['valid'] = False
@@ -95,6 +306,65 @@ class PhotoValidator:
             results['valid'] = False
             results['errors'].append(f'Ошибка проверки: {str(e)}')
             return results
+        
+        finally:
+            if prepared is not None:
+                prepared.close()
+    
+    @staticmethod
+    def _with_own_db_connection(check, *args):
+        """
+        Запуск проверки в рабочем потоке
+        
+        У потока своё соединение с БД (Django держит их по потокам),
+        и закрыть его нужно явно - request_finished в этом потоке не придёт.
+        """
+        try:
+            return check(*args)
+        finally:
+            connections.close_all()
+    
+    @classmethod
+    def _prepare(cls, image_file) -> PreparedImage:
+        """
+        Читает файл и открывает изображение (один раз на всю проверку)
+        
+        Разбирается только заголовок: формат, размеры, режим и EXIF
+        доступны без декодирования пикселей, поэтому проверки формата
+        и метаданных идут первыми и пиксели не трогают.
+        
+        Загрузку больше FILE_UPLOAD_MAX_MEMORY_SIZE Django уже записал
+        на диск (TemporaryUploadedFile): её не копируем в память, а
+        отображаем через mmap, и Pillow открывает файл по пути сам.
+        """
+        path = None
+        if hasattr(image_file, 'temporary_file_path'):
+            path = image_file.temporary_file_path()
+            with open(path, 'rb') as f:
+                raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                pil = Image.open(path)
+            except Exception:
+                raw.close()
+                raise
+        else:
+            if hasattr(image_file, 'read'):
+                image_file.seek(0)
+                raw = image_file.read()
+                image_file.seek(0)
+            else:
+                with open(image_file, 'rb') as f:
+                    raw = f.read()
+            pil = Image.open(BytesIO(raw))
+        size = pil.size
+        
+        # Пиксели нужны только проверке качества, которой хватает ~512px:
+        # для JPEG libjpeg декодирует в масштабе 1/2-1/8 (IDCT scaling),
+        # для остальных форматов draft ничего не меняет. Само декодирование
+        # произойдёт при первом обращении к пикселям
+        pil.draft(None, (cls.QUALITY_SAMPLE_SIZE, cls.QUALITY_SAMPLE_SIZE))
+        
+        return PreparedImage(raw=raw, pil=pil, size=size, path=path)
     
     @classmethod
     def check_basic_requirements(cls, image_file) -> Dict:
@@ -139,24 +409,19 @@ class PhotoValidator:
             return result
     
     @classmethod
-    def check_format_and_size(cls, image_file) -> Dict:
+    def check_format_and_size(cls, prepared: PreparedImage) -> Dict:
         """Проверка формата и размеров изображения"""
         result = {'valid': True, 'errors': [], 'info': {}}
         
         try:
-            # Открываем изображение
-            if hasattr(image_file, 'read'):
-                image_file.seek(0)
-                img = Image.open(image_file)
-                image_file.seek(0)
-            else:
-                img = Image.open(image_file)
+            img = prepared.pil
+            width, height = prepared.size
             
             # Сохраняем информацию
             result['info'] = {
                 'format': img.format,
-                'width': img.width,
-                'height': img.height,
+                'width': width,
+                'height': height,
                 'mode': img.mode
             }
             
@@ -169,22 +434,22 @@ class PhotoValidator:
                 )
             
             # Проверка размеров
-            if img.width < cls.MIN_WIDTH or img.height < cls.MIN_HEIGHT:
+            if width < cls.MIN_WIDTH or height < cls.MIN_HEIGHT:
                 result['valid'] = False
                 result['errors'].append(
-                    f'Изображение слишком маленькое ({img.width}x{img.height}px). '
+                    f'Изображение слишком маленькое ({width}x{height}px). '
                     f'Минимум {cls.MIN_WIDTH}x{cls.MIN_HEIGHT}px'
                 )
             
-            if img.width > cls.MAX_WIDTH or img.height > cls.MAX_HEIGHT:
+            if width > cls.MAX_WIDTH or height > cls.MAX_HEIGHT:
                 result['valid'] = False
                 result['errors'].append(
-                    f'Изображение слишком большое ({img.width}x{img.height}px). '
+                    f'Изображение слишком большое ({width}x{height}px). '
                     f'Максимум {cls.MAX_WIDTH}x{cls.MAX_HEIGHT}px'
                 )
             
             # Проверка соотношения сторон (для портретов)
-            aspect_ratio = img.width / img.height
+            aspect_ratio = width / height
             if aspect_ratio < 0.5 or aspect_ratio > 2.0:
                 result['errors'].append(
                     'Необычное соотношение сторон. Используйте портретное или квадратное фото.'
@@ -199,27 +464,30 @@ class PhotoValidator:
             return result
     
     @classmethod
-    def check_exif_metadata(cls, image_file) -> Dict:
+    def check_exif_metadata(cls, prepared: PreparedImage) -> Dict:
         """Проверка EXIF метаданных (определение скриншотов/скачанных фото)"""
         result = {'valid': True, 'warnings': [], 'metadata': {}}
         
         try:
-            if hasattr(image_file, 'read'):
-                image_file.seek(0)
-                img = Image.open(image_file)
-                image_file.seek(0)
-            else:
-                img = Image.open(image_file)
-            
-            # Получаем EXIF данные
-            exif_data = img._getexif() if hasattr(img, '_getexif') else None
-            
-            if exif_data:
-                exif = {
-                    TAGS.get(tag, tag): value
-                    for tag, value in exif_data.items()
-                    if tag in TAGS
-                }
+            img = prepared.pil
+            
+            # Для JPEG читаем только нужные теги IFD0 прямо из APP1,
+            # полный разбор через _getexif - для остальных форматов
+            # и если быстрый разбор не справился
+            exif = _fast_jpeg_exif(prepared.raw) if img.format == 'JPEG' else None
+            
+            if exif is None:
+                exif_data = img._getexif() if hasattr(img, '_getexif') else None
+                if exif_data:
+                    # Берём только нужные теги по их id, не перебирая
+                    # все записи (у MakerNote их бывают сотни)
+                    exif = {
+                        name: exif_data[tag]
+                        for tag, name in _EXIF_IFD0_TAGS.items()
+                        if tag in exif_data
+                    }
+            
+            if exif is not None:
                 result['metadata'] = exif
                 
                 # Проверка камеры/устройства
@@ -256,57 +524,63 @@ class PhotoValidator:
             return result
     
     @classmethod
-    def check_image_quality(cls, image_file) -> Dict:
+    def check_image_quality(cls, prepared: PreparedImage) -> Dict:
         """Проверка качества изображения (детекция стоковых/низкокачественных фото)"""
         result = {'valid': True, 'warnings': [], 'quality_score': 0}
         
+        if np is None or (cv2 is None and ndimage is None):
+            # numpy/scipy не установлены - пропускаем проверку качества
+            result['warnings'].append('Проверка качества недоступна (установите numpy и scipy)')
+            return result
+        
         try:
-            if hasattr(image_file, 'read'):
-                image_file.seek(0)
-                img = Image.open(image_file)
-                image_file.seek(0)
-            else:
-                img = Image.open(image_file)
-            
-            # Конвертируем в RGB если нужно
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
+            # Дисперсия и яркость почти не меняются при уменьшении, поэтому
+            # считаем их по общей RGB-копии ~512px
+            img = prepared.rgb_sample(cls.QUALITY_SAMPLE_SIZE)
             
             # Простая оценка качества
             quality_score = 0
             
-            # 1. Проверка резкости (через дисперсию)
-            import numpy as np
-            img_array = np.array(img)
+            # 1. Проверка резкости (через дисперсию лапласиана)
+            img_array = prepared.rgb_array
             
-            # Простая оценка резкости
-            gray = img.convert('L')
-            gray_array = np.array(gray)
-            variance = np.var(gray_array)
+            # Оттенки серого считаем из того же RGB-массива (веса ITU-R BT.601,
+            # как у convert('L')), без второй конвертации в Pillow
+            gray_array = img_array @ np.array(cls.GRAY_WEIGHTS, dtype=np.float32)
+            prepared.gray_np = gray_array
+            sharpness = cls._laplacian_variance(gray_array)
             
-            if variance > 1000:
+            if sharpness > cls.SHARPNESS_GOOD:
                 quality_score += 40
-            elif variance > 500:
+            elif sharpness > cls.SHARPNESS_MIN:
                 quality_score += 20
             else:
                 result['warnings'].append('⚠️ Фото выглядит размытым или низкого качества')
             
+            # Средние и дисперсии каналов ImageStat считает в C по гистограмме,
+            # без промежуточных массивов numpy
+            stat = ImageStat.Stat(img)
+            
             # 2. Проверка насыщенности цветов
-            r, g, b = img_array[:,:,0], img_array[:,:,1], img_array[:,:,2]
-            color_variance = (np.var(r) + np.var(g) + np.var(b)) / 3
+            color_variance = sum(stat.var) / 3
             
             if color_variance > 500:
                 quality_score += 30
             elif color_variance > 200:
                 quality_score += 15
             
-            # 3. Проверка яркости
-            brightness = np.mean(gray_array)
+            # 3. Проверка яркости (яркость линейна по каналам: среднее серого
+            # равно взвешенной сумме средних R, G, B)
+            brightness = sum(weight * mean for weight, mean in zip(cls.GRAY_WEIGHTS, stat.mean))
             if 50 < brightness < 200:
                 quality_score += 30
             else:
                 result['warnings'].append('⚠️ Фото слишком тёмное или слишком светлое')
             
+            # Почти однотонное изображение - заливка или битый файл
+            if max(stat.stddev) < cls.MIN_STDDEV:
+                result['warnings'].append('⚠️ Фото почти однотонное')
+            
             result['quality_score'] = quality_score
             
             if quality_score < cls.MIN_QUALITY_SCORE:
@@ -318,25 +592,35 @@ class PhotoValidator:
             
             return result
             
-        except ImportError:
-            # numpy не установлен - пропускаем проверку качества
-            result['warnings'].append('Проверка качества недоступна (установите numpy)')
-            return result
         except Exception as e:
             result['warnings'].append(f'Не удалось проверить качество: {str(e)}')
             return result
     
+    @staticmethod
+    def _laplacian_variance(gray_array) -> float:
+        """
+        Резкость как дисперсия лапласиана
+        
+        В отличие от дисперсии яркости реагирует на размытие, а не на контраст.
+        """
+        if cv2 is not None:
+            return float(cv2.Laplacian(gray_array, cv2.CV_64F).var())
+        
+        return float(ndimage.laplace(gray_array).var())
+    
     @classmethod
-    def check_database_duplicates(cls, image_file) -> Dict:
+    def check_database_duplicates(cls, prepared: PreparedImage) -> Dict:
         """Проверка на дубликаты в базе данных"""
         result = {'valid': True, 'errors': [], 'duplicates': []}
         
+        if verify_photo_originality is None:
+            result['warnings'] = ['Проверка дубликатов недоступна']
+            return result
+        
         try:
-            from profiles.services import verify_photo_originality
-            
             # Проверяем дубликаты (без привязки к пользователю при регистрации)
             is_original, photo_hash, similar_photos = verify_photo_originality(
-                image=image_file,
+                prepared.source,
                 user_profile=None  # При регистрации профиля ещё нет
             )
             
@@ -350,22 +634,21 @@ class PhotoValidator:
             
             return result
             
-        except ImportError:
-            result['warnings'] = ['Проверка дубликатов недоступна']
-            return result
         except Exception as e:
             result['warnings'] = [f'Ошибка проверки дубликатов: {str(e)}']
             return result
     
     @classmethod
-    def check_internet_presence(cls, image_file) -> Dict:
+    def check_internet_presence(cls, prepared: PreparedImage) -> Dict:
         """Обратный поиск в интернете"""
         result = {'valid': True, 'errors': [], 'matches': []}
         
+        if check_photo_internet is None:
+            result['warnings'] = ['Обратный поиск недоступен (Google Vision не настроен)']
+            return result
+        
         try:
-            from profiles.services import check_photo_internet
-            
-            is_unique, message, matches = check_photo_internet(image_file, method='google')
+            is_unique, message, matches = check_photo_internet(prepared.source, method='google')
             
             if not is_unique:
                 result['valid'] = False
@@ -374,9 +657,6 @@ class PhotoValidator:
             
             return result
             
-        except ImportError:
-            result['warnings'] = ['Обратный поиск недоступен (Google Vision не настроен)']
-            return result
         except Exception as e:
             # Не блокируем регистрацию если API недоступен
             result['warnings'] = [f'Обратный поиск временно недоступен']
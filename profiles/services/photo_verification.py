@@ -3,59 +3,231 @@
 Использует imagehash для определения дубликатов
 """
 import io
+import logging
+from collections import defaultdict
 import imagehash
+import numpy as np
+import scipy.fftpack
 from PIL import Image
 from io import BytesIO
+from django.core.cache import cache
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from profiles.models import Photo
+from django.db.models import F, Q
+from profiles.models import Photo, UserProfile
+from profiles.services.photo_hash_index import photo_hash_index
 from typing import Tuple, Optional
 
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+
+# Текущий алгоритм хеша (Photo.image_hash_algo). pHash точнее average hash
+# на пережатых/подкрашенных копиях и даёт меньше ложных совпадений
+HASH_ALGO = Photo.HASH_ALGO_PHASH
+# Алгоритм старых хешей; такие фото пересчитываются задачей
+# compute_missing_photo_hashes (по расписанию Celery beat)
+LEGACY_HASH_ALGO = Photo.HASH_ALGO_AVERAGE
+
+# pHash берёт DCT от уменьшенной до 32x32 копии
+PHASH_IMAGE_SIZE = HASH_SIZE * 4
+# До этого размера изображение заранее уменьшается быстрым фильтром,
+# чтобы LANCZOS внутри phash не работал по многомегапиксельному оригиналу
+HASH_PRESHRINK_SIZE = 64
+
+USER_HASHES_KEY = 'phashes:{profile_id}:{hash_algo}:{version}'
+USER_HASHES_TIMEOUT = 60 * 60 * 24  # сутки; старые версии просто истекают
+
 
 class PhotoVerificationService:
     """Сервис для проверки фото на дубликаты"""
     
     @staticmethod
-    def find_similar_photos(photo_hash, user_profile, exclude_photo_id=None, threshold=5):
+    def find_similar_photos(photo_hash, user_profile, exclude_photo_id=None, threshold=5, hash_algo=None):
         """
         Ищет похожие фото у пользователя
         
         Args:
             photo_hash: хеш для сравнения
-            user_profile: профиль пользователя
+            user_profile: профиль пользователя (None - поиск по всем фото)
             exclude_photo_id: ID фото для исключения
             threshold: порог различия (0-20, меньше = строже)
+            hash_algo: алгоритм, которым посчитан photo_hash
+                (по умолчанию текущий HASH_ALGO)
         
         Returns:
             list: [(Photo, similarity_score), ...]
+        
+        Сравниваются только хеши того же алгоритма: расстояние между
+        average hash и pHash одного и того же фото ничего не значит.
+        
+        При поиске по всем фото кандидаты берутся из BK-дерева
+        (photo_hash_index) - точный поиск без полного перебора. Для хешей
+        устаревшего алгоритма дерева нет: их колонка image_hash_u64
+        сканируется векторно (find_phash_neighbors); таких фото становится
+        всё меньше по мере пересчёта хешей.
         """
         from profiles.models import Photo
         
-        # Получаем все фото пользователя с хешами
-        query = Photo.objects.filter(
-            user_profile=user_profile,
-            image_hash__isnull=False
-        )
+        hash_algo = hash_algo or HASH_ALGO
+        
+        # Получаем фото с хешами того же алгоритма
+        query = Photo.objects.filter(image_hash__isnull=False, image_hash_algo=hash_algo)
+        
+        if user_profile is not None:
+            query = query.filter(user_profile=user_profile)
         
         if exclude_photo_id:
             query = query.exclude(id=exclude_photo_id)
         
-        similar_photos = []
-        target_hash = imagehash.hex_to_hash(photo_hash)
+        # Точное совпадение: равенство по индексу, без перебора в Python
+        if threshold == 0:
+            return [(photo, 0) for photo in query.filter(image_hash=photo_hash)]
+        
+        if user_profile is None and hash_algo == HASH_ALGO:
+            neighbors = photo_hash_index.find(photo_hash, threshold)
+        elif user_profile is not None:
+            target = Photo.hash_to_int64(photo_hash)
+            if target is None:
+                return []
+            # Хеши галереи берутся из кэша, расстояния считаются одним
+            # векторным проходом, полные объекты - только для соседей
+            ids, packed = get_user_photo_hashes(user_profile, hash_algo)
+            neighbors = _hamming_neighbors(ids, packed, target, threshold)
+        else:
+            neighbors = find_phash_neighbors(photo_hash, threshold=threshold, queryset=query)
         
-        for photo in query:
-            try:
-                existing_hash = imagehash.hex_to_hash(photo.image_hash)
-                difference = target_hash - existing_hash
-                
-                if difference <= threshold:
-                    similar_photos.append((photo, difference))
-            except Exception:
-                continue
+        if not neighbors:
+            return []
         
-        # Сортируем по похожести (меньше = более похоже)
-        similar_photos.sort(key=lambda x: x[1])
+        photos = query.in_bulk([photo_id for photo_id, _ in neighbors])
+        target = int(photo_hash, 16)
+        
+        # Порядок neighbors уже по похожести (меньше = более похоже).
+        # Расстояние сверяем с БД: запись в индексе могла устареть
+        return [
+            (photos[photo_id], difference)
+            for photo_id, difference in neighbors
+            if photo_id in photos
+            and (photos[photo_id].image_hash_int ^ target).bit_count() == difference
+        ]
+
+
+    @staticmethod
+    def has_exact_duplicate(photo_hash, user_profile=None, exclude_photo_id=None, hash_algo=None):
+        """
+        Быстрая проверка точного дубликата (расстояние 0).
         
-        return similar_photos
+        Один EXISTS по индексу image_hash (на PostgreSQL - хеш-индекс).
+        """
+        query = Photo.objects.filter(image_hash=photo_hash, image_hash_algo=hash_algo or HASH_ALGO)
+        if user_profile is not None:
+            query = query.filter(user_profile=user_profile)
+        if exclude_photo_id:
+            query = query.exclude(id=exclude_photo_id)
+        return query.exists()
+
+
+def _popcount64(values):
+    """Число единичных битов в каждом элементе массива uint64"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return np.unpackbits(values[..., None].view(np.uint8), axis=-1).sum(axis=-1)
+
+
+def _load_hash_array(queryset):
+    """
+    (ids, массив uint64) хешей выборки одним values_list
+    
+    BIGINT знаковый: биты хеша хранятся как int64, и массив просто
+    переинтерпретируется как uint64 без копирования.
+    """
+    rows = list(
+        queryset.filter(image_hash_u64__isnull=False)
+        .values_list('id', 'image_hash_u64')
+    )
+    ids = [photo_id for photo_id, _ in rows]
+    packed = np.fromiter(
+        (value for _, value in rows), dtype=np.int64, count=len(rows)
+    ).view(np.uint64)
+    return ids, packed
+
+
+def _hamming_neighbors(ids, packed, target, threshold) -> list:
+    """[(photo_id, distance), ...] в пределах threshold от target (int64 из hash_to_int64)"""
+    if not ids:
+        return []
+    
+    distances = _popcount64(packed ^ np.int64(target).view(np.uint64))
+    
+    matches = np.flatnonzero(distances <= threshold)
+    matches = matches[np.argsort(distances[matches], kind='stable')]
+    
+    return [(ids[i], int(distances[i])) for i in matches]
+
+
+def find_phash_neighbors(photo_hash, threshold=5, queryset=None) -> list:
+    """
+    Векторный поиск фото в пределах расстояния Хэмминга от хеша
+    
+    Хеши выборки читаются из колонки image_hash_u64 прямо в массив
+    uint64 (np.fromiter), после чего XOR и popcount считаются numpy
+    сразу для всего массива, без цикла по фото в Python.
+    
+    Args:
+        photo_hash: хеш для сравнения (64 бита = 16 hex-символов)
+        threshold: максимальное расстояние Хэмминга
+        queryset: выборка Photo (по умолчанию все фото с хешем текущего алгоритма)
+    
+    Returns:
+        list: [(photo_id, distance), ...] по возрастанию расстояния
+    """
+    if queryset is None:
+        queryset = Photo.objects.filter(image_hash__isnull=False, image_hash_algo=HASH_ALGO)
+    
+    # Хеши другого размера не сравниваем
+    target = Photo.hash_to_int64(photo_hash)
+    if target is None:
+        return []
+    
+    ids, packed = _load_hash_array(queryset)
+    return _hamming_neighbors(ids, packed, target, threshold)
+
+
+def get_user_photo_hashes(user_profile, hash_algo=None):
+    """
+    Хеши галереи пользователя: (ids, массив uint64)
+    
+    Кэшируются по ключу с UserProfile.photos_hash_version, которая
+    увеличивается при любом изменении фото профиля, поэтому сброс
+    кэша не нужен: новая версия - новый ключ. Версия читается из БД
+    (а не из переданного объекта, который мог устареть).
+    """
+    hash_algo = hash_algo or HASH_ALGO
+    queryset = Photo.objects.filter(user_profile=user_profile, image_hash_algo=hash_algo)
+    
+    version = (
+        UserProfile.objects.filter(pk=user_profile.pk)
+        .values_list('photos_hash_version', flat=True)
+        .first()
+    )
+    key = USER_HASHES_KEY.format(
+        profile_id=user_profile.pk, hash_algo=hash_algo, version=version
+    )
+    
+    try:
+        return cache.get_or_set(key, lambda: _load_hash_array(queryset), USER_HASHES_TIMEOUT)
+    except Exception as e:
+        logger.error(f'Error reading cached photo hashes for profile {user_profile.pk}: {e}')
+        return _load_hash_array(queryset)
+
+
+def invalidate_user_photo_hashes(*profile_ids):
+    """Увеличить photos_hash_version (после изменения фото в обход save()/delete())"""
+    profile_ids = {profile_id for profile_id in profile_ids if profile_id}
+    if profile_ids:
+        UserProfile.objects.filter(pk__in=profile_ids).update(
+            photos_hash_version=F('photos_hash_version') + 1
+        )
 
 
 # ✅ Удобные функции-обёртки для быстрого использования
@@ -84,11 +256,41 @@ def verify_photo_originality(image_input, user_profile, exclude_photo_id=None):
         exclude_photo_id=exclude_photo_id
     )
     
+    similar += find_similar_legacy_photos(image_input, user_profile, exclude_photo_id)
+    
     is_original = len(similar) == 0
     
     return is_original, photo_hash, similar
 
 
+def find_similar_legacy_photos(image_input, user_profile, exclude_photo_id=None, threshold=5):
+    """
+    Поиск среди фото, хеш которых ещё посчитан устаревшим алгоритмом
+    
+    Пока пересчёт хешей не закончен, новое фото сравнивается и с такими
+    фото: для этого его average hash считается отдельно. Когда старых
+    хешей у пользователя не осталось, обходится одним EXISTS.
+    
+    Returns:
+        list: [(Photo, similarity_score), ...]
+    """
+    legacy = Photo.objects.filter(image_hash__isnull=False, image_hash_algo=LEGACY_HASH_ALGO)
+    if user_profile is not None:
+        legacy = legacy.filter(user_profile=user_profile)
+    if exclude_photo_id:
+        legacy = legacy.exclude(id=exclude_photo_id)
+    if not legacy.exists():
+        return []
+    
+    return PhotoVerificationService.find_similar_photos(
+        photo_hash=calculate_legacy_photo_hash(image_input),
+        user_profile=user_profile,
+        exclude_photo_id=exclude_photo_id,
+        threshold=threshold,
+        hash_algo=LEGACY_HASH_ALGO
+    )
+
+
 def calculate_photo_hash(image_input):
     """
     Вычисляет perceptual hash изображения
@@ -105,56 +307,181 @@ def calculate_photo_hash(image_input):
     ✅ Работает с локальным хранилищем И облачными (S3, GCS и т.д.)
     """
     try:
-        # Случай 1: bytes
-        if isinstance(image_input, bytes):
-            image = Image.open(io.BytesIO(image_input))
-        
-        # Случай 2: file-like object (имеет метод read)
-        elif hasattr(image_input, 'read'):
-            image_data = image_input.read()
-            # Если read() вернул не bytes, а file-like, читаем еще раз
-            if hasattr(image_data, 'read'):
-                image_data = image_data.read()
-            image = Image.open(io.BytesIO(image_data))
-        
-        # Случай 3: строка (путь к файлу) - для обратной совместимости
-        elif isinstance(image_input, str):
-            image = Image.open(image_input)
+        image = _prepare_for_hash(_open_image(image_input))
         
-        else:
-            raise ValueError(f"Неподдерживаемый тип входных данных: {type(image_input)}")
+        # Вычисляем perceptual hash (DCT, см. HASH_ALGO)
+        hash_value = imagehash.phash(image, hash_size=HASH_SIZE)
+        
+        return str(hash_value)
+        
+    except Exception as e:
+        raise ValueError(f"Ошибка вычисления хеша изображения: {e}")
+
+
+def calculate_legacy_photo_hash(image_input):
+    """
+    Average hash (LEGACY_HASH_ALGO) - так хешировались фото до перехода на pHash
+    
+    Нужен только для сравнения с ещё не пересчитанными фото
+    (см. find_similar_legacy_photos).
+    """
+    try:
+        image = _open_image(image_input)
         
         # Конвертируем в RGB если нужно
         if image.mode not in ('RGB', 'L'):
             image = image.convert('RGB')
         
-        # Вычисляем perceptual hash
-        hash_value = imagehash.average_hash(image, hash_size=8)
-        
-        return str(hash_value)
+        return str(imagehash.average_hash(image, hash_size=HASH_SIZE))
         
     except Exception as e:
         raise ValueError(f"Ошибка вычисления хеша изображения: {e}")
 
-def find_photo_duplicates(user_profile) -> list:
+
+def _open_image(image_input):
+    """Открывает изображение из bytes, file-like object или пути к файлу"""
+    # Случай 1: bytes
+    if isinstance(image_input, bytes):
+        return Image.open(io.BytesIO(image_input))
+    
+    # Случай 2: file-like object (имеет метод read) - Pillow читает
+    # из него сам, буферизованно и только то, что нужно для декодирования
+    if hasattr(image_input, 'read'):
+        if hasattr(image_input, 'seek'):
+            image_input.seek(0)
+        return Image.open(image_input)
+    
+    # Случай 3: строка (путь к файлу) - для обратной совместимости
+    if isinstance(image_input, str):
+        return Image.open(image_input)
+    
+    raise ValueError(f"Неподдерживаемый тип входных данных: {type(image_input)}")
+
+
+def _prepare_for_hash(image):
+    """Предварительное уменьшение и приведение режима перед pHash"""
+    image.thumbnail((HASH_PRESHRINK_SIZE, HASH_PRESHRINK_SIZE), Image.BILINEAR)
+    
+    # Конвертируем в RGB если нужно
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    
+    return image
+
+
+def calculate_photo_hashes(images_data) -> list:
+    """
+    Пакетное вычисление хешей (тот же pHash, что и calculate_photo_hash)
+    
+    Каждое изображение декодируется и уменьшается до 32x32 в оттенках серого,
+    после чего вся пачка собирается в один массив (N, 32, 32): DCT, медиана,
+    сравнение и упаковка битов выполняются одной векторной операцией.
+    
+    Args:
+        images_data: список bytes с содержимым файлов
+    
+    Returns:
+        list: хеши в том же порядке (None для нечитаемых изображений)
+    """
+    pixels = []
+    positions = []
+    
+    for position, image_data in enumerate(images_data):
+        try:
+            image = _prepare_for_hash(Image.open(io.BytesIO(image_data)))
+            image = image.convert('L').resize((PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE), Image.LANCZOS)
+            pixels.append(np.asarray(image))
+            positions.append(position)
+        except Exception:
+            continue
+    
+    hashes = [None] * len(images_data)
+    if not pixels:
+        return hashes
+    
+    batch = np.stack(pixels)
+    dct = scipy.fftpack.dct(scipy.fftpack.dct(batch, axis=1), axis=2)
+    low_freq = dct[:, :HASH_SIZE, :HASH_SIZE]
+    bits = low_freq > np.median(low_freq, axis=(1, 2), keepdims=True)
+    packed = np.packbits(bits.reshape(len(pixels), -1), axis=1)
+    
+    for position, row in zip(positions, packed):
+        hashes[position] = row.tobytes().hex()
+    
+    return hashes
+
+def find_photo_duplicates(user_profile, threshold=5) -> list:
     """
     Найти все дубликаты фото у пользователя
     
+    Хеши галереи загружаются одним values_list. Фото с одинаковым
+    content_sha256 - точные копии (расстояние 0) и группируются сразу,
+    без сравнения хешей; попарные расстояния numpy (XOR + popcount)
+    считаются только между группами, по одному хешу на группу и только
+    для хешей одного алгоритма. Полные объекты Photo загружаются одним
+    in_bulk только для фото, у которых есть пары.
+    
+    Returns:
+        list: [(Photo, [(Photo, distance), ...]), ...]
+    
     Example:
         duplicates = find_photo_duplicates(user.userprofile)
     """
-    service = PhotoVerificationService()
-    photos = Photo.objects.filter(user_profile=user_profile)
-    
-    duplicates = []
-    for photo in photos:
-        if photo.image_hash:
-            similar = service.find_similar_photos(
-                photo.image_hash,
-                user_profile=user_profile,
-                exclude_photo_id=photo.id
-            )
-            if similar:
-                duplicates.append((photo, similar))
-    
-    return duplicates
+    rows = list(
+        Photo.objects.filter(user_profile=user_profile)
+        .filter(Q(image_hash_u64__isnull=False) | ~Q(content_sha256=''))
+        .values_list('id', 'image_hash_u64', 'image_hash_algo', 'content_sha256')
+    )
+    
+    # Группа - точные копии одного файла; фото без sha256 - группа из одного
+    members = defaultdict(list)
+    group_hashes = defaultdict(dict)  # алгоритм -> {группа: хеш}
+    for photo_id, value, algo, sha256 in rows:
+        group = sha256 or photo_id
+        members[group].append(photo_id)
+        if value is not None:
+            group_hashes[algo].setdefault(group, value)
+    
+    # Перцептивные пары между группами: {группа: {группа: расстояние}}
+    near = defaultdict(dict)
+    for hashes in group_hashes.values():
+        groups = list(hashes)
+        packed = np.fromiter(hashes.values(), dtype=np.int64, count=len(groups)).view(np.uint64)
+        
+        distances = _popcount64(packed[:, None] ^ packed[None, :])
+        np.fill_diagonal(distances, threshold + 1)
+        
+        for i, j in zip(*np.nonzero(distances <= threshold)):
+            distance = int(distances[i, j])
+            known = near[groups[i]].get(groups[j])
+            if known is None or distance < known:
+                near[groups[i]][groups[j]] = distance
+    
+    # Порядок как у Photo.objects.filter(...) (сортировка модели)
+    position = {photo_id: index for index, (photo_id, _, _, _) in enumerate(rows)}
+    
+    pairs = []
+    for photo_id, _, _, sha256 in rows:
+        group = sha256 or photo_id
+        similar = [(other_id, 0) for other_id in members[group] if other_id != photo_id]
+        similar += [
+            (other_id, distance)
+            for other_group, distance in near[group].items()
+            for other_id in members[other_group]
+        ]
+        if similar:
+            similar.sort(key=lambda item: (item[1], position[item[0]]))
+            pairs.append((photo_id, similar))
+    
+    if not pairs:
+        return []
+    
+    photos = Photo.objects.in_bulk(
+        {photo_id for photo_id, _ in pairs}
+        | {other_id for _, similar in pairs for other_id, _ in similar}
+    )
+    
+    return [
+        (photos[photo_id], [(photos[other_id], distance) for other_id, distance in similar])
+        for photo_id, similar in pairs
+    ]
@@ -2,17 +2,48 @@
 Сервис для обратного поиска изображений
 Проверяет, не использует ли пользователь фото из интернета
 """
+import asyncio
+import hashlib
+import logging
 import os
 import io
+import threading
+from collections import Counter
 from typing import Tuple, List, Dict
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.core.cache import cache
+from PIL import Image
+from profiles.services.photo_verification import calculate_photo_hash
+
+logger = logging.getLogger(__name__)
+
+# Результат поиска одного сервиса по содержимому файла (kind: sha256 - те же
+# байты, phash - то же изображение после пережатия/смены формата)
+SEARCH_CACHE_KEY = 'reverse_search:{method}:{kind}:{digest}'
 
 
 class ReverseImageSearchService:
     """Сервис обратного поиска изображений"""
     
-    @staticmethod
-    def search_google_vision(image_file) -> Tuple[bool, List[Dict], str]:
+    # Сколько изображений Vision API принимает в одном batch_annotate_images
+    VISION_BATCH_SIZE = 16
+    
+    # Перед отправкой в сервисы фото уменьшается до этого размера по длинной
+    # стороне и пережимается в JPEG: для поиска копий полного разрешения
+    # не нужно, а многомегабайтная загрузка - основная часть времени запроса
+    SEARCH_MAX_SIZE = 1024
+    SEARCH_JPEG_QUALITY = 85
+    # Файлы меньше этого размера и не больше SEARCH_MAX_SIZE уходят как есть
+    SEARCH_PREPROCESS_MIN_BYTES = 300 * 1024
+    
+    # Клиенты Vision (gRPC-канал) и TinEye создаются один раз на процесс
+    _vision_client = None
+    _vision_client_lock = threading.Lock()
+    _tineye_api = None
+    
+    @classmethod
+    def search_google_vision(cls, image_file) -> Tuple[bool, List[Dict], str]:
         """
         Поиск изображения через Google Vision API
         
@@ -25,106 +56,263 @@ class ReverseImageSearchService:
                 - matches: список найденных совпадений
                 - error_message: сообщение об ошибке если есть
         """
+        return cls.batch_search_google_vision([image_file])[0]
+    
+    @classmethod
+    def batch_search_google_vision(cls, image_files) -> List[Tuple[bool, List[Dict], str]]:
+        """
+        Поиск нескольких изображений через Google Vision API
+        
+        Изображения отправляются пачками по VISION_BATCH_SIZE в одном
+        batch_annotate_images вместо отдельного web_detection на каждое:
+        N фото - ceil(N/16) запросов (тарифицируется так же, по изображениям).
+        
+        Args:
+            image_files: список файлов (Django UploadedFile, путь или байты)
+            
+        Returns:
+            List[Tuple[bool, List[Dict], str]]: (is_unique, matches, error_message)
+            для каждого файла, в том же порядке
+        """
+        try:
+            contents = [cls._read_content(image_file) for image_file in image_files]
+        except OSError as e:
+            return [(False, [], f"Error: {str(e)}")] * len(image_files)
+        
+        return cls._search_cached('google', contents, cls._annotate_web_detection)
+    
+    @classmethod
+    def _annotate_web_detection(cls, contents) -> List[Tuple[bool, List[Dict], str]]:
+        """batch_annotate_images пачками по VISION_BATCH_SIZE (без кэша)"""
         try:
             from google.cloud import vision
-            from google.oauth2 import service_account
-            
-            # Инициализация клиента
-            credentials_path = getattr(settings, 'GOOGLE_VISION_CREDENTIALS', None)
-            
-            if credentials_path and os.path.exists(credentials_path):
-                credentials = service_account.Credentials.from_service_account_file(
-                    credentials_path
-                )
-                client = vision.ImageAnnotatorClient(credentials=credentials)
-            else:
-                # Используем переменные окружения
-                client = vision.ImageAnnotatorClient()
-            
-            # Читаем изображение
-            if hasattr(image_file, 'read'):
-                # Django UploadedFile
-                content = image_file.read()
-                image_file.seek(0)  # Сбрасываем указатель
-            elif isinstance(image_file, str):
-                # Путь к файлу
-                with io.open(image_file, 'rb') as image_file_obj:
-                    content = image_file_obj.read()
-            else:
-                content = image_file
-            
-            image = vision.Image(content=content)
-            
-            # Выполняем поиск похожих изображений
-            response = client.web_detection(image=image)
-            web_detection = response.web_detection
-            
-            if response.error.message:
-                return False, [], f"API Error: {response.error.message}"
-            
-            # Анализируем результаты
-            matches = []
-            
-            # Полные совпадения
-            if web_detection.full_matching_images:
-                for image in web_detection.full_matching_images[:5]:
-                    matches.append({
-                        'type': 'full_match',
-                        'url': image.url,
-                        'score': 100
-                    })
-            
-            # Частичные совпадения
-            if web_detection.partial_matching_images:
-                for image in web_detection.partial_matching_images[:5]:
-                    matches.append({
-                        'type': 'partial_match',
-                        'url': image.url,
-                        'score': 80
-                    })
-            
-            # Визуально похожие изображения
-            if web_detection.visually_similar_images:
-                for image in web_detection.visually_similar_images[:3]:
-                    matches.append({
-                        'type': 'similar',
-                        'url': image.url,
-                        'score': 60
-                    })
-            
-            # Страницы с похожими изображениями
-            pages = []
-            if web_detection.pages_with_matching_images:
-                for page in web_detection.pages_with_matching_images[:5]:
-                    pages.append({
-                        'url': page.url,
-                        'title': page.page_title if hasattr(page, 'page_title') else 'Без названия'
-                    })
+        except ImportError:
+            error = "Google Cloud Vision library not installed. Run: pip install google-cloud-vision"
+            return [(False, [], error)] * len(contents)
+        
+        results = []
+        
+        for start in range(0, len(contents), cls.VISION_BATCH_SIZE):
+            chunk = contents[start:start + cls.VISION_BATCH_SIZE]
             
-            # Добавляем информацию о страницах к совпадениям
-            if pages:
-                matches.append({
-                    'type': 'pages',
-                    'pages': pages,
-                    'score': 70
-                })
+            try:
+                client = cls._get_vision_client()
+                
+                requests = [
+                    vision.AnnotateImageRequest(
+                        image=vision.Image(content=cls._preprocess(content)),
+                        features=[vision.Feature(type_=vision.Feature.Type.WEB_DETECTION)],
+                    )
+                    for content in chunk
+                ]
+                
+                # Выполняем поиск похожих изображений
+                batch_response = client.batch_annotate_images(requests=requests)
+                
+                chunk_results = [
+                    (False, [], f"API Error: {response.error.message}")
+                    if response.error.message
+                    else cls._parse_web_detection(response.web_detection)
+                    for response in batch_response.responses
+                ]
+                
+            except Exception as e:
+                chunk_results = [(False, [], f"Error: {str(e)}")] * len(chunk)
             
-            # Определяем уникальность
-            # Считаем фото неуникальным если есть полные или много частичных совпадений
-            full_matches = [m for m in matches if m['type'] == 'full_match']
-            partial_matches = [m for m in matches if m['type'] == 'partial_match']
+            results.extend(chunk_results)
+        
+        return results
+    
+    @classmethod
+    def _get_vision_client(cls):
+        """
+        Общий для процесса клиент Google Vision
+        
+        Создание клиента - это чтение ключа и открытие gRPC-канала;
+        клиент потокобезопасен, поэтому переиспользуется всеми запросами.
+        """
+        if cls._vision_client is None:
+            with cls._vision_client_lock:
+                if cls._vision_client is None:
+                    from google.cloud import vision
+                    from google.oauth2 import service_account
+                    
+                    credentials_path = getattr(settings, 'GOOGLE_VISION_CREDENTIALS', None)
+                    
+                    if credentials_path and os.path.exists(credentials_path):
+                        credentials = service_account.Credentials.from_service_account_file(
+                            credentials_path
+                        )
+                        cls._vision_client = vision.ImageAnnotatorClient(credentials=credentials)
+                    else:
+                        # Используем переменные окружения
+                        cls._vision_client = vision.ImageAnnotatorClient()
+        return cls._vision_client
+    
+    @classmethod
+    def _get_tineye_api(cls):
+        """Общий для процесса клиент TinEye (None, если ключ не настроен)"""
+        if cls._tineye_api is None:
+            from pytineye import TinEyeAPIRequest
             
-            is_unique = len(full_matches) == 0 and len(partial_matches) < 3
+            api_key = getattr(settings, 'TINEYE_API_KEY', None)
+            api_url = getattr(settings, 'TINEYE_API_URL', 'https://api.tineye.com/rest/')
             
-            return is_unique, matches, ""
+            if not api_key:
+                return None
             
-        except ImportError:
-            return False, [], "Google Cloud Vision library not installed. Run: pip install google-cloud-vision"
+            cls._tineye_api = TinEyeAPIRequest(api_url, api_key)
+        return cls._tineye_api
+    
+    @classmethod
+    def _reset_clients(cls):
+        """
+        Сброс клиентов в дочернем процессе после fork (gunicorn --preload,
+        prefork-воркеры celery): gRPC-канал и соединения родителя в потомке
+        не работают, потомок создаст свои клиенты при первом запросе
+        """
+        cls._vision_client = None
+        cls._vision_client_lock = threading.Lock()
+        cls._tineye_api = None
+    
+    @classmethod
+    def _search_cached(cls, method, contents, search) -> List[Tuple[bool, List[Dict], str]]:
+        """
+        Результаты search(contents) с кэшем по sha256 и pHash каждого файла
+        
+        В сервис уходят только файлы, которых нет в кэше; успешные ответы
+        (без ошибки) сохраняются на REVERSE_SEARCH_CACHE_TIMEOUT секунд.
+        """
+        keys = [cls._search_cache_keys(method, content) for content in contents]
+        
+        try:
+            cached = cache.get_many([key for content_keys in keys for key in content_keys])
         except Exception as e:
-            return False, [], f"Error: {str(e)}"
+            logger.error(f'Error reading reverse search cache: {e}')
+            cached = {}
+        
+        results = [None] * len(contents)
+        misses = []
+        for index, content_keys in enumerate(keys):
+            hit = next((cached[key] for key in content_keys if key in cached), None)
+            if hit is not None:
+                is_unique, matches = hit
+                results[index] = (is_unique, matches, "")
+            else:
+                misses.append(index)
+        
+        if not misses:
+            return results
+        
+        fresh = {}
+        for index, result in zip(misses, search([contents[index] for index in misses])):
+            results[index] = result
+            is_unique, matches, error = result
+            if not error:
+                fresh.update((key, (is_unique, matches)) for key in keys[index])
+        
+        if fresh:
+            timeout = getattr(settings, 'REVERSE_SEARCH_CACHE_TIMEOUT', 7 * 24 * 60 * 60)
+            try:
+                cache.set_many(fresh, timeout)
+            except Exception as e:
+                logger.error(f'Error writing reverse search cache: {e}')
+        
+        return results
+    
+    @staticmethod
+    def _search_cache_keys(method, content) -> List[str]:
+        """Ключи кэша файла: sha256 байтов и, если изображение читается, pHash"""
+        if isinstance(content, str):
+            # Файл на диске хешируется потоково, не загружаясь в память целиком
+            with open(content, 'rb') as f:
+                digest = hashlib.file_digest(f, 'sha256').hexdigest()
+        else:
+            digest = hashlib.sha256(content).hexdigest()
+        
+        keys = [SEARCH_CACHE_KEY.format(method=method, kind='sha256', digest=digest)]
+        try:
+            keys.append(SEARCH_CACHE_KEY.format(
+                method=method, kind='phash', digest=calculate_photo_hash(content)
+            ))
+        except ValueError:
+            pass
+        return keys
     
     @staticmethod
-    def search_tineye(image_file) -> Tuple[bool, List[Dict], str]:
+    def _read_content(image_file):
+        """
+        Содержимое изображения: путь к файлу на диске или байты
+        
+        Файл на диске (путь или загрузка, которую Django сохранил во
+        временный файл) целиком не читается: хеши для кэша считаются
+        потоково, а в сервис уходит уменьшенная копия (_preprocess).
+        В память читаются только загрузки, которые и так в памяти.
+        """
+        if hasattr(image_file, 'temporary_file_path'):
+            # Django TemporaryUploadedFile
+            return image_file.temporary_file_path()
+        if hasattr(image_file, 'read'):
+            # Django UploadedFile
+            content = image_file.read()
+            image_file.seek(0)  # Сбрасываем указатель
+            return content
+        if isinstance(image_file, str):
+            # Путь к файлу: проверяем, что он есть, до похода в кэш и API
+            os.stat(image_file)
+        return image_file
+    
+    @staticmethod
+    def _read_bytes(content) -> bytes:
+        """Байты содержимого из _read_content"""
+        if isinstance(content, str):
+            with io.open(content, 'rb') as image_file_obj:
+                return image_file_obj.read()
+        return content
+    
+    @staticmethod
+    def _parse_web_detection(web_detection) -> Tuple[bool, List[Dict], str]:
+        """Разбор web_detection одного изображения в (is_unique, matches, '')"""
+        # Полные, частичные совпадения и визуально похожие изображения
+        full_matches = [
+            {'type': 'full_match', 'url': image.url, 'score': 100}
+            for image in web_detection.full_matching_images[:5]
+        ]
+        partial_matches = [
+            {'type': 'partial_match', 'url': image.url, 'score': 80}
+            for image in web_detection.partial_matching_images[:5]
+        ]
+        matches = full_matches + partial_matches
+        matches.extend(
+            {'type': 'similar', 'url': image.url, 'score': 60}
+            for image in web_detection.visually_similar_images[:3]
+        )
+        
+        # Страницы с похожими изображениями
+        pages = []
+        if web_detection.pages_with_matching_images:
+            for page in web_detection.pages_with_matching_images[:5]:
+                pages.append({
+                    'url': page.url,
+                    'title': page.page_title if hasattr(page, 'page_title') else 'Без названия'
+                })
+        
+        # Добавляем информацию о страницах к совпадениям
+        if pages:
+            matches.append({
+                'type': 'pages',
+                'pages': pages,
+                'score': 70
+            })
+        
+        # Определяем уникальность
+        # Считаем фото неуникальным если есть полные или много частичных совпадений
+        is_unique = len(full_matches) == 0 and len(partial_matches) < 3
+        
+        return is_unique, matches, ""
+    
+    @classmethod
+    def search_tineye(cls, image_file) -> Tuple[bool, List[Dict], str]:
         """
         Поиск через TinEye API (требует API ключ)
         
@@ -135,29 +323,55 @@ class ReverseImageSearchService:
             Tuple[bool, List[Dict], str]: (is_unique, matches, error_message)
         """
         try:
-            from pytineye import TinEyeAPIRequest
-            
-            api_key = getattr(settings, 'TINEYE_API_KEY', None)
-            api_url = getattr(settings, 'TINEYE_API_URL', 'https://api.tineye.com/rest/')
-            
-            if not api_key:
+            image_data = cls._read_content(image_file)
+        except OSError as e:
+            return False, [], f"TinEye Error: {str(e)}"
+        
+        return cls._search_cached(
+            'tineye', [image_data], lambda contents: [cls._search_tineye_content(contents[0])]
+        )[0]
+    
+    @classmethod
+    def _preprocess(cls, content) -> bytes:
+        """
+        Уменьшенная JPEG-копия изображения для отправки в сервис поиска
+        
+        content - путь или байты (см. _read_content); Pillow читает файл
+        с диска сам, поэтому в памяти оказывается только уменьшенная копия.
+        Маленькие файлы и файлы, которые Pillow не читает, возвращаются
+        без изменений.
+        """
+        is_path = isinstance(content, str)
+        size = os.path.getsize(content) if is_path else len(content)
+        
+        try:
+            with Image.open(content if is_path else io.BytesIO(content)) as img:
+                if size < cls.SEARCH_PREPROCESS_MIN_BYTES and max(img.size) <= cls.SEARCH_MAX_SIZE:
+                    return cls._read_bytes(content)
+                
+                # thumbnail для JPEG сразу декодирует в уменьшенном масштабе
+                img.thumbnail((cls.SEARCH_MAX_SIZE, cls.SEARCH_MAX_SIZE), Image.LANCZOS)
+                buffer = io.BytesIO()
+                img.convert('RGB').save(
+                    buffer, 'JPEG', quality=cls.SEARCH_JPEG_QUALITY, optimize=True
+                )
+        except Exception as e:
+            logger.warning(f'Could not downscale image for reverse search: {e}')
+            return cls._read_bytes(content)
+        
+        processed = buffer.getvalue()
+        return processed if len(processed) < size else cls._read_bytes(content)
+    
+    @classmethod
+    def _search_tineye_content(cls, image_data) -> Tuple[bool, List[Dict], str]:
+        """Запрос к TinEye по содержимому изображения (без кэша)"""
+        try:
+            api = cls._get_tineye_api()
+            if api is None:
                 return False, [], "TinEye API key not configured"
             
-            # Инициализация API
-            api = TinEyeAPIRequest(api_url, api_key)
-            
-            # Загружаем изображение
-            if hasattr(image_file, 'read'):
-                image_data = image_file.read()
-                image_file.seek(0)
-            elif isinstance(image_file, str):
-                with open(image_file, 'rb') as f:
-                    image_data = f.read()
-            else:
-                image_data = image_file
-            
             # Выполняем поиск
-            response = api.search_data(image_data=image_data)
+            response = api.search_data(image_data=cls._preprocess(image_data))
             
             matches = []
             if response and hasattr(response, 'matches'):
@@ -193,17 +407,19 @@ class ReverseImageSearchService:
         if is_unique:
             return "✅ Фотография уникальная, не найдена в интернете."
         
-        full_matches = [m for m in matches if m.get('type') == 'full_match']
-        partial_matches = [m for m in matches if m.get('type') == 'partial_match']
+        # Один проход по совпадениям: число совпадений каждого типа
+        type_counts = Counter(m.get('type') for m in matches)
+        full_count = type_counts['full_match']
+        partial_count = type_counts['partial_match']
         
-        if full_matches:
+        if full_count:
             return (
-                f"❌ Эта фотография найдена в интернете ({len(full_matches)} точных совпадений). "
+                f"❌ Эта фотография найдена в интернете ({full_count} точных совпадений). "
                 f"Пожалуйста, используйте свою реальную фотографию."
             )
-        elif len(partial_matches) >= 3:
+        elif partial_count >= 3:
             return (
-                f"⚠️ Фотография похожа на изображения из интернета ({len(partial_matches)} совпадений). "
+                f"⚠️ Фотография похожа на изображения из интернета ({partial_count} совпадений). "
                 f"Рекомендуем использовать оригинальное фото."
             )
         else:
@@ -222,15 +438,73 @@ class ReverseImageSearchService:
             Tuple[bool, str, List[Dict]]: (is_unique, message, matches)
         """
         if method == 'google':
-            is_unique, matches, error = cls.search_google_vision(image_file)
+            search_result = cls.search_google_vision(image_file)
         elif method == 'tineye':
-            is_unique, matches, error = cls.search_tineye(image_file)
+            search_result = cls.search_tineye(image_file)
         else:
             return False, "Неизвестный метод проверки", []
         
-        if error:
-            # Если ошибка API - разрешаем загрузку но логируем
-            print(f"⚠️ Ошибка обратного поиска: {error}")
+        return cls._combine_results([search_result])
+    
+    @classmethod
+    async def check_photo_originality_async(cls, image_files, methods=('google',)) -> List[Tuple[bool, str, List[Dict]]]:
+        """
+        Проверка нескольких фото несколькими сервисами одновременно
+        
+        Клиенты Vision и TinEye синхронные, поэтому запросы идут в потоках
+        (asyncio.to_thread) и ждутся вместе через asyncio.gather: время
+        проверки - самый долгий запрос, а не их сумма. Google получает все
+        фото одним пакетным запросом, TinEye - по запросу на фото.
+        
+        Args:
+            image_files: список файлов изображений
+            methods: сервисы проверки ('google', 'tineye')
+            
+        Returns:
+            List[Tuple[bool, str, List[Dict]]]: (is_unique, message, matches)
+            для каждого файла; фото уникально, если его не нашёл ни один сервис
+        """
+        unknown = [method for method in methods if method not in ('google', 'tineye')]
+        if unknown:
+            return [(False, "Неизвестный метод проверки", [])] * len(image_files)
+        
+        # Файлы читаются заранее: потоки не делят указатель UploadedFile
+        contents = [cls._read_content(image_file) for image_file in image_files]
+        
+        tasks = []
+        if 'google' in methods:
+            tasks.append(asyncio.to_thread(cls.batch_search_google_vision, contents))
+        if 'tineye' in methods:
+            tasks.append(asyncio.gather(*[
+                asyncio.to_thread(cls.search_tineye, content) for content in contents
+            ]))
+        
+        per_method = await asyncio.gather(*tasks)
+        
+        return [cls._combine_results(search_results) for search_results in zip(*per_method)]
+    
+    @classmethod
+    def _combine_results(cls, search_results) -> Tuple[bool, str, List[Dict]]:
+        """
+        (is_unique, message, matches) по результатам сервисов для одного фото
+        
+        Сервис с ошибкой не блокирует загрузку; если ошиблись все -
+        проверка считается временно недоступной.
+        """
+        matches = []
+        is_unique = True
+        answered = False
+        
+        for search_unique, search_matches, error in search_results:
+            if error:
+                # Если ошибка API - разрешаем загрузку но логируем
+                logger.warning(f"⚠️ Ошибка обратного поиска: {error}")
+                continue
+            answered = True
+            is_unique = is_unique and search_unique
+            matches.extend(search_matches)
+        
+        if not answered:
             return True, "Проверка временно недоступна", []
         
         message = cls.format_result_message(is_unique, matches)
@@ -238,6 +512,9 @@ class ReverseImageSearchService:
         return is_unique, message, matches
 
 
+os.register_at_fork(after_in_child=ReverseImageSearchService._reset_clients)
+
+
 # ✅ Удобная функция-обёртка
 def check_photo_internet(image_file, method='google') -> Tuple[bool, str, List[Dict]]:
     """
@@ -251,4 +528,15 @@ def check_photo_internet(image_file, method='google') -> Tuple[bool, str, List[D
             for match in matches:
                 print(f"Найдено на: {match['url']}")
     """
-    return ReverseImageSearchService.check_photo_originality(image_file, method)
\ No newline at end of file
+    return ReverseImageSearchService.check_photo_originality(image_file, method)
+
+
+def check_photos_internet(image_files, methods=('google',)) -> List[Tuple[bool, str, List[Dict]]]:
+    """
+    Проверка нескольких фото в интернете одним вызовом из синхронного кода
+    
+    Example:
+        for is_unique, message, matches in check_photos_internet(files, ('google', 'tineye')):
+            ...
+    """
+    return async_to_sync(ReverseImageSearchService.check_photo_originality_async)(image_files, methods)
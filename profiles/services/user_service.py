@@ -1,53 +1,58 @@
-from django.db.models import Max
-from profiles.models import Like, Message, UserSession
+from django.db.models import Case, F, Max, Q, Subquery, When
+from profiles.models import Message, UserSession
+from profiles.services.like_service import check_mutual_like
 
 class UserService:
     @staticmethod
     def check_mutual_like(user1, user2):
         """Проверка взаимной симпатии"""
-        return (
-            Like.objects.filter(user_from=user1, user_to=user2).exists() and
-            Like.objects.filter(user_from=user2, user_to=user1).exists()
-        )
+        return check_mutual_like(user1, user2)
 
     @staticmethod
-    def get_user_conversations(user):
-        """Получить список собеседников"""
-        sent_to = Message.objects.filter(
-            sender=user,
-            is_deleted_by_sender=False
-        ).values_list('receiver_id', flat=True)
-
-        received_from = Message.objects.filter(
-            receiver=user,
-            is_deleted_by_receiver=False
-        ).values_list('sender_id', flat=True)
-
-        interlocutor_ids = set(sent_to) | set(received_from)
+    def interlocutor_ids(user):
+        """
+        Подзапрос ID собеседников пользователя
+
+        Собеседник - другая сторона каждого не удалённого пользователем
+        сообщения. Используется как id__in=..., поэтому список собеседников
+        строится одним SQL-запросом, без выгрузки ID в Python.
+        """
+        return Message.objects.filter(
+            Q(sender=user, is_deleted_by_sender=False) |
+            Q(receiver=user, is_deleted_by_receiver=False)
+        ).annotate(
+            interlocutor_id=Case(
+                When(sender=user, then=F('receiver_id')),
+                default=F('sender_id')
+            )
+        ).values('interlocutor_id')
 
+    @staticmethod
+    def get_user_conversations(user):
+        """Получить список собеседников (один SQL-запрос с подзапросом)"""
         from django.contrib.auth import get_user_model
         User = get_user_model()
 
         return User.objects.filter(
-            id__in=interlocutor_ids
+            id__in=UserService.interlocutor_ids(user)
         ).select_related('userprofile').annotate(
             last_message_time=Max('sent_messages__timestamp')
         ).order_by('-last_message_time')
 
     @staticmethod
     def update_session_stats(user, **kwargs):
-        """Обновить статистику сессии"""
-        try:
-            session = UserSession.objects.filter(
-                user=user,
-                logout_time__isnull=True
-            ).latest('login_time')
-
-            for field, increment in kwargs.items():
-                current = getattr(session, field, 0)
-                setattr(session, field, current + increment)
-
-            session.save(update_fields=list(kwargs.keys()))
-
-        except UserSession.DoesNotExist:
-            pass
\ No newline at end of file
+        """
+        Обновить статистику активной сессии одним UPDATE:
+        счётчики увеличиваются в БД (F()), без чтения и гонок
+
+        Returns:
+            int: число обновлённых сессий (0 - активной сессии нет)
+        """
+        latest_session = UserSession.objects.filter(
+            user=user,
+            logout_time__isnull=True
+        ).order_by('-login_time').values('pk')[:1]
+
+        return UserSession.objects.filter(pk=Subquery(latest_session)).update(
+            **{field: F(field) + increment for field, increment in kwargs.items()}
+        )
@@ -1,27 +1,44 @@
 import logging
 
+from django.db import router
+
 from profiles.models import Notification
 
 
 logger = logging.getLogger(__name__)
 
+# Сколько уведомлений удаляется одним DELETE
+CLEANUP_BATCH_SIZE = 10000
+
 # ==============================================================================
 # УТИЛИТЫ ДЛЯ УВЕДОМЛЕНИЙ
 # ==============================================================================
-def cleanup_old_notifications(days=30):
+def cleanup_old_notifications(days=30, batch_size=CLEANUP_BATCH_SIZE):
     """
     Утилита для очистки старых прочитанных уведомлений.
     Можно вызывать через Celery task или management command.
+
+    Удаляет пачками по batch_size прямым DELETE по id, без загрузки
+    объектов в память и без сигналов: на уведомления никто не ссылается,
+    а счётчик непрочитанных от удаления прочитанных не меняется.
     """
     from datetime import timedelta
     from django.utils import timezone
     
     cutoff_date = timezone.now() - timedelta(days=days)
     
-    deleted_count, _ = Notification.objects.filter(
+    expired = Notification.objects.filter(
         is_read=True,
         created_at__lt=cutoff_date
-    ).delete()
+    ).order_by()
+    using = router.db_for_write(Notification)
+    
+    deleted_count = 0
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted_count += Notification.objects.filter(pk__in=ids)._raw_delete(using=using)
     
     logger.info(f"Удалено старых уведомлений: {deleted_count}")
     return deleted_count
\ No newline at end of file
@@ -1,3 +1,4 @@
+import logging
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
@@ -6,6 +7,8 @@ from django.dispatch import receiver
 from profiles.models import UserProfile
 from profiles.views.auth import User
 
+logger = logging.getLogger(__name__)
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """Автоматически создаёт профиль при создании пользователя"""
@@ -13,11 +16,4 @@ def create_user_profile(sender, instance, created, **kwargs):
         # Проверяем что профиль ещё не создан
         if not hasattr(instance, 'userprofile'):
             UserProfile.objects.create(user=instance)
-            print(f"✅ Профиль создан для пользователя: {instance.username}")
-
-
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Сохраняет профиль при сохранении пользователя"""
-    if hasattr(instance, 'userprofile'):
-        instance.userprofile.save()
+            logger.debug("✅ Профиль создан для пользователя: %s", instance.username)
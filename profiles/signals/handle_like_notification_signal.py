@@ -1,6 +1,5 @@
 import logging
 from profiles.models import Like, Notification
-from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
@@ -13,73 +12,21 @@ logger = logging.getLogger(__name__)
 def handle_like_notification(sender, instance, created, **kwargs):
     """
     Обработка уведомлений при создании симпатии.
-    - Создаёт уведомление о новой симпатии (если её ещё нет)
-    - Проверяет взаимность и создаёт уведомление о матче
+    Уведомление о симпатии и проверка взаимности (уведомление о матче)
+    выполняются задачей create_like_notifications после коммита -
+    запрос на лайк не ждёт вставки уведомлений.
     """
     if not created:
         return
 
-    liker = instance.user_from
-    liked = instance.user_to
-
     # Защита от лайка самому себе
-    if liker == liked:
-        logger.warning(f"Попытка лайкнуть самого себя: {liker.username}")
+    if instance.user_from_id == instance.user_to_id:
+        logger.warning(f"Попытка лайкнуть самого себя: user #{instance.user_from_id}")
         return
 
-    try:
-        with transaction.atomic():
-            # 🔍 Проверка на существующее уведомление о симпатии
-            existing_like_notification = Notification.objects.filter(
-                recipient=liked,
-                sender=liker,
-                notification_type='LIKE',
-                message__contains='выразил'
-            ).exists()
-
-            if not existing_like_notification:
-                Notification.objects.create(
-                    recipient=liked,
-                    sender=liker,
-                    message=f"{liker.first_name or liker.username} выразил(а) вам симпатию!",
-                    notification_type='LIKE'
-                )
-                logger.info(f"Создано уведомление о симпатии: {liker.username} → {liked.username}")
-            else:
-                logger.info(f"Уведомление о симпатии уже существует: {liker.username} → {liked.username}")
-
-            # Проверка взаимности
-            mutual_like_exists = Like.objects.filter(
-                user_from=liked,
-                user_to=liker
-            ).exists()
+    from profiles.tasks import create_like_notifications, delay_on_commit
 
-            if mutual_like_exists:
-                existing_match_notification = Notification.objects.filter(
-                    recipient=liker,
-                    sender=liked,
-                    message__contains='взаимная симпатия'
-                ).exists()
-
-                if not existing_match_notification:
-                    Notification.objects.create(
-                        recipient=liker,
-                        sender=liked,
-                        message=f"🎉 У вас взаимная симпатия с {liked.first_name or liked.username}! Теперь вы можете общаться.",
-                        notification_type='LIKE'
-                    )
-                    Notification.objects.create(
-                        recipient=liked,
-                        sender=liker,
-                        message=f"🎉 У вас взаимная симпатия с {liker.first_name or liker.username}! Теперь вы можете общаться.",
-                        notification_type='LIKE'
-                    )
-                    logger.info(f"Взаимная симпатия: {liker.username} ↔ {liked.username}")
-                else:
-                    logger.info(f"Уведомление о взаимной симпатии уже существует: {liker.username} ↔ {liked.username}")
-
-    except Exception as e:
-        logger.error(f"Ошибка при обработке симпатии от {liker.username} к {liked.username}: {e}")
+    delay_on_commit(create_like_notifications, instance.pk)
 
 
 
@@ -92,13 +39,12 @@ def handle_like_deletion(sender, instance, **kwargs):
     try:
         # Удаляем только уведомления о новой симпатии (не о взаимности)
         Notification.objects.filter(
-            recipient=instance.user_to,
-            sender=instance.user_from,
-            notification_type='LIKE',
-            message__contains='выразил'
+            recipient_id=instance.user_to_id,
+            sender_id=instance.user_from_id,
+            subtype='LIKE_NEW'
         ).delete()
         
-        logger.info(f"Удалены уведомления о симпатии: {instance.user_from.username} → {instance.user_to.username}")
+        logger.info(f"Удалены уведомления о симпатии: user #{instance.user_from_id} → user #{instance.user_to_id}")
     
     except Exception as e:
         logger.error(f"Ошибка при удалении уведомлений о симпатии: {e}")
\ No newline at end of file
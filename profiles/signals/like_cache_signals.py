@@ -0,0 +1,25 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+import logging
+
+from profiles.models import Like
+from profiles.services.like_service import invalidate_mutual_like
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================
+# СБРОС КЭША ВЗАИМНЫХ СИМПАТИЙ
+# ==========================================
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def reset_mutual_like_cache(sender, instance, **kwargs):
+    """
+    Новая или удалённая симпатия меняет взаимность пары
+
+    Сброс - после коммита: иначе запрос, пришедший до него, успеет
+    положить в кэш старое значение из БД на весь срок жизни записи.
+    """
+    user_from_id, user_to_id = instance.user_from_id, instance.user_to_id
+    transaction.on_commit(lambda: invalidate_mutual_like(user_from_id, user_to_id))
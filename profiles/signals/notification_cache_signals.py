@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+import logging
+
+from profiles.models import Notification
+from profiles.services.notification_cache import invalidate_unread_count
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================
+# СБРОС КЭША СЧЁТЧИКА УВЕДОМЛЕНИЙ
+# ==========================================
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def reset_unread_count_cache(sender, instance, **kwargs):
+    """Любое изменение уведомления меняет счётчик получателя"""
+    invalidate_unread_count(instance.recipient_id)
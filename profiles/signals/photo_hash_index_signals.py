@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+import logging
+
+from profiles.models import Photo
+from profiles.services.photo_hash_index import photo_hash_index
+from profiles.services.photo_verification import HASH_ALGO, invalidate_user_photo_hashes
+
+logger = logging.getLogger(__name__)
+
+# Хеш фото неизвестен (поля не загружались из БД)
+_UNKNOWN = object()
+
+
+def _indexed_hash(hash_u64, hash_algo):
+    """Значение хеша в индексе (None - фото в индекс не входит)"""
+    return hash_u64 if hash_algo == HASH_ALGO else None
+
+
+def _old_indexed_hash(instance, created):
+    """Хеш фото в индексе до сохранения"""
+    if created:
+        return None
+    old_hash = getattr(instance, '_old_hash', None)
+    if old_hash is None:
+        return _UNKNOWN
+    return _indexed_hash(*old_hash)
+
+
+# ==========================================
+# ИНДЕКС ХЕШЕЙ ФОТО (BK-ДЕРЕВО)
+# ==========================================
+@receiver(post_save, sender=Photo)
+def index_photo_hash(sender, instance, created, **kwargs):
+    """
+    Фото с хешем текущего алгоритма попадает в индекс
+    
+    Индекс (и общая версия в кэше) меняется только при изменении хеша,
+    и только после коммита: до него другие процессы не увидят фото в БД.
+    """
+    old = _old_indexed_hash(instance, created)
+    new = _indexed_hash(instance.image_hash_u64, instance.image_hash_algo)
+    instance._old_hash = (instance.image_hash_u64, instance.image_hash_algo)
+    if old == new:
+        return
+    
+    photo_id = instance.pk
+    if old is _UNKNOWN:
+        # Прежний хеш не загружался - сбрасываем дерево целиком
+        transaction.on_commit(photo_hash_index.invalidate)
+        return
+    if old is not None:
+        transaction.on_commit(lambda: photo_hash_index.discard(photo_id, old))
+    if new is not None:
+        transaction.on_commit(lambda: photo_hash_index.add(photo_id, new))
+
+
+@receiver(post_delete, sender=Photo)
+def unindex_photo_hash(sender, instance, **kwargs):
+    """Удалённое фото убирается из индекса"""
+    hash_u64 = _indexed_hash(instance.image_hash_u64, instance.image_hash_algo)
+    if hash_u64 is not None:
+        photo_id = instance.pk
+        transaction.on_commit(lambda: photo_hash_index.discard(photo_id, hash_u64))
+
+
+# ==========================================
+# ВЕРСИЯ ХЕШЕЙ ГАЛЕРЕИ ПРОФИЛЯ
+# ==========================================
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+def bump_photos_hash_version(sender, instance, **kwargs):
+    """Любое изменение фото делает кэш хешей галереи профиля устаревшим"""
+    invalidate_user_photo_hashes(instance.user_profile_id)
@@ -13,19 +13,24 @@ logger = logging.getLogger(__name__)
 # СИГНАЛЫ ДЛЯ ПРОФИЛЯ
 # ==============================================================================
 @receiver(post_save, sender=User)
-def handle_user_profile(sender, instance, created, **kwargs):
+def handle_user_profile(sender, instance, created, update_fields=None, **kwargs):
     """
-    Создаёт профиль при регистрации пользователя и сохраняет его при обновлении.
+    Создаёт профиль при регистрации пользователя (или если его почему-то нет).
     Без дублирования, с защитой от IntegrityError.
+    Существующий профиль не пересохраняется: данные User в нём не хранятся,
+    у UserProfile свой путь сохранения.
     """
+    # Обновление last_login при входе профиль не затрагивает
+    if not created and update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+
     try:
         profile, just_created = UserProfile.objects.get_or_create(user=instance)
-        profile.save()
         if created and just_created:
             logger.info(f"Профиль создан для нового пользователя: {instance.username}")
         elif created and not just_created:
             logger.warning(f"Профиль уже существовал при создании пользователя: {instance.username}")
-        elif not created:
-            logger.info(f"Профиль сохранён при обновлении пользователя: {instance.username}")
+        elif just_created:
+            logger.info(f"Создан недостающий профиль пользователя: {instance.username}")
     except Exception as e:
         logger.error(f"Ошибка при обработке профиля пользователя {instance.username}: {e}")
@@ -1,10 +1,9 @@
 
 from django.contrib.auth.signals import user_logged_in, user_logged_out
 from django.dispatch import receiver
-from django.utils.timezone import now
 import logging
 
-from profiles.models import UserSession  # или путь к модели, если она в другом приложении
+from profiles.middlewares.middleware import SessionTrackingMiddleware
 
 logger = logging.getLogger(__name__)
 
@@ -27,15 +26,14 @@ def start_user_session(sender, request, user, **kwargs):
         request.session.save()  # создаёт session_key, если его нет
         session_key = request.session.session_key   
 
-    # Завершаем все незавершённые сессии (на всякий случай)
-    UserSession.objects.filter(user=user, logout_time__isnull=True).update(logout_time=now())
+    # Закрытие старых сеансов и запись нового - в задаче после коммита.
+    # ID нового сеанса SessionTrackingMiddleware найдёт сам, когда запись
+    # появится; ID прошлого сеанса (login() сохраняет данные сессии) убираем
+    request.session.pop(SessionTrackingMiddleware.SESSION_KEY, None)
 
-    session = UserSession.objects.create(
-        user=user,
-        ip_address=ip,
-        user_agent=user_agent,
-        session_key=session_key
-    )
+    from profiles.tasks import delay_on_commit, record_user_session
+
+    delay_on_commit(record_user_session, user.id, ip, user_agent, session_key)
 
     logger.info(
         f"🔐 Вход пользователя: {user.username} | IP: {ip} | UA: {user_agent} | Session ID: {session_key}"
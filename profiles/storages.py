@@ -0,0 +1,78 @@
+"""
+Хранилище фотографий с адресацией по содержимому
+
+Путь файла строится из sha256 его байтов, поэтому одинаковые загрузки
+разных пользователей ссылаются на один файл на диске.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.module_loading import import_string
+
+
+CONTENT_HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_sha256(field_file):
+    """sha256 содержимого файла (hex), считается потоково, чанками"""
+    digest = hashlib.sha256()
+
+    for chunk in field_file.chunks(chunk_size=CONTENT_HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    field_file.seek(0)
+
+    return digest.hexdigest()
+
+
+def content_addressed_upload_to(instance, filename):
+    """
+    upload_to для Photo.image: photos/ab/cd/<sha256>.<ext>
+
+    Хеш содержимого берётся из instance.content_sha256, если модель
+    уже посчитала его в save(), иначе считается здесь; расширение
+    берётся из исходного имени.
+    """
+    content_hash = getattr(instance, 'content_sha256', '') or content_sha256(instance.image)
+    ext = os.path.splitext(filename)[1].lower()
+
+    return f'photos/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{ext}'
+
+
+class ContentAddressedStorageMixin:
+    """
+    Хранилище, не перезаписывающее и не дублирующее файлы
+
+    Имя файла однозначно определяется его содержимым: если файл с таким
+    именем уже есть, повторная запись пропускается и возвращается
+    существующее имя (без суффикса _abc123, который добавил бы Django).
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is not None and self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+class ContentAddressedStorage(ContentAddressedStorageMixin, FileSystemStorage):
+    """Локальный вариант (на него ссылается миграция 0012)"""
+
+
+def content_addressed_storage():
+    """
+    Хранилище для Photo.image: бэкенд по умолчанию из settings.STORAGES
+    (локальный диск, S3 и т.д.) с адресацией по содержимому
+
+    Передаётся в поле как callable: вызывается один раз при загрузке
+    моделей, а миграции ссылаются на функцию, а не на конкретный бэкенд.
+    """
+    backend = settings.STORAGES['default']
+    storage_class = import_string(backend['BACKEND'])
+    if not issubclass(storage_class, ContentAddressedStorageMixin):
+        storage_class = type(
+            f'ContentAddressed{storage_class.__name__}',
+            (ContentAddressedStorageMixin, storage_class),
+            {},
+        )
+    return storage_class(**backend.get('OPTIONS', {}))
@@ -1,10 +1,25 @@
 from celery import shared_task
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import OperationalError, transaction
+from django.db.models import Q
+from django.conf import settings
 from django.core.files.storage import default_storage
-from profiles.models import Photo, Notification
-from profiles.services.photo_verification import calculate_photo_hash, PhotoVerificationService
+from profiles.models import Photo, Notification, Like, Message, Complaint, UserSession
+from profiles.services.photo_verification import (
+    calculate_photo_hash,
+    calculate_photo_hashes,
+    find_similar_legacy_photos,
+    PhotoVerificationService,
+    HASH_ALGO,
+    invalidate_user_photo_hashes,
+)
+from profiles.services.photo_hash_index import photo_hash_index
+from profiles.services.reverse_image_search import check_photo_internet
+from profiles.services.like_service import check_mutual_like
+from profiles.services.notification_cache import invalidate_unread_count
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
+from django.utils.timezone import now
 from PIL import Image
 import logging
 
@@ -16,7 +31,9 @@ def process_uploaded_photo(photo_id):
     Асинхронная обработка загруженного фото:
     1. Вычисление хеша
     2. Проверка на дубликаты
-    3. Уведомление админа при необходимости
+    3. Обратный поиск в интернете (PHOTO_INTERNET_CHECK) - для фото
+       без дубликатов в базе
+    4. Уведомление админа при необходимости
     
     ✅ Работает с локальным хранилищем И облачными (S3, GCS и т.д.)
     """
@@ -59,7 +76,15 @@ def process_uploaded_photo(photo_id):
             photo_hash = calculate_photo_hash(image_data)
             
             # Обновляем БД напрямую (быстрее и не вызывает сигнал)
-            Photo.objects.filter(pk=photo_id).update(image_hash=photo_hash)
+            hash_u64 = Photo.hash_to_int64(photo_hash)
+            Photo.objects.filter(pk=photo_id).update(
+                image_hash=photo_hash,
+                image_hash_u64=hash_u64,
+                image_hash_algo=HASH_ALGO,
+            )
+            if hash_u64 is not None:
+                photo_hash_index.add(photo_id, hash_u64)
+            invalidate_user_photo_hashes(photo.user_profile_id)
             
             logger.info(f"✅ Хеш вычислен для фото #{photo_id}: {photo_hash[:8]}...")
             result['hash'] = photo_hash[:8]
@@ -67,6 +92,7 @@ def process_uploaded_photo(photo_id):
             
             # Обновляем локальный объект
             photo.image_hash = photo_hash
+            photo.image_hash_algo = HASH_ALGO
             
         except Exception as e:
             logger.error(f"❌ Ошибка вычисления хеша для фото #{photo_id}: {e}")
@@ -82,8 +108,29 @@ def process_uploaded_photo(photo_id):
             similar = PhotoVerificationService.find_similar_photos(
                 photo_hash=photo.image_hash,
                 user_profile=photo.user_profile,
-                exclude_photo_id=photo.id
+                exclude_photo_id=photo.id,
+                hash_algo=photo.image_hash_algo
             )
+            # Точная копия фото другого пользователя (в т.ч. уже
+            # отмеченного админами) - тоже дубликат. Обычно копий нет:
+            # хватает одного EXISTS, фото загружаются только при совпадении
+            if not similar and PhotoVerificationService.has_exact_duplicate(
+                photo.image_hash,
+                exclude_photo_id=photo.id,
+                hash_algo=photo.image_hash_algo
+            ):
+                similar = PhotoVerificationService.find_similar_photos(
+                    photo_hash=photo.image_hash,
+                    user_profile=None,
+                    exclude_photo_id=photo.id,
+                    threshold=0,
+                    hash_algo=photo.image_hash_algo
+                )
+            # Фото галереи с ещё не пересчитанным (average) хешем
+            if not similar and photo.image_hash_algo == HASH_ALGO:
+                similar = find_similar_legacy_photos(
+                    image_data, photo.user_profile, exclude_photo_id=photo.id
+                )
             
             result['duplicates_found'] = len(similar)
             
@@ -108,9 +155,100 @@ def process_uploaded_photo(photo_id):
             result['status'] = 'partial_error'
             result['duplicate_check_error'] = str(e)
     
+    # Шаг 3: Обратный поиск в интернете - в задаче, а не в запросе загрузки.
+    # Повторные загрузки того же файла API не стоят: ответ берётся
+    # из кэша обратного поиска по sha256/pHash
+    if getattr(settings, 'PHOTO_INTERNET_CHECK', False) and photo.image_hash and not result.get('duplicates_found'):
+        try:
+            is_unique, message, matches = check_photo_internet(image_data, method='google')
+            result['internet_check'] = 'unique' if is_unique else 'found'
+            
+            if not is_unique:
+                logger.warning(f"⚠️ Фото #{photo_id} найдено в интернете: {message}")
+                notify_admins_about_internet_match.apply_async(args=[photo_id, message])
+                result['admins_notified'] = True
+                
+        except Exception as e:
+            logger.error(f"❌ Ошибка обратного поиска для фото #{photo_id}: {e}")
+            result['status'] = 'partial_error'
+            result['internet_check_error'] = str(e)
+    
     return result
 
 
+@shared_task(name='profiles.tasks.compute_missing_photo_hashes')
+def compute_missing_photo_hashes(batch_size=64, after_id=0):
+    """
+    Пакетное вычисление хешей для фото, у которых их ещё нет
+    или они посчитаны устаревшим алгоритмом (average hash -> pHash)
+    
+    Пачка изображений хешируется одним векторным проходом
+    (calculate_photo_hashes), а результат записывается одним bulk_update
+    вместо отдельного UPDATE на каждое фото.
+    
+    Выборка идёт по id (id > after_id), а пока пачка полная, задача ставит
+    себя в очередь со следующей страницы. Нечитаемые фото остаются без хеша,
+    но не блокируют остальные: следующая пачка начинается после них.
+    Запускается по расписанию Celery beat (см. orthodox_dating/celery.py).
+    
+    Args:
+        batch_size: сколько фото обработать за один запуск
+        after_id: обрабатывать фото с id больше этого
+    """
+    photos = list(
+        Photo.objects.filter(Q(image_hash__isnull=True) | ~Q(image_hash_algo=HASH_ALGO))
+        .filter(id__gt=after_id)
+        .exclude(image='')
+        .only('id', 'user_profile', 'image')
+        .order_by('id')[:batch_size]
+    )
+    
+    if not photos:
+        return {'status': 'success', 'processed': 0}
+    
+    readable = []
+    images_data = []
+    for photo in photos:
+        try:
+            with photo.image.open('rb') as image_file:
+                images_data.append(image_file.read())
+            readable.append(photo)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось прочитать файл фото #{photo.id}: {e}")
+    
+    hashed = []
+    for photo, photo_hash in zip(readable, calculate_photo_hashes(images_data)):
+        if photo_hash is None:
+            continue
+        photo.image_hash = photo_hash
+        photo.image_hash_u64 = Photo.hash_to_int64(photo_hash)
+        photo.image_hash_algo = HASH_ALGO
+        hashed.append(photo)
+    
+    # bulk_update не вызывает save() и сигналы - производные поля выставлены выше
+    Photo.objects.bulk_update(
+        hashed, ['image_hash', 'image_hash_u64', 'image_hash_algo']
+    )
+    if hashed:
+        photo_hash_index.invalidate()
+        invalidate_user_photo_hashes(*{photo.user_profile_id for photo in hashed})
+    
+    logger.info(f"✅ Пакетно вычислено хешей: {len(hashed)} из {len(photos)}")
+    
+    # Полная пачка - дальше могут быть ещё фото
+    if len(photos) == batch_size:
+        compute_missing_photo_hashes.apply_async(
+            kwargs={'batch_size': batch_size, 'after_id': photos[-1].id}
+        )
+    
+    return {
+        'status': 'success',
+        'processed': len(photos),
+        'hashed': len(hashed),
+        'errors': len(photos) - len(hashed),
+    }
+
+
 @shared_task(name='profiles.tasks.notify_admins_about_duplicate')
 def notify_admins_about_duplicate(photo_id, similar_photo_ids):
     """
@@ -122,6 +260,44 @@ def notify_admins_about_duplicate(photo_id, similar_photo_ids):
     
     ✅ ОПТИМИЗИРОВАНО: использует bulk_create для одного запроса в БД
     """
+    return _notify_admins_about_photo(
+        photo_id,
+        lambda photo: (
+            f"Пользователь {photo.user_profile.user.username} "
+            f"загрузил фото #{photo.pk}, которое имеет {len(similar_photo_ids)} дубликат(ов). "
+            f"Требуется проверка."
+        )
+    )
+
+
+@shared_task(name='profiles.tasks.notify_admins_about_internet_match')
+def notify_admins_about_internet_match(photo_id, search_message):
+    """
+    Отправляет уведомления админам о фото, найденном в интернете
+    
+    Args:
+        photo_id: ID загруженного фото
+        search_message: итог обратного поиска (format_result_message)
+    """
+    return _notify_admins_about_photo(
+        photo_id,
+        lambda photo: (
+            f"Пользователь {photo.user_profile.user.username} "
+            f"загрузил фото #{photo.pk}, найденное в интернете: {search_message} "
+            f"Требуется проверка."
+        )
+    )
+
+
+def _notify_admins_about_photo(photo_id, build_message):
+    """
+    ADMIN-уведомление о фото всем активным суперпользователям,
+    которых ещё не уведомляли об этом фото
+
+    Args:
+        photo_id: ID фото
+        build_message: функция photo -> текст уведомления
+    """
     try:
         # Загружаем объекты из БД по ID
         photo = Photo.objects.select_related('user_profile__user').get(pk=photo_id)
@@ -130,12 +306,6 @@ def notify_admins_about_duplicate(photo_id, similar_photo_ids):
         if not admins.exists():
             logger.warning("⚠️ Нет активных администраторов для уведомления")
             return {'status': 'no_admins'}
-        
-        message = (
-            f"Пользователь {photo.user_profile.user.username} "
-            f"загрузил фото #{photo.pk}, которое имеет {len(similar_photo_ids)} дубликат(ов). "
-            f"Требуется проверка."
-        )
 
         photo_ct = ContentType.objects.get_for_model(Photo)
         existing_admin_ids = Notification.objects.filter(
@@ -146,24 +316,17 @@ def notify_admins_about_duplicate(photo_id, similar_photo_ids):
 
         admins_to_notify = admins.exclude(id__in=existing_admin_ids)
 
-        # ✅ ОПТИМИЗАЦИЯ: создаем список уведомлений
-        notifications = [
-            Notification(
-                recipient=admin,
-                sender=None,
-                message=message,
-                notification_type='ADMIN',
-                content_type=photo_ct,
-                object_id=photo.id
-            )
-            for admin in admins_to_notify
-        ]
-        
         # ✅ Одним запросом создаем все уведомления
-        created_notifications = Notification.objects.bulk_create(notifications)
+        created_notifications = Notification.objects.fan_out(
+            sender=None,
+            recipients=admins_to_notify,
+            notification_type='ADMIN',
+            message=build_message(photo),
+            target=photo
+        )
         notifications_count = len(created_notifications)
         
-        logger.info(f"📧 Уведомления о дубликате отправлены {notifications_count} админам (bulk_create)")
+        logger.info(f"📧 Уведомления о фото #{photo.pk} отправлены {notifications_count} админам (bulk_create)")
         
         return {
             'status': 'success',
@@ -178,17 +341,244 @@ def notify_admins_about_duplicate(photo_id, similar_photo_ids):
         return {'status': 'error', 'error': str(e)}
     
 
-@shared_task(name='profiles.tasks.test_task')
-def test_task():
-    logger.info("✅ Test task executed")
-    return "Test task completed"
+# ==============================================================================
+# УВЕДОМЛЕНИЯ О СИМПАТИЯХ, СООБЩЕНИЯХ И ЖАЛОБАХ
+# ==============================================================================
+def delay_on_commit(task, *args):
+    """
+    Поставить задачу в очередь после коммита текущей транзакции
 
+    Задача не увидит незакоммиченную строку и не выполнится для
+    откатившейся транзакции. Если брокер недоступен, задача выполняется
+    сразу, в том же процессе - уведомление не теряется.
+    """
+    def enqueue():
+        try:
+            task.delay(*args)
+        except Exception as e:
+            logger.error(f"❌ Ошибка постановки задачи {task.name}{args}: {e}, выполняем синхронно")
+            task(*args)
+
+    transaction.on_commit(enqueue)
+
+
+@shared_task(name='profiles.tasks.create_like_notifications')
+def create_like_notifications(like_id):
+    """
+    Уведомления о новой симпатии и, если она взаимная, о матче
+    (ставится сигналом post_save у Like)
+    """
+    try:
+        like = Like.objects.select_related('user_from', 'user_to').get(pk=like_id)
+    except Like.DoesNotExist:
+        logger.info(f"Симпатия #{like_id} уже удалена - уведомления не нужны")
+        return {'status': 'not_found'}
+
+    liker = like.user_from
+    liked = like.user_to
+
+    try:
+        # Проверка взаимности
+        mutual_like_exists = Like.objects.filter(
+            user_from=liked,
+            user_to=liker
+        ).exists()
+
+        to_create = [
+            Notification(
+                recipient=liked,
+                sender=liker,
+                message=f"{liker.first_name or liker.username} выразил(а) вам симпатию!",
+                notification_type='LIKE',
+                subtype='LIKE_NEW'
+            )
+        ]
+        if mutual_like_exists:
+            to_create += [
+                Notification(
+                    recipient=liker,
+                    sender=liked,
+                    message=f"🎉 У вас взаимная симпатия с {liked.first_name or liked.username}! Теперь вы можете общаться.",
+                    notification_type='LIKE',
+                    subtype='LIKE_MUTUAL'
+                ),
+                Notification(
+                    recipient=liked,
+                    sender=liker,
+                    message=f"🎉 У вас взаимная симпатия с {liker.first_name or liker.username}! Теперь вы можете общаться.",
+                    notification_type='LIKE',
+                    subtype='LIKE_MUTUAL'
+                ),
+            ]
+
+        # Один INSERT на все уведомления; уже существующие (повтор задачи,
+        # матч после повторного лайка) отсекает ограничение uniq_notif_subtype
+        Notification.objects.bulk_create(to_create, ignore_conflicts=True)
+        # bulk_create не шлёт post_save - сбрасываем счётчики сами
+        invalidate_unread_count(liked.id, liker.id)
 
+        if mutual_like_exists:
+            logger.info(f"Взаимная симпатия: {liker.username} ↔ {liked.username}")
+        else:
+            logger.info(f"Создано уведомление о симпатии: {liker.username} → {liked.username}")
 
+    except Exception as e:
+        logger.error(f"Ошибка при обработке симпатии от {liker.username} к {liked.username}: {e}")
+        return {'status': 'error', 'error': str(e)}
+
+    return {'status': 'success', 'mutual': mutual_like_exists}
+
+
+@shared_task(name='profiles.tasks.create_message_notification')
+def create_message_notification(message_id):
+    """
+    Уведомление получателю о новом сообщении
+    (ставится сигналом post_save у Message)
+    """
+    try:
+        message = Message.objects.select_related('sender', 'receiver').get(pk=message_id)
+    except Message.DoesNotExist:
+        logger.info(f"Сообщение #{message_id} уже удалено - уведомление не нужно")
+        return {'status': 'not_found'}
 
+    sender_user = message.sender
+    receiver_user = message.receiver
 
+    try:
+        # Проверка взаимной симпатии
+        if not check_mutual_like(sender_user, receiver_user):
+            logger.warning(
+                f"Попытка отправить сообщение без взаимной симпатии: "
+                f"{sender_user.username} → {receiver_user.username}"
+            )
+            return {'status': 'not_mutual'}
+
+        # Создаём уведомление: дубль (повтор задачи) отсекает ограничение
+        # uniq_notif_target, без отдельной проверки exists()
+        Notification.objects.bulk_create([
+            Notification(
+                recipient=receiver_user,
+                sender=sender_user,
+                message=f"Новое сообщение от {sender_user.first_name or sender_user.username}",
+                notification_type='MESSAGE',
+                content_type=ContentType.objects.get_for_model(Message),
+                object_id=message.id
+            )
+        ], ignore_conflicts=True)
+        # bulk_create не шлёт post_save - сбрасываем счётчик сами
+        invalidate_unread_count(receiver_user.id)
+
+        logger.info(f"Создано уведомление о сообщении: {sender_user.username} → {receiver_user.username}")
 
+    except Exception as e:
+        logger.error(f"Ошибка при создании уведомления о сообщении: {e}")
+        return {'status': 'error', 'error': str(e)}
 
+    return {'status': 'success'}
 
 
+@shared_task(name='profiles.tasks.create_complaint_notification')
+def create_complaint_notification(complaint_id, status):
+    """
+    Уведомление автору жалобы о смене её статуса
+    (ставится сигналом post_save у Complaint)
+
+    Args:
+        complaint_id: ID жалобы
+        status: статус на момент сохранения (жалобу могли изменить ещё раз,
+            пока задача ждала в очереди)
+    """
+    try:
+        complaint = Complaint.objects.select_related('reporter', 'reported_user').get(pk=complaint_id)
+    except Complaint.DoesNotExist:
+        logger.info(f"Жалоба #{complaint_id} уже удалена - уведомление не нужно")
+        return {'status': 'not_found'}
+
+    if complaint.reporter is None:
+        return {'status': 'no_reporter'}
+
+    reported_name = complaint.reported_user.first_name if complaint.reported_user else ''
+
+    # Подготовка сообщений для разных статусов
+    status_messages = {
+        Complaint.STATUS_NEW: f"Ваша жалоба на пользователя {reported_name} взята на рассмотрение администрацией.",
+        Complaint.STATUS_IN_PROGRESS: f"Ваша жалоба на пользователя {reported_name} находится в работе. Администрация проверяет информацию.",
+        Complaint.STATUS_RESOLVED: f"Ваша жалоба на пользователя {reported_name} рассмотрена и разрешена. Приняты соответствующие меры. Спасибо за бдительность!",
+    }
+
+    message = status_messages.get(status)
+    if message is None:
+        # Fallback для неизвестных статусов
+        status_display = dict(Complaint._meta.get_field('status').flatchoices).get(status, status)
+        reported_username = complaint.reported_user.username if complaint.reported_user else ''
+        message = f"Статус вашей жалобы на пользователя {reported_username} изменён: {status_display}"
+
+    from django.utils.timezone import now
+    from datetime import timedelta
+
+    # 💡 Защита от дублирования (в том числе при повторе задачи)
+    recent = Notification.objects.filter(
+        recipient=complaint.reporter,
+        message=message,
+        notification_type='COMPLAINT_STATUS',
+        created_at__gte=now() - timedelta(minutes=5)
+    ).exists()
+
+    if recent:
+        logger.info(f"⚠️ Похожее уведомление по жалобе #{complaint_id} уже было недавно — пропускаем")
+        return {'status': 'exists'}
+
+    try:
+        # ✅ Создаём уведомление БЕЗ sender - покажется иконка администрации
+        notification = Notification.objects.create(
+            recipient=complaint.reporter,
+            sender=None,
+            message=message,
+            notification_type='COMPLAINT_STATUS'
+        )
+        logger.info(
+            f"✅ Уведомление по жалобе #{complaint_id} отправлено "
+            f"{complaint.reporter.username} (Notification #{notification.id})"
+        )
+    except Exception as e:
+        logger.error(f"❌ Ошибка при создании уведомления по жалобе #{complaint_id}: {e}")
+        return {'status': 'error', 'error': str(e)}
+
+    return {'status': 'success'}
+
+
+@shared_task(name='profiles.tasks.test_task')
+def test_task():
+    logger.info("✅ Test task executed")
+    return "Test task completed"
+
+
+# ==============================================================================
+# СЕАНСЫ ПОЛЬЗОВАТЕЛЕЙ
+# ==============================================================================
+@shared_task(
+    name='profiles.tasks.record_user_session',
+    acks_late=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=3,
+    ignore_result=True
+)
+def record_user_session(user_id, ip_address, user_agent, session_key):
+    """
+    Запись сеанса при входе (ставится сигналом user_logged_in):
+    незавершённые сеансы пользователя закрываются, открывается новый.
+    Запрос входа не ждёт этих записей в БД.
+    """
+    with transaction.atomic():
+        # Завершаем все незавершённые сессии (на всякий случай)
+        UserSession.objects.filter(user_id=user_id, logout_time__isnull=True).update(logout_time=now())
+
+        session = UserSession.objects.create(
+            user_id=user_id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            session_key=session_key
+        )
 
+    return {'status': 'success', 'session_id': session.id}
@@ -0,0 +1,124 @@
+"""
+Тесты защиты от дублей уведомлений (ограничения uniq_notif_target
+и uniq_notif_subtype, вставка через bulk_create(ignore_conflicts=True))
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+
+from profiles.models import Like, Message, Notification
+from profiles.tasks import create_like_notifications, create_message_notification
+
+User = get_user_model()
+
+
+class NotificationConstraintTests(TestCase):
+    """Повторная вставка того же уведомления не создаёт дубль"""
+    
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.message_type = ContentType.objects.get_for_model(Message)
+    
+    def message_notification(self, object_id):
+        return Notification(
+            recipient=self.bob,
+            sender=self.alice,
+            message='Новое сообщение',
+            notification_type='MESSAGE',
+            content_type=self.message_type,
+            object_id=object_id,
+        )
+    
+    def like_notification(self, subtype):
+        return Notification(
+            recipient=self.bob,
+            sender=self.alice,
+            message='Симпатия',
+            notification_type='LIKE',
+            subtype=subtype,
+        )
+    
+    def test_same_target_inserted_once(self):
+        """Одно уведомление на сообщение"""
+        Notification.objects.bulk_create([self.message_notification(1)], ignore_conflicts=True)
+        Notification.objects.bulk_create(
+            [self.message_notification(1), self.message_notification(2)],
+            ignore_conflicts=True
+        )
+        self.assertEqual(
+            sorted(Notification.objects.values_list('object_id', flat=True)), [1, 2]
+        )
+    
+    def test_same_subtype_inserted_once(self):
+        """Одно уведомление каждого подтипа на пару пользователей"""
+        Notification.objects.bulk_create([self.like_notification('LIKE_NEW')], ignore_conflicts=True)
+        Notification.objects.bulk_create(
+            [self.like_notification('LIKE_NEW'), self.like_notification('LIKE_MUTUAL')],
+            ignore_conflicts=True
+        )
+        self.assertEqual(
+            sorted(Notification.objects.values_list('subtype', flat=True)),
+            ['LIKE_MUTUAL', 'LIKE_NEW']
+        )
+    
+    def test_fan_out_repeat(self):
+        """Повторная рассылка о той же цели не падает и не дублирует"""
+        carol = User.objects.create_user(username='carol', password='testpass123')
+        target = Message.objects.create(sender=self.alice, receiver=self.bob, content='Привет')
+        for _ in range(2):
+            Notification.objects.fan_out(
+                sender=self.alice,
+                recipients=[self.bob, carol],
+                notification_type='ADMIN',
+                message='Рассылка',
+                target=target
+            )
+        self.assertEqual(
+            sorted(Notification.objects.filter(notification_type='ADMIN')
+                   .values_list('recipient__username', flat=True)),
+            ['bob', 'carol']
+        )
+    
+    def test_untargeted_without_subtype_not_deduplicated(self):
+        """Уведомления без цели и подтипа ограничения не затрагивают"""
+        Notification.objects.bulk_create(
+            [self.like_notification(''), self.like_notification('')],
+            ignore_conflicts=True
+        )
+        self.assertEqual(Notification.objects.count(), 2)
+
+
+class NotificationTaskRetryTests(TestCase):
+    """Повтор задачи уведомления не создаёт дублей"""
+    
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+    
+    def test_like_notifications_retry(self):
+        """Симпатия и матч: по одному уведомлению каждому"""
+        Like.objects.create(user_from=self.bob, user_to=self.alice)
+        like = Like.objects.create(user_from=self.alice, user_to=self.bob)
+        
+        create_like_notifications(like.pk)
+        create_like_notifications(like.pk)
+        
+        self.assertEqual(
+            sorted(Notification.objects.values_list('recipient__username', 'subtype')),
+            [('alice', 'LIKE_MUTUAL'), ('bob', 'LIKE_MUTUAL'), ('bob', 'LIKE_NEW')]
+        )
+    
+    def test_message_notification_retry(self):
+        """Одно уведомление на сообщение при повторе задачи"""
+        Like.objects.create(user_from=self.alice, user_to=self.bob)
+        Like.objects.create(user_from=self.bob, user_to=self.alice)
+        message = Message.objects.create(sender=self.alice, receiver=self.bob, content='Привет')
+        
+        create_message_notification(message.pk)
+        create_message_notification(message.pk)
+        
+        self.assertEqual(
+            Notification.objects.filter(notification_type='MESSAGE', object_id=message.pk).count(), 1
+        )
@@ -72,6 +72,20 @@ class FastingTests(TestCase):
         # Последний день (Великая суббота)
         self.assertTrue(self.calendar.is_fasting_day(date(2024, 5, 4)))
     
+    def test_dormition_fast(self):
+        """Успенский пост (14 - 27 августа)"""
+        # 2023: ни один из дней ниже не среда и не пятница
+        # 1 августа (14-е по старому стилю) - ещё не пост
+        self.assertFalse(self.calendar.is_fasting_day(date(2023, 8, 1)))
+        # Накануне поста
+        self.assertFalse(self.calendar.is_fasting_day(date(2023, 8, 13)))
+        # Начало поста
+        self.assertTrue(self.calendar.is_fasting_day(date(2023, 8, 14)))
+        # Конец поста
+        self.assertTrue(self.calendar.is_fasting_day(date(2023, 8, 27)))
+        # Успение - пост окончен
+        self.assertFalse(self.calendar.is_fasting_day(date(2023, 8, 28)))
+    
     def test_pascha_week_no_fasting(self):
         """Светлая седмица - нет поста в среду и пятницу"""
         easter = get_easter_date(2024)
@@ -83,6 +97,64 @@ class FastingTests(TestCase):
         # Примечание: реализация может отличаться
 
 
+class FastingBitmapTests(TestCase):
+    """Тесты битовой маски постных дней года"""
+    
+    def setUp(self):
+        self.calendar = OrthodoxCalendarService()
+    
+    def test_bitmap_fits_year(self):
+        """Маска не выходит за последний день года (и високосного)"""
+        for year, days in ((2024, 366), (2025, 365)):
+            jan1_ord, bitmap = self.calendar._fasting_bitmap(year)
+            self.assertEqual(jan1_ord, date(year, 1, 1).toordinal())
+            self.assertEqual(bitmap >> days, 0)
+            # 31 декабря - Рождественский пост
+            self.assertTrue(bitmap >> (days - 1) & 1)
+    
+    def test_bitmap_cached(self):
+        """Маска строится один раз на год"""
+        first = self.calendar._fasting_bitmap(2024)
+        self.assertIs(self.calendar._fasting_bitmap(2024), first)
+    
+    def test_christmas_fast_across_new_year(self):
+        """Рождественский пост переходит через Новый год"""
+        self.assertTrue(self.calendar.is_fasting_day(date(2024, 12, 31)))
+        self.assertTrue(self.calendar.is_fasting_day(date(2025, 1, 6)))
+        self.assertFalse(self.calendar.is_fasting_day(date(2025, 1, 7)))
+    
+    def test_great_lent_bounds(self):
+        """Границы Великого поста 2024"""
+        # Прощёное воскресенье
+        self.assertFalse(self.calendar.is_fasting_day(date(2024, 3, 17)))
+        self.assertTrue(self.calendar.is_fasting_day(date(2024, 3, 18)))
+        self.assertTrue(self.calendar.is_fasting_day(date(2024, 5, 4)))
+    
+    def test_apostles_fast_bounds(self):
+        """Петров пост 2024 (1 - 12 июля)"""
+        self.assertFalse(self.calendar.is_fasting_day(date(2024, 6, 30)))
+        self.assertTrue(self.calendar.is_fasting_day(date(2024, 7, 1)))
+        self.assertTrue(self.calendar.is_fasting_day(date(2024, 7, 12)))
+        self.assertFalse(self.calendar.is_fasting_day(date(2024, 7, 13)))
+    
+    def test_non_fasting_weeks(self):
+        """В сплошные седмицы нет поста в среду и пятницу"""
+        # Светлая седмица 2024: среда и пятница
+        self.assertFalse(self.calendar.is_fasting_day(date(2024, 5, 8)))
+        self.assertFalse(self.calendar.is_fasting_day(date(2024, 5, 10)))
+        # Святки: пятница
+        self.assertFalse(self.calendar.is_fasting_day(date(2025, 1, 10)))
+    
+    def test_single_day_fasts(self):
+        """Однодневные посты - в любой день недели, в т.ч. в сплошную седмицу"""
+        # Крещенский сочельник (суббота Святок)
+        self.assertTrue(self.calendar.is_fasting_day(date(2025, 1, 18)))
+        # Усекновение главы Иоанна Предтечи (четверг)
+        self.assertTrue(self.calendar.is_fasting_day(date(2025, 9, 11)))
+        # Воздвижение (суббота)
+        self.assertTrue(self.calendar.is_fasting_day(date(2025, 9, 27)))
+
+
 class HolidayTests(TestCase):
     """Тесты определения праздников"""
     
@@ -0,0 +1,124 @@
+"""
+Тесты быстрого разбора EXIF из JPEG (_fast_jpeg_exif / _parse_exif_ifd0)
+"""
+
+import io
+import struct
+
+from PIL import Image
+from django.test import SimpleTestCase
+
+from profiles.services.photo_validator import _fast_jpeg_exif, _parse_exif_ifd0
+
+
+TAGS = {
+    0x010F: 'Make',
+    0x0110: 'Model',
+    0x0131: 'Software',
+    0x0132: 'DateTime',
+}
+
+
+def make_tiff(order, entries):
+    """
+    TIFF-структура с одним IFD0
+    
+    entries: [(tag, type, bytes)] - ASCII-значения до 4 байт пишутся
+    прямо в запись, длинные - после IFD со смещением.
+    """
+    ifd_offset = 8
+    data_offset = ifd_offset + 2 + 12 * len(entries) + 4
+    records = b''
+    data = b''
+    for tag, value_type, value in entries:
+        if len(value) <= 4:
+            field = value.ljust(4, b'\x00')
+        else:
+            field = struct.pack(order + 'I', data_offset + len(data))
+            data += value
+        records += struct.pack(order + 'HHI', tag, value_type, len(value)) + field
+    
+    header = (b'II' if order == '<' else b'MM') + struct.pack(order + 'HI', 42, ifd_offset)
+    return header + struct.pack(order + 'H', len(entries)) + records + b'\x00' * 4 + data
+
+
+def make_jpeg_with_app1(tiff):
+    """Минимальный поток JPEG: SOI, APP1 (EXIF), SOS"""
+    payload = b'Exif\x00\x00' + tiff
+    return (
+        b'\xff\xd8'
+        + b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+        + b'\xff\xda\x00\x02'
+    )
+
+
+ENTRIES = [
+    (0x010F, 2, b'Canon\x00'),
+    (0x0110, 2, b'EOS\x00'),          # 4 байта - значение в самой записи
+    (0x0131, 2, b'GIMP 2.10\x00'),
+    (0x0132, 2, b'2024:05:05 12:00:00\x00'),
+    (0x0112, 3, b'\x01\x00'),          # Orientation (SHORT) - не нужен
+]
+
+EXPECTED = {
+    'Make': 'Canon',
+    'Model': 'EOS',
+    'Software': 'GIMP 2.10',
+    'DateTime': '2024:05:05 12:00:00',
+}
+
+
+class FastJpegExifTests(SimpleTestCase):
+    """Разбор IFD0 без декодирования изображения"""
+    
+    def test_little_endian(self):
+        raw = make_jpeg_with_app1(make_tiff('<', ENTRIES))
+        self.assertEqual(_fast_jpeg_exif(raw), EXPECTED)
+    
+    def test_big_endian(self):
+        raw = make_jpeg_with_app1(make_tiff('>', ENTRIES))
+        self.assertEqual(_fast_jpeg_exif(raw), EXPECTED)
+    
+    def test_inline_values(self):
+        """Значения до 4 байт включительно лежат прямо в записи"""
+        tiff = make_tiff('<', [(0x010F, 2, b'Abc\x00'), (0x0110, 2, b'X\x00')])
+        self.assertEqual(_parse_exif_ifd0(tiff), {'Make': 'Abc', 'Model': 'X'})
+    
+    def test_app0_before_app1(self):
+        """APP1 ищется за другими сегментами (JFIF APP0)"""
+        app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+        raw = make_jpeg_with_app1(make_tiff('>', ENTRIES))
+        self.assertEqual(_fast_jpeg_exif(raw[:2] + app0 + raw[2:]), EXPECTED)
+    
+    def test_no_exif(self):
+        """Нет APP1 - None"""
+        self.assertIsNone(_fast_jpeg_exif(b'\xff\xd8\xff\xda\x00\x02'))
+    
+    def test_not_jpeg(self):
+        self.assertIsNone(_fast_jpeg_exif(b'\x89PNG\r\n\x1a\n' + b'\x00' * 32))
+        self.assertIsNone(_fast_jpeg_exif(b''))
+    
+    def test_truncated(self):
+        """Обрезанный сегмент или IFD - None, а не исключение"""
+        raw = make_jpeg_with_app1(make_tiff('<', ENTRIES))
+        for cut in (3, 8, 20, 30, 40):
+            self.assertIsNone(_fast_jpeg_exif(raw[:cut]))
+    
+    def test_garbage(self):
+        """Мусор вместо TIFF-заголовка или маркеров - None"""
+        self.assertIsNone(_fast_jpeg_exif(make_jpeg_with_app1(b'XX' + b'\x00' * 20)))
+        self.assertIsNone(_fast_jpeg_exif(make_jpeg_with_app1(b'II' + struct.pack('<HI', 43, 8))))
+        self.assertIsNone(_fast_jpeg_exif(b'\xff\xd8' + b'\x12\x34' * 10))
+    
+    def test_matches_pillow(self):
+        """Результат совпадает с _getexif() Pillow на JPEG, сохранённом Pillow"""
+        exif = Image.Exif()
+        for tag, name in TAGS.items():
+            exif[tag] = EXPECTED[name]
+        buffer = io.BytesIO()
+        Image.new('RGB', (16, 16), (120, 80, 40)).save(buffer, 'JPEG', exif=exif.tobytes())
+        raw = buffer.getvalue()
+        
+        pillow = Image.open(io.BytesIO(raw))._getexif()
+        expected = {name: pillow[tag] for tag, name in TAGS.items()}
+        self.assertEqual(_fast_jpeg_exif(raw), expected)
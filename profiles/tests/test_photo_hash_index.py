@@ -0,0 +1,226 @@
+"""
+Тесты индекса перцептивных хешей фото (BK-дерево)
+"""
+
+import random
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from profiles.models import Photo
+from profiles.services.photo_hash_index import (
+    BKTree,
+    PhotoHashIndex,
+    VERSION_KEY,
+)
+
+
+def linear_find(hashes, value, threshold):
+    """Эталон: полный перебор [(photo_id, distance), ...]"""
+    return [
+        (photo_id, (photo_hash ^ value).bit_count())
+        for photo_id, photo_hash in hashes.items()
+        if (photo_hash ^ value).bit_count() <= threshold
+    ]
+
+
+def distances_by_id(found):
+    """Результат поиска без учёта порядка внутри одного расстояния"""
+    return sorted(found)
+
+
+class BKTreeTests(SimpleTestCase):
+    """BK-дерево находит то же, что полный перебор"""
+    
+    def setUp(self):
+        rng = random.Random(42)
+        base = [rng.getrandbits(64) for _ in range(20)]
+        self.hashes = {}
+        # Кластеры близких хешей вокруг базовых + одинаковые хеши у разных фото
+        for photo_id in range(1, 501):
+            value = base[photo_id % len(base)]
+            for _ in range(rng.randint(0, 6)):
+                value ^= 1 << rng.randrange(64)
+            self.hashes[photo_id] = value
+        self.hashes[501] = self.hashes[1]
+        
+        self.tree = BKTree()
+        for photo_id, value in self.hashes.items():
+            self.tree.add(value, photo_id)
+        self.queries = base[:5] + [rng.getrandbits(64) for _ in range(5)]
+    
+    def test_size(self):
+        """Повторное добавление того же фото не увеличивает размер"""
+        self.tree.add(self.hashes[1], 1)
+        self.assertEqual(len(self.tree), len(self.hashes))
+    
+    def test_find_matches_linear_scan(self):
+        """find совпадает с полным перебором при разных порогах"""
+        for threshold in (0, 3, 5, 10):
+            for value in self.queries:
+                self.assertEqual(
+                    distances_by_id(self.tree.find(value, threshold)),
+                    distances_by_id(linear_find(self.hashes, value, threshold))
+                )
+    
+    def test_find_sorted_by_distance(self):
+        """Результат упорядочен по возрастанию расстояния"""
+        found = self.tree.find(self.queries[0], 10)
+        self.assertEqual([d for _, d in found], sorted(d for _, d in found))
+    
+    def test_discard(self):
+        """Удалённое фото не находится, остальные - по-прежнему"""
+        removed = list(self.hashes)[::3]
+        for photo_id in removed:
+            self.tree.discard(self.hashes[photo_id], photo_id)
+            del self.hashes[photo_id]
+        # Повторное удаление и удаление несуществующего ничего не ломают
+        self.tree.discard(12345, 999999)
+        self.tree.discard(self.hashes[2], 999999)
+        
+        self.assertEqual(len(self.tree), len(self.hashes))
+        for value in self.queries:
+            self.assertEqual(
+                distances_by_id(self.tree.find(value, 8)),
+                distances_by_id(linear_find(self.hashes, value, 8))
+            )
+    
+    def test_empty_tree(self):
+        self.assertEqual(BKTree().find(0, 64), [])
+
+
+class PhotoHashIndexVersionTests(SimpleTestCase):
+    """Согласованность дерева процесса с общей версией в кэше"""
+    
+    def setUp(self):
+        cache.delete(VERSION_KEY)
+        self.rows = {1: 0x0F, 2: 0xFF}
+        self.builds = 0
+        
+        def build():
+            self.builds += 1
+            tree = BKTree()
+            for photo_id, value in self.rows.items():
+                tree.add(value, photo_id)
+            return tree
+        
+        patcher = mock.patch.object(PhotoHashIndex, '_build', side_effect=build)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(cache.delete, VERSION_KEY)
+        self.index = PhotoHashIndex()
+    
+    def find_ids(self, threshold=0, photo_hash='000000000000000f'):
+        return sorted(photo_id for photo_id, _ in self.index.find(photo_hash, threshold))
+    
+    def test_built_once(self):
+        """Дерево строится при первом поиске и дальше переиспользуется"""
+        self.assertEqual(self.find_ids(), [1])
+        self.assertEqual(self.find_ids(), [1])
+        self.assertEqual(self.builds, 1)
+    
+    def test_own_change_applied_in_place(self):
+        """Своё изменение применяется к дереву без перестройки"""
+        self.find_ids()
+        self.index.add(3, 0x0F)
+        self.assertEqual(self.find_ids(), [1, 3])
+        self.index.discard(1, 0x0F)
+        self.assertEqual(self.find_ids(), [3])
+        self.assertEqual(self.builds, 1)
+    
+    def test_foreign_version_bump_forces_rebuild(self):
+        """Изменение в другом процессе (рост версии) - дерево перестраивается"""
+        self.find_ids()
+        self.rows[3] = 0x0F
+        # Другой процесс добавил фото и увеличил общую версию
+        cache.incr(VERSION_KEY)
+        self.assertEqual(self.find_ids(), [1, 3])
+        self.assertEqual(self.builds, 2)
+    
+    def test_own_change_after_foreign_bump_rebuilds(self):
+        """Между своей и прошлой версией было чужое изменение - перестройка"""
+        self.find_ids()
+        cache.incr(VERSION_KEY)
+        self.rows[3] = 0x0F
+        self.index.add(3, 0x0F)
+        self.assertEqual(self.find_ids(), [1, 3])
+        self.assertEqual(self.builds, 2)
+    
+    def test_invalidate(self):
+        """invalidate() сбрасывает дерево"""
+        self.find_ids()
+        self.rows[3] = 0x0F
+        self.index.invalidate()
+        self.assertEqual(self.find_ids(), [1, 3])
+        self.assertEqual(self.builds, 2)
+    
+    def test_invalid_hash(self):
+        """Хеш нестандартной длины не ищется"""
+        self.assertEqual(self.index.find('abc', 5), [])
+
+
+class PhotoHashIndexSignalTests(TestCase):
+    """Сигналы Photo трогают индекс только при изменении хеша и после коммита"""
+    
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='alice', password='testpass123')
+        # Без файла: сигнал обработки фото задачу не ставит
+        self.photo = Photo.objects.create(user_profile=user.userprofile, image='')
+        patcher = mock.patch('profiles.signals.photo_hash_index_signals.photo_hash_index')
+        self.index = patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def save(self, photo, **changes):
+        for field, value in changes.items():
+            setattr(photo, field, value)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            photo.save()
+        return callbacks
+    
+    def test_unchanged_hash_not_indexed(self):
+        """Сохранение без изменения хеша индекс не трогает"""
+        self.save(self.photo, image_hash='000000000000000f')
+        self.index.reset_mock()
+        
+        callbacks = self.save(Photo.objects.get(pk=self.photo.pk), content_sha256='a' * 64)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.index.mock_calls, [])
+    
+    def test_changed_hash_reindexed_on_commit(self):
+        """Новый хеш: старый убирается, новый добавляется - после коммита"""
+        self.save(self.photo, image_hash='000000000000000f')
+        self.index.add.assert_called_once_with(self.photo.pk, 0x0F)
+        self.index.reset_mock()
+        
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            photo = Photo.objects.get(pk=self.photo.pk)
+            photo.image_hash = '00000000000000ff'
+            photo.save()
+        self.assertEqual(self.index.mock_calls, [])
+        for callback in callbacks:
+            callback()
+        self.index.discard.assert_called_once_with(self.photo.pk, 0x0F)
+        self.index.add.assert_called_once_with(self.photo.pk, 0xFF)
+    
+    def test_legacy_hash_not_indexed(self):
+        """Хеш устаревшего алгоритма в индекс не попадает"""
+        self.save(self.photo, image_hash='000000000000000f', image_hash_algo=Photo.HASH_ALGO_AVERAGE)
+        self.assertEqual(self.index.mock_calls, [])
+    
+    def test_unknown_old_hash_invalidates(self):
+        """Хеш не загружался из БД (only) - индекс сбрасывается целиком"""
+        photo = Photo.objects.only('id', 'user_profile').get(pk=self.photo.pk)
+        self.save(photo, image_hash='000000000000000f')
+        self.index.invalidate.assert_called_once_with()
+        self.index.add.assert_not_called()
+    
+    def test_delete_discards(self):
+        """Удалённое фото убирается из индекса"""
+        self.save(self.photo, image_hash='000000000000000f')
+        self.index.reset_mock()
+        photo_id = self.photo.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.photo.delete()
+        self.index.discard.assert_called_once_with(photo_id, 0x0F)
@@ -0,0 +1,64 @@
+"""
+Тесты вычисления перцептивных хешей фото
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+from django.test import SimpleTestCase
+
+from profiles.services.photo_verification import (
+    calculate_photo_hash,
+    calculate_photo_hashes,
+)
+
+
+def make_image_bytes(mode, size, seed, fmt='PNG'):
+    """Детерминированное изображение со случайным узором"""
+    rng = np.random.default_rng(seed)
+    channels = {'RGB': 3, 'RGBA': 4}.get(mode)
+    shape = (size[1], size[0], channels) if channels else (size[1], size[0])
+    image = Image.fromarray(rng.integers(0, 256, shape, dtype=np.uint8), mode=mode)
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class BatchPhotoHashTests(SimpleTestCase):
+    """Пакетный pHash совпадает с вычислением по одному фото"""
+    
+    def setUp(self):
+        self.images = [
+            make_image_bytes('RGB', (640, 480), seed=1, fmt='JPEG'),
+            make_image_bytes('RGBA', (300, 300), seed=2),
+            make_image_bytes('L', (50, 80), seed=3),
+            make_image_bytes('RGB', (2000, 1500), seed=4),
+            make_image_bytes('RGB', (32, 32), seed=5),
+        ]
+    
+    def test_batch_matches_single(self):
+        """Хеши пачки совпадают с calculate_photo_hash для каждого фото"""
+        expected = [calculate_photo_hash(data) for data in self.images]
+        self.assertEqual(calculate_photo_hashes(self.images), expected)
+    
+    def test_batch_keeps_order_with_unreadable(self):
+        """Нечитаемое изображение даёт None на своём месте"""
+        images = [self.images[0], b'not an image', self.images[1]]
+        hashes = calculate_photo_hashes(images)
+        self.assertEqual(hashes, [
+            calculate_photo_hash(self.images[0]),
+            None,
+            calculate_photo_hash(self.images[1]),
+        ])
+    
+    def test_empty_batch(self):
+        """Пустая пачка и пачка без читаемых изображений"""
+        self.assertEqual(calculate_photo_hashes([]), [])
+        self.assertEqual(calculate_photo_hashes([b'', b'junk']), [None, None])
+    
+    def test_hash_format(self):
+        """64-битный хеш - 16 hex-символов"""
+        for photo_hash in calculate_photo_hashes(self.images):
+            self.assertEqual(len(photo_hash), 16)
+            int(photo_hash, 16)
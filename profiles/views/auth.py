@@ -189,41 +189,43 @@ class CustomLogoutView(View):
     """Выход пользователя с сохранением статистики"""
     
     def post(self, request):
-        session_id = self._close_user_session(request.user)
+        session_id = self._close_user_session(request)
         logout(request)
         return redirect(f"{reverse('profiles:logged_out')}?sid={session_id}")
     
-    def _close_user_session(self, user):
-        """Закрытие активной сессии пользователя"""
-        try:
-            session = UserSession.objects.filter(
-                user=user,
-                logout_time__isnull=True
-            ).latest('login_time')
-            
-            session.logout_time = timezone.now()
-            delta = session.logout_time - session.login_time
-            session.duration_minutes = max(1, int(delta.total_seconds() // 60))
-            session.save()
-            
-            logger.info(
-                "Выход пользователя",
-                extra={
-                    'user_id': user.id,
-                    'session_id': session.id,
-                    'duration_minutes': session.duration_minutes
-                }
-            )
-            
-            return session.id
-            
-        except UserSession.DoesNotExist:
+    def _close_user_session(self, request):
+        """
+        Закрытие активной сессии пользователя одним UPDATE
+
+        ID активного сеанса уже найден SessionTrackingMiddleware
+        (request.user_session_id) - повторно его не ищем.
+        """
+        user = request.user
+        session_id = getattr(request, 'user_session_id', None)
+
+        # duration_minutes вычисляет БД (GeneratedField) - пишем только logout_time
+        closed = session_id and UserSession.objects.filter(
+            pk=session_id,
+            logout_time__isnull=True
+        ).update(logout_time=timezone.now())
+
+        if not closed:
             logger.warning(
                 "Нет активной сессии для пользователя",
                 extra={'user_id': user.id}
             )
             return ''
 
+        logger.info(
+            "Выход пользователя",
+            extra={
+                'user_id': user.id,
+                'session_id': session_id,
+            }
+        )
+
+        return session_id
+
 
 class LoggedOutView(View):
     """Страница после выхода"""
@@ -1,4 +1,4 @@
-from django.db.models import Q, Prefetch, Count, Max
+from django.db.models import Q, Count, Max
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
 from django.contrib import messages
@@ -6,7 +6,7 @@ from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 
 from profiles.forms import CommentForm
-from profiles.models import Comment, Post
+from profiles.models import Comment, CommentVote, Post
 
 
 def post_list(request):
@@ -15,7 +15,7 @@ def post_list(request):
         status='published'
     ).exclude(
         author__is_superuser=True
-    ).select_related('author').annotate(
+    ).for_list().annotate(
         comment_count=Count('comments', filter=Q(comments__active=True))
     ).order_by('-created_at')
 
@@ -35,14 +35,7 @@ def post_detail(request, slug):
         parent__isnull=True
     ).exclude(
         author__is_superuser=True
-    ).select_related('author').prefetch_related(
-        Prefetch(
-            'replies',
-            queryset=Comment.objects.filter(active=True).select_related('author')
-        ),
-        'likes',
-        'dislikes'
-    ).order_by('created_at')
+    ).select_related('author').with_visible_replies().with_like_counts().order_by('created_at')
 
     # Обработка нового комментария
     if request.method == 'POST':
@@ -102,15 +95,8 @@ def like_comment(request, comment_id):
     """Лайк комментария"""
     comment = get_object_or_404(Comment, id=comment_id)
 
-    # Убираем дизлайк если был
-    if request.user in comment.dislikes.all():
-        comment.dislikes.remove(request.user)
-
-    # Переключаем лайк
-    if request.user in comment.likes.all():
-        comment.likes.remove(request.user)
-    else:
-        comment.likes.add(request.user)
+    # Переключаем лайк (дизлайк, если был, заменяется)
+    comment.toggle_vote(request.user, CommentVote.LIKE)
 
     return JsonResponse({
         'likes': comment.total_likes(),
@@ -122,15 +108,8 @@ def dislike_comment(request, comment_id):
     """Дизлайк комментария"""
     comment = get_object_or_404(Comment, id=comment_id)
 
-    # Убираем лайк если был
-    if request.user in comment.likes.all():
-        comment.likes.remove(request.user)
-
-    # Переключаем дизлайк
-    if request.user in comment.dislikes.all():
-        comment.dislikes.remove(request.user)
-    else:
-        comment.dislikes.add(request.user)
+    # Переключаем дизлайк (лайк, если был, заменяется)
+    comment.toggle_vote(request.user, CommentVote.DISLIKE)
 
     return JsonResponse({
         'likes': comment.total_likes(),
@@ -10,8 +10,10 @@ from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
 
-from profiles.models import Message, Like, Notification, UserSession
+from profiles.models import Message, Notification
 from profiles.forms import MessageForm
+from profiles.services.like_service import check_mutual_like
+from profiles.services.user_service import UserService
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -23,10 +25,7 @@ class MessagingService:
     @staticmethod
     def check_mutual_like(user1, user2):
         """Проверка взаимной симпатии между пользователями"""
-        return (
-            Like.objects.filter(user_from=user1, user_to=user2).exists() and
-            Like.objects.filter(user_from=user2, user_to=user1).exists()
-        )
+        return check_mutual_like(user1, user2)
     
     @staticmethod
     def get_user_conversations(user):
@@ -36,17 +35,7 @@ class MessagingService:
         Returns:
             QuerySet: пользователи с аннотацией последнего сообщения
         """
-        sent_to = Message.objects.filter(
-            sender=user,
-            is_deleted_by_sender=False
-        ).values_list('receiver_id', flat=True)
-        
-        received_from = Message.objects.filter(
-            receiver=user,
-            is_deleted_by_receiver=False
-        ).values_list('sender_id', flat=True)
-        
-        interlocutor_ids = set(sent_to) | set(received_from)
+        interlocutor_ids = UserService.interlocutor_ids(user)
         
         return User.objects.filter(
             id__in=interlocutor_ids
@@ -67,18 +56,8 @@ class MessagingService:
         Returns:
             QuerySet: пользователи с полями last_message_time и unread_count
         """
-        # Получаем ID всех собеседников
-        sent_to = Message.objects.filter(
-            sender=user,
-            is_deleted_by_sender=False
-        ).values_list('receiver_id', flat=True)
-        
-        received_from = Message.objects.filter(
-            receiver=user,
-            is_deleted_by_receiver=False
-        ).values_list('sender_id', flat=True)
-        
-        interlocutor_ids = set(sent_to) | set(received_from)
+        # ID всех собеседников - подзапросом в том же SQL
+        interlocutor_ids = UserService.interlocutor_ids(user)
         
         # Подзапрос для подсчёта непрочитанных сообщений
         unread_subquery = Message.objects.filter(
@@ -155,14 +134,7 @@ class MessagingService:
         )
         
         # Обновляем статистику сессии
-        try:
-            session = UserSession.objects.filter(
-                user=sender,
-                logout_time__isnull=True
-            ).latest('login_time')
-            session.messages_sent += 1
-            session.save(update_fields=['messages_sent'])
-        except UserSession.DoesNotExist:
+        if not UserService.update_session_stats(sender, messages_sent=1):
             logger.debug("Нет активной сессии для обновления статистики")
         
         
@@ -9,7 +9,8 @@ from django.shortcuts import redirect, get_object_or_404
 from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
 
-from profiles.models import Like, UserSession
+from profiles.services.like_service import check_mutual_like
+from profiles.services.user_service import UserService
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -85,10 +86,7 @@ class MutualLikeRequiredMixin:
     @staticmethod
     def check_mutual_like(user1, user2):
         """Проверка взаимной симпатии"""
-        return (
-            Like.objects.filter(user_from=user1, user_to=user2).exists() and
-            Like.objects.filter(user_from=user2, user_to=user1).exists()
-        )
+        return check_mutual_like(user1, user2)
 
 
 class SessionStatsMixin:
@@ -119,26 +117,12 @@ class SessionStatsMixin:
             )
             return
         
-        try:
-            session = UserSession.objects.filter(
-                user=user,
-                logout_time__isnull=True
-            ).latest('login_time')
-            
-            current_value = getattr(session, self.session_stat_field, 0)
-            setattr(session, self.session_stat_field, current_value + increment)
-            session.save(update_fields=[self.session_stat_field])
-            
+        if UserService.update_session_stats(user, **{self.session_stat_field: increment}):
             logger.debug(
-                f"Обновлена статистика: {self.session_stat_field} = "
-                f"{current_value + increment}",
-                extra={
-                    'user_id': user.id,
-                    'session_id': session.id
-                }
+                f"Обновлена статистика: {self.session_stat_field} += {increment}",
+                extra={'user_id': user.id}
             )
-            
-        except UserSession.DoesNotExist:
+        else:
             logger.debug(
                 f"Нет активной сессии для пользователя {user.id}",
                 extra={'user_id': user.id}
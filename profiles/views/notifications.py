@@ -3,14 +3,15 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
 
 from profiles.models import Notification
+from profiles.services.notification_cache import get_unread_count, invalidate_unread_count
 
 @login_required
 def notification_list(request):
     notifications = Notification.objects.filter(
         recipient=request.user
-    ).select_related('sender').order_by('-created_at')
+    ).with_sender().order_by('-created_at')
 
-    unread_count = notifications.filter(is_read=False).count()
+    unread_count = get_unread_count(request.user.id)
 
     return render(request, 'profiles/notifications.html', {
         'notifications': notifications,
@@ -21,5 +22,7 @@ def notification_list(request):
 def mark_all_notifications_read(request):
     if request.method == 'POST':
         updated = Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+        # update() не шлёт сигналы - сбрасываем кэш счётчика вручную
+        invalidate_unread_count(request.user.id)
         return JsonResponse({'status': 'success', 'updated': updated})
     return JsonResponse({'error': 'Invalid method'}, status=405)
\ No newline at end of file
@@ -3,8 +3,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 
 from profiles.forms import ComplaintForm
-from profiles.models import Like, Notification, UserProfile, UserSession
+from profiles.models import Like, Notification, UserProfile
 from profiles.services.like_service import check_mutual_like
+from profiles.services.user_service import UserService
 from profiles.views.mixins import is_staff_or_superuser
 from profiles.views.auth import User
 
@@ -27,15 +28,7 @@ def add_like(request, pk):
 
     if created:
         # 📊 Обновление статистики
-        try:
-            session = UserSession.objects.filter(
-                user=request.user,
-                logout_time__isnull=True
-            ).latest('login_time')
-            session.likes_given += 1
-            session.save()
-        except UserSession.DoesNotExist:
-            pass
+        UserService.update_session_stats(request.user, likes_given=1)
 
         # Проверка взаимности и создание уведомления
         if check_mutual_like(request.user, target):